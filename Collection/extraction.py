@@ -0,0 +1,87 @@
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+# Declarative selector table for Flipkart product pages.
+# `many` fields join the text of every match with a space; the others take the first match.
+# `na_if_empty` fields report "NA" when the matched element has no text.
+PRODUCT_SELECTORS = {
+    "product_title": {"tag": "span", "class": "VU-ZEz", "many": False},
+    "product_price": {"tag": "div", "class": "Nx9bqj CxhGGd", "many": False},
+    "product_rating": {"tag": "div", "class": "XQDdHH", "many": False},
+    "product_highlights": {"tag": "li", "class": "_7eSDEz", "many": True},
+    "product_description": {"tag": "div", "class": "yN+eNk w9jEaj", "many": False, "na_if_empty": True},
+    "product_reviews": {"tag": "div", "class": "ZmyHeo", "many": True},
+}
+
+# Product links on a search results page.
+PRODUCT_LINK_SELECTOR = {"tag": "a", "class": "CGtC98"}
+
+
+def best_available_parser() -> str:
+    """
+    Return the fastest installed BeautifulSoup parser backend, falling back
+    to the built-in html.parser.
+    """
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+
+def class_matches(element_classes, selector_class: str) -> bool:
+    """
+    Match a selector class the way BeautifulSoup's attrs={"class": ...} does:
+    either the whole class attribute or one of its individual values.
+    """
+    if not element_classes:
+        return False
+    return selector_class in element_classes or " ".join(element_classes) == selector_class
+
+
+class ProductExtractor:
+    """
+    Extracts every product field from a page in a single pass.
+
+    Only elements named in the selector table are built into the tree, and
+    that reduced tree is walked once, routing each element to the fields it
+    matches.
+    """
+
+    def __init__(self, selectors=None, parser: str = None):
+        self.selectors = selectors or PRODUCT_SELECTORS
+        self.parser = parser or best_available_parser()
+
+        self._by_tag = {}
+        for field, selector in self.selectors.items():
+            self._by_tag.setdefault(selector["tag"], []).append((field, selector))
+
+        wanted = {selector["class"] for selector in self.selectors.values()}
+        wanted_tokens = {token for cls in wanted for token in cls.split()}
+        self._strainer = SoupStrainer(
+            list(self._by_tag),
+            attrs={"class": lambda value: value is not None and (
+                value in wanted or any(token in wanted_tokens for token in value.split()))},
+        )
+
+    def extract(self, content) -> dict:
+        """
+        Return a dict of product fields; missing fields are "NA".
+        """
+        soup = BeautifulSoup(content, self.parser, parse_only=self._strainer)
+        found = {field: [] for field in self.selectors}
+
+        for element in soup.find_all(list(self._by_tag)):
+            classes = element.get("class")
+            for field, selector in self._by_tag[element.name]:
+                if not class_matches(classes, selector["class"]):
+                    continue
+                if selector["many"] or not found[field]:
+                    found[field].append(element.get_text())
+
+        record = {}
+        for field, texts in found.items():
+            text = " ".join(texts)
+            empty = len(text) == 0 and self.selectors[field].get("na_if_empty", False)
+            record[field] = text if texts and not empty else "NA"
+        return record
@@ -0,0 +1,179 @@
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from myutils.jobs import report_progress
+
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# A fetched product page. `changed` is False when the cached copy was still
+# current, in which case `record` holds the previously parsed product (if any).
+Page = namedtuple("Page", ["url", "content", "changed", "record"])
+
+
+class HostRateLimiter:
+    """
+    Spaces out requests to the same host so that no host sees more than
+    `requests_per_second` requests.
+    """
+
+    def __init__(self, requests_per_second: float):
+        self.min_interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str):
+        """
+        Reserve the next free slot for `host` and sleep until it is due.
+        """
+        if not self.min_interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class PageFetcher:
+    """
+    Fetches pages over a pooled HTTP session with bounded concurrency,
+    per-host rate limiting, per-request timeouts and exponential backoff.
+    """
+
+    def __init__(self, headers=None, max_concurrency: int = 8, requests_per_second: float = 4.0,
+                 timeout: float = 15.0, max_retries: int = 3, backoff_base: float = 0.5,
+                 backoff_max: float = 8.0, cache=None):
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = HostRateLimiter(requests_per_second)
+
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="fetcher")
+
+    @classmethod
+    def from_config(cls, config: dict, headers=None, cache=None):
+        """
+        Build a fetcher from the `scraper` section of config.yaml.
+        """
+        scraper_config = config.get("scraper", {})
+        return cls(
+            headers=headers,
+            max_concurrency=scraper_config.get("max_concurrency", 8),
+            requests_per_second=scraper_config.get("requests_per_second", 4.0),
+            timeout=scraper_config.get("timeout_seconds", 15.0),
+            max_retries=scraper_config.get("max_retries", 3),
+            backoff_base=scraper_config.get("backoff_base_seconds", 0.5),
+            backoff_max=scraper_config.get("backoff_max_seconds", 8.0),
+            cache=cache,
+        )
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        Exponential backoff with full jitter for the given (zero-based) attempt.
+        """
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    def fetch(self, url: str, headers=None) -> requests.Response:
+        """
+        Fetch a single URL, retrying connection errors, timeouts and
+        retryable status codes. Returns the last response received.
+        """
+        host = urlparse(url).netloc
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(host)
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+                print(f"Attempt {attempt+1}: {url} returned {response.status_code}. Retrying...")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                print(f"Attempt {attempt+1}: {url} failed ({e}). Retrying...")
+            time.sleep(self.backoff_delay(attempt))
+            attempt += 1
+
+    def _fetch_or_none(self, url: str):
+        try:
+            return self.fetch(url)
+        except requests.RequestException as e:
+            print(f"❌ Giving up on {url}: {e}")
+            return None
+
+    def fetch_all(self, urls):
+        """
+        Fetch all URLs concurrently. Results are returned in input order;
+        URLs that could not be fetched yield None.
+        """
+        return list(self._executor.map(self._fetch_or_none, urls))
+
+    def fetch_page(self, url: str):
+        """
+        Fetch a product page, sending a conditional request when a cached copy
+        exists. Returns a Page, or None if the page could not be fetched.
+        """
+        if self.cache is None:
+            response = self._fetch_or_none(url)
+            if response is None or not response.ok:
+                return None
+            return Page(url, response.content, True, None)
+
+        entry = self.cache.get(url)
+        try:
+            response = self.fetch(url, headers=self.cache.conditional_headers(entry))
+        except requests.RequestException as e:
+            print(f"❌ Giving up on {url}: {e}")
+            return None
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 304 and entry is not None:
+            self.cache.revalidate(url, etag, last_modified)
+            self.cache.record_lookup(hit=True, not_modified=True)
+            return Page(url, entry["body"], False, entry["record"])
+        if not response.ok:
+            return None
+        if entry is not None and entry["content_hash"] == self.cache.content_hash(response.content):
+            self.cache.revalidate(url, etag, last_modified)
+            self.cache.record_lookup(hit=True)
+            return Page(url, response.content, False, entry["record"])
+
+        self.cache.store(url, response.content, etag, last_modified)
+        self.cache.record_lookup(hit=False)
+        return Page(url, response.content, True, None)
+
+    def fetch_pages(self, urls):
+        """
+        Fetch product pages concurrently through the cache, in input order.
+        """
+        pages = []
+        for page in self._executor.map(self.fetch_page, urls):
+            pages.append(page)
+            report_progress("fetch", len(pages), len(urls))
+        return pages
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
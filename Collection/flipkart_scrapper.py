@@ -1,8 +1,16 @@
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 import sys
+from urllib.parse import urljoin
 from exception.exceptions import CustomerSupportSystemException
+from Collection.extraction import PRODUCT_LINK_SELECTOR, PRODUCT_SELECTORS, ProductExtractor
+from Collection.fetcher import PageFetcher
+from Collection.page_cache import PageCache
+from data_ingestion.catalog_store import CatalogStore
+from data_ingestion.review_cleaning import clean_reviews
+from myutils.settings import get_settings
+from myutils.jobs import report_progress
+from myutils.tracing import span
 import emoji
 import time
 
@@ -13,9 +21,13 @@ class FlipkartScraper:
     file_path = "Data/flipkart_realtime_scrape.csv"
 
 
-    BASE_URL = "https://www.flipkart.com/search?q={product_category}&otracker=search&otracker1=search&marketplace=FLIPKART&as-show=on&as=off"
+    SITE_URL = "https://www.flipkart.com"
 
-    def __init__(self, product_category,user_agent):
+    BASE_URL = "{site_url}/search?q={product_category}&otracker=search&otracker1=search&marketplace=FLIPKART&as-show=on&as=off"
+
+    DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/136.0.0.0 Safari/537.36"
+
+    def __init__(self, product_category,user_agent=DEFAULT_USER_AGENT,fetcher=None,site_url=None):
         self.product_category = product_category
         self.data_dict = {
             "product_title": [],
@@ -27,66 +39,81 @@ class FlipkartScraper:
             "product_link": []
         }
         self.user_agent=user_agent
+        config = get_settings().config
+        # Shared with DataIngestion, which reads this file back
+        self.file_path = config.get("scraper", {}).get("output_path", self.file_path)
         self.HEADERS = {
             "User-Agent": self.user_agent,  
             "Accept-Language": "en-US,en;q=0.9"
         }
-
+        # site_url can point at a local stand-in serving saved HTML
+        self.site_url = site_url or self.SITE_URL
+        self._owns_fetcher = fetcher is None
+        if fetcher is None:
+            fetcher = PageFetcher.from_config(config, headers=self.HEADERS, cache=PageCache.from_config(config))
+        self.fetcher = fetcher
+        self.extractor = ProductExtractor()
 
 
     @staticmethod
     def get_title(soup):
         """Extracts the product title."""
         try:
-            title = soup.find("span", attrs={"class": "VU-ZEz"})
+            selector = PRODUCT_SELECTORS["product_title"]
+            title = soup.find(selector["tag"], attrs={"class": selector["class"]})
             return title.text if title else "NA"
         except Exception as e:
-            raise CustomerSupportSystemException(f"Error fetching title: {e}")
+            raise CustomerSupportSystemException(f"Error fetching title: {e}", sys)
 
     @staticmethod
     def get_price(soup):
         """Extracts the product price."""
         try:
-            price = soup.find("div", attrs={"class": "Nx9bqj CxhGGd"})
+            selector = PRODUCT_SELECTORS["product_price"]
+            price = soup.find(selector["tag"], attrs={"class": selector["class"]})
             return price.text if price else "NA"
         except Exception as e:
-            raise CustomerSupportSystemException(f"Error fetching price: {e}")
+            raise CustomerSupportSystemException(f"Error fetching price: {e}", sys)
 
     @staticmethod
     def get_rating(soup):
         """Extracts the product rating."""
         try:
-            rating = soup.find("div", attrs={"class": "XQDdHH"})
+            selector = PRODUCT_SELECTORS["product_rating"]
+            rating = soup.find(selector["tag"], attrs={"class": selector["class"]})
             return rating.text if rating else "NA"
         except Exception as e:
-            raise CustomerSupportSystemException(f"Error fetching rating: {e}")
+            raise CustomerSupportSystemException(f"Error fetching rating: {e}", sys)
 
     @staticmethod
     def get_description(soup):
         """Extracts the product description."""
         try:
-            description = soup.find("div", attrs={"class": "yN+eNk w9jEaj"})
+            selector = PRODUCT_SELECTORS["product_description"]
+            description = soup.find(selector["tag"], attrs={"class": selector["class"]})
             return description.text if description and len(description.text) > 0 else "NA"
         except Exception as e:
-            raise CustomerSupportSystemException(f"Error fetching description: {e}")
+            raise CustomerSupportSystemException(f"Error fetching description: {e}", sys)
 
     @staticmethod
     def get_reviews(soup):
         """Extracts product reviews."""
         try:
-            reviews = soup.find_all("div", attrs={"class": "ZmyHeo"})
+            selector = PRODUCT_SELECTORS["product_reviews"]
+            reviews = soup.find_all(selector["tag"], attrs={"class": selector["class"]})
             return " ".join([rev.text for rev in reviews]) if reviews else "NA"
         except Exception as e:
-            raise CustomerSupportSystemException(f"Error fetching reviews: {e}")
+            raise CustomerSupportSystemException(f"Error fetching reviews: {e}", sys)
 
     @staticmethod
     def get_highlights(soup):
         """Extracts product highlights."""
         try:
-            product_highlights = soup.find_all("li", attrs={"class": "_7eSDEz"})
+            selector = PRODUCT_SELECTORS["product_highlights"]
+            product_highlights = soup.find_all(selector["tag"], attrs={"class": selector["class"]})
             return " ".join([highlight.text for highlight in product_highlights]) if product_highlights else "NA"
         except Exception as e:
-            raise CustomerSupportSystemException(f"Error fetching highlights: {e}")
+            raise CustomerSupportSystemException(f"Error fetching highlights: {e}", sys)
 
     # def get_product_links(self):
     #     """Fetches product links from Flipkart search results."""
@@ -102,26 +129,29 @@ class FlipkartScraper:
 
     def get_product_links(self):
         """Fetches product links from Flipkart search results with a wait-until mechanism."""
-        search_url = self.BASE_URL.format(product_category=self.product_category)
+        search_url = self.BASE_URL.format(site_url=self.site_url, product_category=self.product_category)
         
         max_attempts = 5  # Set a retry limit to avoid infinite loops
         attempt = 0
         links = []
         
         while not links and attempt < max_attempts:
-            webpage = requests.get(search_url, headers=self.HEADERS)
-            soup = BeautifulSoup(webpage.content, "html.parser")
+            report_progress("search")
+            with span("scrape.fetch"):
+                webpage = self.fetcher.fetch(search_url)
+            with span("scrape.parse"):
+                soup = BeautifulSoup(webpage.content, "html.parser")
             
-            links = soup.find_all("a", attrs={"class": "CGtC98"})
+            links = soup.find_all(PRODUCT_LINK_SELECTOR["tag"], attrs={"class": PRODUCT_LINK_SELECTOR["class"]})
             
             if not links:
                 print(f"Attempt {attempt+1}: No links found. Retrying...")
-                time.sleep(2)  # Wait before retrying
+                time.sleep(self.fetcher.backoff_delay(attempt))  # Back off before retrying
                 attempt += 1
         
         if links:
             print("✅ Links found!")
-            return ["https://flipkart.com" + link.get("href") for link in links if link.get("href")]
+            return [urljoin(self.site_url, link.get("href")) for link in links if link.get("href")]
         else:
             print("❌ No product links found after multiple attempts.")
             return []
@@ -132,40 +162,75 @@ class FlipkartScraper:
     def remove_READMORE(self, text):
         return text.replace("READ MORE", "")
 
+    def parse_product(self, content):
+        """Parses a product page into a record of product fields in a single pass."""
+        try:
+            return self.extractor.extract(content)
+        except Exception as e:
+            raise CustomerSupportSystemException(f"Error parsing product page: {e}", sys)
+
     def scrape_products(self):
         """Scrapes product details and stores them in a DataFrame."""
         product_links = self.get_product_links()
         print(product_links)
-        for product_link in product_links:
-            new_webpage = requests.get(product_link, headers=self.HEADERS)
-            new_soup = BeautifulSoup(new_webpage.content, "html.parser")
-
-            self.data_dict["product_title"].append(self.get_title(new_soup))
-            self.data_dict["product_price"].append(self.get_price(new_soup))
-            self.data_dict["product_rating"].append(self.get_rating(new_soup))
-            self.data_dict["product_highlights"].append(self.get_highlights(new_soup))
-            self.data_dict["product_description"].append(self.get_description(new_soup))
-            self.data_dict["product_reviews"].append(self.get_reviews(new_soup))
+        # Product pages are fetched concurrently; total time tracks the slowest page
+        with span("scrape.fetch"):
+            pages = self.fetcher.fetch_pages(product_links)
+        for index, (product_link, page) in enumerate(zip(product_links, pages), 1):
+            report_progress("parse", index, len(product_links))
+            if page is None:
+                continue
+            # Unchanged pages reuse the record parsed on a previous run
+            record = page.record
+            if page.changed or record is None:
+                with span("scrape.parse"):
+                    record = self.parse_product(page.content)
+                if self.fetcher.cache is not None:
+                    self.fetcher.cache.store_record(product_link, record)
+
+            for field, value in record.items():
+                self.data_dict[field].append(value)
             self.data_dict["product_link"].append(product_link)
 
+        if self.fetcher.cache is not None:
+            cache = self.fetcher.cache
+            print(f"Page cache: {cache.stats} (hit rate {cache.hit_rate():.0%})")
+
         return pd.DataFrame.from_dict(self.data_dict)
 
+    def close(self):
+        """Closes the fetcher and page cache if this scraper created them."""
+        if self._owns_fetcher:
+            self.fetcher.close()
+            if self.fetcher.cache is not None:
+                self.fetcher.cache.close()
+
     def run_pipeline(self):
         """Executes full scraping pipeline with data cleaning and saving."""
         print("Starting Flipkart Scraper...")
         
-        df = self.scrape_products()
+        try:
+            df = self.scrape_products()
+        finally:
+            self.close()
 
         # Remove rows where product_title is 'NA'
         df.drop(df[df["product_title"] == "NA"].index, inplace=True)
 
-        # Clean product reviews
-        df["product_reviews"] = df["product_reviews"].apply(self.remove_READMORE)
-        df["product_reviews"] = df["product_reviews"].apply(self.remove_emojis)
-
-        # Save to CSV
-        df.to_csv(self.file_path, index=False)
-        print(f"Scraping completed! Data saved to {self.file_path}")
+        # Clean product reviews: "READ MORE" links and emoji, column-wise in one regex pass
+        df["product_reviews"] = clean_reviews(df["product_reviews"])
+
+        # Append to the catalog store as a new partition, or overwrite the CSV
+        catalog = CatalogStore.from_config(get_settings().config)
+        if catalog is not None:
+            path = catalog.append(self.product_category, df.to_dict(orient="records"))
+            if path is None:
+                print(f"Scraping completed! No products found for {self.product_category}; catalog unchanged")
+            else:
+                print(f"Scraping completed! Data saved to {path}")
+        else:
+            df.to_csv(self.file_path, index=False)
+            print(f"Scraping completed! Data saved to {self.file_path}")
 
         return df
 
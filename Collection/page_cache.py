@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from myutils.url_utils import normalize_product_url
+
+
+class PageCache:
+    """
+    Persistent page cache keyed by normalized product URL.
+
+    Each entry keeps the page body, a content hash, the ETag/Last-Modified
+    validators and, once parsed, the extracted product record so unchanged
+    pages can skip parsing. Entries not validated within `ttl_seconds` expire,
+    and the least recently used entries are evicted once the cache grows past
+    `max_size_bytes`.
+    """
+
+    def __init__(self, path: str = "Data/page_cache.sqlite", ttl_seconds: float = 7 * 24 * 3600,
+                 max_size_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_size_bytes = max_size_bytes
+        # hits: served from cache (304 or identical body); not_modified: hits that were 304s
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0, "evictions": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS pages (
+                url_key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                content_hash TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                validated_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                record TEXT
+            )"""
+        )
+        self._conn.commit()
+        self._total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Build a cache from the `page_cache` section of config.yaml, or return
+        None when caching is disabled.
+        """
+        cache_config = config.get("page_cache", {})
+        if not cache_config.get("enabled", False):
+            return None
+        return cls(
+            path=cache_config.get("path", "Data/page_cache.sqlite"),
+            ttl_seconds=cache_config.get("ttl_seconds", 7 * 24 * 3600),
+            max_size_bytes=int(cache_config.get("max_size_mb", 256) * 1024 * 1024),
+        )
+
+    @staticmethod
+    def content_hash(body: bytes) -> str:
+        return hashlib.sha256(body).hexdigest()
+
+    def get(self, url: str):
+        """
+        Return the live entry for `url` as a dict, or None if absent or expired.
+        """
+        key = normalize_product_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, content_hash, etag, last_modified, validated_at, record FROM pages WHERE url_key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            if time.time() - row[4] > self.ttl_seconds:
+                self._delete(key)
+                self._conn.commit()
+                return None
+        return {
+            "body": row[0],
+            "content_hash": row[1],
+            "etag": row[2],
+            "last_modified": row[3],
+            "record": json.loads(row[5]) if row[5] else None,
+        }
+
+    @staticmethod
+    def conditional_headers(entry) -> dict:
+        """
+        Build If-None-Match / If-Modified-Since headers from a cache entry.
+        """
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def revalidate(self, url: str, etag=None, last_modified=None):
+        """
+        Mark an entry as validated now (after a 304 or an identical body).
+        """
+        key = normalize_product_url(url)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """UPDATE pages SET validated_at = ?, accessed_at = ?,
+                   etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+                   WHERE url_key = ?""",
+                (now, now, etag, last_modified, key),
+            )
+            self._conn.commit()
+
+    def store(self, url: str, body: bytes, etag=None, last_modified=None) -> str:
+        """
+        Store a freshly downloaded body. Any previously parsed record is dropped.
+        Returns the content hash.
+        """
+        key = normalize_product_url(url)
+        digest = self.content_hash(body)
+        now = time.time()
+        with self._lock:
+            self._delete(key)
+            self._conn.execute(
+                """INSERT INTO pages (url_key, body, content_hash, etag, last_modified,
+                   validated_at, accessed_at, size, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL)""",
+                (key, body, digest, etag, last_modified, now, now, len(body)),
+            )
+            self._total_size += len(body)
+            self._evict()
+            self._conn.commit()
+        return digest
+
+    def store_record(self, url: str, record: dict):
+        """
+        Attach the parsed product record to the cached page.
+        """
+        key = normalize_product_url(url)
+        with self._lock:
+            self._conn.execute("UPDATE pages SET record = ? WHERE url_key = ?", (json.dumps(record), key))
+            self._conn.commit()
+
+    def _delete(self, key: str):
+        row = self._conn.execute("SELECT size FROM pages WHERE url_key = ?", (key,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM pages WHERE url_key = ?", (key,))
+            self._total_size -= row[0]
+
+    def _evict(self):
+        """
+        Drop expired entries, then least recently used ones until under the size bound.
+        """
+        if self._total_size <= self.max_size_bytes:
+            return
+        self._conn.execute("DELETE FROM pages WHERE validated_at < ?", (time.time() - self.ttl_seconds,))
+        self._total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        rows = self._conn.execute("SELECT url_key, size FROM pages ORDER BY accessed_at ASC").fetchall()
+        for key, size in rows:
+            if self._total_size <= self.max_size_bytes:
+                break
+            self._conn.execute("DELETE FROM pages WHERE url_key = ?", (key,))
+            self._total_size -= size
+            self.stats["evictions"] += 1
+
+    def record_lookup(self, hit: bool, not_modified: bool = False):
+        with self._lock:
+            self.stats["hits" if hit else "misses"] += 1
+            if not_modified:
+                self.stats["not_modified"] += 1
+
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,120 @@
+"""
+Benchmark the catalog store against the scraper CSV on a synthetic catalog:
+disk footprint, a full load into product Documents (what ingestion does), and
+a projected read of two columns (product_link, product_title) into Python
+strings.
+
+The catalog is written uncompressed (memory-mapped, zero-copy reads) and
+with zstd. Each read runs in its own subprocess so peak RSS is measured in
+isolation.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_catalog [--rows 1000000] [--chunksize 10000]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.bench_transform import write_synthetic_catalog
+from data_ingestion.catalog_store import CatalogStore, catalog_documents
+from data_ingestion.document_builder import iter_documents, validate_columns
+
+PROJECTED_COLUMNS = ["product_link", "product_title"]
+
+
+def disk_usage(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(directory, name))
+               for directory, _, names in os.walk(path) for name in names)
+
+
+def peak_rss_mb():
+    """Peak RSS of this process. ru_maxrss carries over the parent's peak across fork+exec, VmHWM does not."""
+    try:
+        with open("/proc/self/status", encoding="utf-8") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_one(source, mode, path, chunksize):
+    start = time.perf_counter()
+    if source == "csv":
+        if mode == "load":
+            validate_columns(path)
+            count = sum(1 for _ in iter_documents(path, chunksize=chunksize))
+        else:
+            count = 0
+            for chunk in pd.read_csv(path, usecols=PROJECTED_COLUMNS, chunksize=chunksize, dtype=str):
+                count += len(list(zip(*(chunk[column].tolist() for column in PROJECTED_COLUMNS))))
+    else:
+        store = CatalogStore(path)
+        if mode == "load":
+            store.validate()
+            count = sum(1 for _ in catalog_documents(store))
+        else:
+            count = 0
+            for batch in store.scan(PROJECTED_COLUMNS):
+                count += len(list(zip(*(batch.column(column).to_pylist() for column in PROJECTED_COLUMNS))))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"rows": count, "seconds": elapsed, "peak_rss_mb": peak_rss_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunksize", type=int, default=10_000)
+    parser.add_argument("--run", nargs=2, metavar=("SOURCE", "MODE"), help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(*args.run, args.path, args.chunksize)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "catalog.csv")
+        print(f"Writing synthetic catalog with {args.rows:,} rows...")
+        write_synthetic_catalog(csv_path, args.rows)
+
+        sources = {"csv": csv_path}
+        for name, compression in [("arrow", None), ("arrow-zstd", "zstd")]:
+            root = os.path.join(tmp, name)
+            start = time.perf_counter()
+            CatalogStore(root, batch_rows=args.chunksize, compression=compression).import_csv(
+                csv_path, "phones", chunksize=args.chunksize)
+            print(f"Imported into {name} in {time.perf_counter() - start:.2f} s")
+            sources[name] = root
+
+        print()
+        for name, path in sources.items():
+            print(f"{name:<11} on disk {disk_usage(path) / (1024 * 1024):>8.1f} MB")
+
+        for mode in ["load", "project"]:
+            print(f"\n{mode} ({'Documents' if mode == 'load' else ', '.join(PROJECTED_COLUMNS)}):")
+            for name, path in sources.items():
+                source = "csv" if name == "csv" else "catalog"
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_catalog", "--run", source, mode,
+                     "--path", path, "--chunksize", str(args.chunksize)],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(f"{name:<11} {result['rows']:>9,} rows  {result['seconds']:>7.2f} s  "
+                      f"{result['rows'] / result['seconds']:>10,.0f} rows/sec  "
+                      f"peak RSS {result['peak_rss_mb']:>8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Measure cold start: from launching the server process to the first
+successful /chat answer.
+
+Reports three timings from process start:
+  - import: `import main` alone, in a separate interpreter
+  - ready: /health answers (the lifespan warm-up has finished)
+  - first chat: the first /chat request that returns 200
+
+Needs the same environment as the app (.env credentials and an existing
+collection), since warm-up connects to the configured vector store and LLM.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_cold_start [--port 8899] [--query "..."] [--runs 3]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def measure_import() -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import main"], check=True, capture_output=True)
+    return time.perf_counter() - started
+
+
+def wait_until(predicate, deadline: float, interval: float = 0.05):
+    while time.perf_counter() < deadline:
+        result = predicate()
+        if result is not None:
+            return result
+        time.sleep(interval)
+    return None
+
+
+def measure_cold_start(port: int, query: str, timeout: float) -> dict:
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    deadline = started + timeout
+    try:
+        with httpx.Client(base_url=base_url, timeout=timeout) as client:
+            def ready():
+                try:
+                    return time.perf_counter() if client.get("/health").status_code == 200 else None
+                except httpx.TransportError:
+                    if server.poll() is not None:
+                        raise RuntimeError(f"Server exited: {server.stderr.read().decode(errors='replace')}")
+                    return None
+
+            ready_at = wait_until(ready, deadline)
+            if ready_at is None:
+                raise RuntimeError(f"Server not ready within {timeout}s")
+
+            def first_chat():
+                response = client.post("/chat", json={"query": query})
+                if response.status_code == 200:
+                    return time.perf_counter()
+                print(f"/chat returned {response.status_code}: {response.text[:200]}")
+                return None
+
+            chat_at = wait_until(first_chat, deadline, interval=0.5)
+            if chat_at is None:
+                raise RuntimeError(f"No successful /chat within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+    return {"ready_s": round(ready_at - started, 3), "first_chat_s": round(chat_at - started, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--query", default="Can you suggest good budget laptops?")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    results = []
+    for run in range(args.runs):
+        result = {"import_s": round(measure_import(), 3),
+                  **measure_cold_start(args.port, args.query, args.timeout)}
+        print(f"run {run + 1}: {result}")
+        results.append(result)
+
+    summary = {key: round(statistics.median(result[key] for result in results), 3) for key in results[0]}
+    print(json.dumps({"median": summary, "runs": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark product-page extraction: the legacy per-field BeautifulSoup lookups
+against the single-pass ProductExtractor.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_extraction [--corpus DIR] [--repeat N]
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from Collection.extraction import ProductExtractor, best_available_parser
+from Collection.flipkart_scrapper import FlipkartScraper
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "fixtures", "pages")
+
+
+def legacy_extract(content):
+    """The original scraper path: html.parser plus one tree walk per field."""
+    soup = BeautifulSoup(content, "html.parser")
+    return {
+        "product_title": FlipkartScraper.get_title(soup),
+        "product_price": FlipkartScraper.get_price(soup),
+        "product_rating": FlipkartScraper.get_rating(soup),
+        "product_highlights": FlipkartScraper.get_highlights(soup),
+        "product_description": FlipkartScraper.get_description(soup),
+        "product_reviews": FlipkartScraper.get_reviews(soup),
+    }
+
+
+def load_corpus(corpus_dir):
+    paths = sorted(glob.glob(os.path.join(corpus_dir, "*.html")))
+    pages = []
+    for path in paths:
+        if os.path.basename(path).startswith("search"):
+            continue
+        with open(path, "rb") as file:
+            pages.append(file.read())
+    if not pages:
+        raise FileNotFoundError(f"No product pages found in {corpus_dir}")
+    return pages
+
+
+def measure(extract, pages, repeat):
+    """Return (pages/sec, peak traced memory in MB) for one extraction path."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for content in pages:
+            extract(content)
+    elapsed = time.perf_counter() - start
+
+    # Memory is traced on a separate pass so tracing overhead does not skew timings
+    tracemalloc.start()
+    for content in pages:
+        extract(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (len(pages) * repeat) / elapsed, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="directory of saved product-page HTML files")
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the corpus per path")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    paths = {
+        "legacy (html.parser, per-field)": legacy_extract,
+        "single-pass (html.parser)": ProductExtractor(parser="html.parser").extract,
+    }
+    if best_available_parser() != "html.parser":
+        paths[f"single-pass ({best_available_parser()})"] = ProductExtractor().extract
+
+    # Both paths must agree before their speed is worth comparing
+    for content in pages:
+        expected = legacy_extract(content)
+        for name, extract in paths.items():
+            if extract(content) != expected:
+                print(f"⚠️  {name} disagrees with the legacy path on one page")
+
+    print(f"Corpus: {len(pages)} pages x {args.repeat} passes")
+    for name, extract in paths.items():
+        pages_per_sec, peak_mb = measure(extract, pages, args.repeat)
+        print(f"{name:<36} {pages_per_sec:>9.1f} pages/sec   peak {peak_mb:>7.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
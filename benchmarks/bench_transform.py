@@ -0,0 +1,130 @@
+"""
+Benchmark CSV-to-Document transformation on a synthetic catalog: the legacy
+read_csv + iterrows + per-field np.isnan path against the streaming,
+chunked document builder.
+
+Each path runs in its own subprocess so peak RSS is measured in isolation.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_transform [--rows 1000000] [--chunksize 10000]
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from langchain_core.documents import Document
+
+from data_ingestion.document_builder import iter_documents
+
+
+def legacy_transform(csv_path):
+    """The original DataIngestion.transform_data, kept for comparison."""
+    product_data = pd.read_csv(csv_path)
+    product_list = []
+    for _, row in product_data.iterrows():
+        product_list.append({
+            "product_title": row["product_title"],
+            "product_price": row["product_price"],
+            "product_rating": row["product_rating"],
+            "product_highlights": row["product_highlights"],
+            "product_reviews": row["product_reviews"],
+            "product_description": row["product_description"],
+            "product_link": row["product_link"],
+        })
+
+    documents = []
+    for entry in product_list:
+        metadata = {
+            "product_title": entry["product_title"],
+            "product_price": entry["product_price"],
+            "product_rating": entry["product_rating"],
+            "product_highlights": entry["product_highlights"],
+            "product_description": entry["product_description"],
+            "product_link": entry["product_link"],
+        }
+        for key, value in metadata.items():
+            if isinstance(value, float) and np.isnan(value):
+                metadata[key] = ""
+        review_content = entry.get("product_reviews", "")
+        if isinstance(review_content, float) and np.isnan(review_content):
+            review_content = "No reviews available."
+        documents.append(Document(page_content=review_content, metadata=metadata))
+    return documents
+
+
+def write_synthetic_catalog(path, rows, seed=7):
+    """Write a catalog shaped like flipkart_data.csv, with some NA/empty cells."""
+    rng = random.Random(seed)
+    reviews = [
+        "Great phone, battery lasts all day. Camera is superb in daylight.",
+        "Value for money. Display is bright but speakers are average.",
+        "Heats up while gaming. Otherwise smooth performance and fast charging.",
+    ]
+    chunk = 50_000
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("product_title,product_price,product_rating,product_highlights,"
+                   "product_description,product_reviews,product_link\n")
+        for start in range(0, rows, chunk):
+            lines = []
+            for i in range(start, min(rows, start + chunk)):
+                rating = "NA" if i % 17 == 0 else f"{rng.uniform(3.5, 4.9):.1f}"
+                description = "" if i % 3 == 0 else "NA" if i % 5 == 0 else f"Model {i} description"
+                review = "NA" if i % 11 == 0 else " ".join(rng.sample(reviews, 2))
+                lines.append(
+                    f'"Phone {i} (Black, {rng.choice([64, 128, 256])} GB)","₹{rng.randint(6, 150)},999",{rating},'
+                    f'"{rng.choice([4, 6, 8, 12])} GB RAM | 128 GB ROM",{description},"{review}",'
+                    f"https://www.flipkart.com/phone-{i}/p/itm{i}?pid=PID{i}\n"
+                )
+            file.writelines(lines)
+
+
+def run_one(path_name, csv_path, chunksize):
+    start = time.perf_counter()
+    if path_name == "legacy":
+        count = len(legacy_transform(csv_path))
+    else:
+        count = sum(1 for _ in iter_documents(csv_path, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"docs": count, "seconds": elapsed, "peak_rss_mb": peak_kb / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunksize", type=int, default=10_000)
+    parser.add_argument("--run", choices=["legacy", "streaming"], help=argparse.SUPPRESS)
+    parser.add_argument("--csv", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(args.run, args.csv, args.chunksize)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "catalog.csv")
+        print(f"Writing synthetic catalog with {args.rows:,} rows...")
+        write_synthetic_catalog(csv_path, args.rows)
+        print(f"CSV size: {os.path.getsize(csv_path) / (1024 * 1024):.1f} MB")
+
+        for path_name in ["legacy", "streaming"]:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_transform", "--run", path_name,
+                 "--csv", csv_path, "--chunksize", str(args.chunksize)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{path_name:<10} {result['docs']:>9,} docs  {result['seconds']:>7.2f} s  "
+                  f"{result['docs'] / result['seconds']:>10,.0f} docs/sec  peak RSS {result['peak_rss_mb']:>8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
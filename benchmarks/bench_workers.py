@@ -0,0 +1,228 @@
+"""
+Benchmark multi-process serving: /chat throughput, latency and memory of
+`uvicorn main:app --workers N` for each N, plus how long a finished /ingest
+takes to reach every worker.
+
+The servers run offline (fake embeddings and LLM, the memory-mapped `local`
+vector store) against a synthetic catalog ingested once into a temporary
+directory, whose config file they get through APP_CONFIG. Memory is reported
+as the workers' summed RSS, which counts the shared memory-mapped index and
+embedding cache once per worker, and summed PSS, which splits shared pages
+between the workers mapping them.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_workers [--workers 1 2 4] [--catalog-rows 2000]
+        [--requests 400] [--concurrency 32] [--llm-latency 0.0]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import yaml
+
+from benchmarks.bench_transform import write_synthetic_catalog
+from benchmarks.suite import DEFAULT_REQUESTS, deep_merge, load_requests, percentiles
+from myutils.config_loader import load_config
+from myutils.index_version import IndexVersion
+from myutils.settings import ENV_VARS, Settings, set_settings
+
+
+def write_offline_config(workdir: str, args) -> dict:
+    """
+    Config with offline providers and every path under `workdir`.
+    """
+    overrides = {
+        "embedding_model": {"provider": "fake", "model_name": "fake-embeddings"},
+        "llm": {"default": "fake", "fake": {"provider": "fake", "latency": args.llm_latency}},
+        "vector_store": {"backend": "local", "local": {"path": os.path.join(workdir, "local_index")}},
+        "retriever": {"hybrid": {"bm25_path": os.path.join(workdir, "bm25_index")}},
+        "scraper": {"output_path": os.path.join(workdir, "catalog.csv")},
+        "catalog": {"path": os.path.join(workdir, "catalog")},
+        "ingestion": {
+            "manifest_path": os.path.join(workdir, "ingestion_manifest.json"),
+            "checkpoint_path": os.path.join(workdir, "ingestion_checkpoint.log"),
+            "chunking": {"parent_store_path": os.path.join(workdir, "parent_store.sqlite")},
+        },
+        "embedding_cache": {"path": os.path.join(workdir, "embedding_cache")},
+        "page_cache": {"path": os.path.join(workdir, "page_cache.sqlite")},
+        "jobs": {"store_path": os.path.join(workdir, "jobs.sqlite"),
+                 "index_lock_path": os.path.join(workdir, "index.lock")},
+        "serving": {"index_version_path": os.path.join(workdir, "index_version.json"), "reload_poll_seconds": 0.2},
+        "response_cache": {"enabled": False},
+        "chat": {"max_concurrency": args.concurrency},
+        "startup": {"warm_up": True},
+    }
+    config = deep_merge(load_config(), overrides)
+    with open(os.path.join(workdir, "config.yaml"), "w", encoding="utf-8") as file:
+        yaml.safe_dump(config, file, allow_unicode=True)
+    return config
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def children(pid: int) -> list:
+    pids = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children", encoding="utf-8") as file:
+            pids.extend(int(child) for child in file.read().split())
+    return pids
+
+
+def memory_mb(pid: int) -> dict:
+    """
+    RSS and PSS of one process, from /proc.
+    """
+    usage = {"rss_mb": 0.0, "pss_mb": 0.0}
+    with open(f"/proc/{pid}/smaps_rollup", encoding="utf-8") as file:
+        for line in file:
+            name, _, value = line.partition(":")
+            if name in ("Rss", "Pss"):
+                usage[f"{name.lower()}_mb"] = int(value.split()[0]) / 1024
+    return usage
+
+
+def worker_pids(server: subprocess.Popen, workers: int) -> list:
+    # With one worker uvicorn serves from its own process
+    if workers == 1:
+        return [server.pid]
+    return children(server.pid)
+
+
+async def wait_until_ready(client: httpx.AsyncClient, workers: int, version=None, timeout: float = 120) -> dict:
+    """
+    Poll /health until `workers` distinct processes report ready (and, if
+    given, serving index `version`); returns {pid: index_version}.
+    """
+    seen = {}
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            # A fresh connection each time, so polls are spread over the workers
+            health = (await client.get("/health", headers={"Connection": "close"})).json()
+        except httpx.HTTPError:
+            await asyncio.sleep(0.2)
+            continue
+        if health["ready"]:
+            seen[health["pid"]] = health["index_version"]
+        if len(seen) >= workers and (version is None or all(value == version for value in seen.values())):
+            return seen
+        await asyncio.sleep(0.01)
+    raise TimeoutError(f"Only {len(seen)} of {workers} workers ready: {seen}")
+
+
+async def measure_chat(client: httpx.AsyncClient, queries: list, total: int, concurrency: int) -> dict:
+    queue = asyncio.Queue()
+    for position in range(total):
+        queue.put_nowait(queries[position % len(queries)])
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            query = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.post("/chat", json={"query": query})
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {"requests": total, "errors": errors, "throughput_rps": round(len(latencies) / elapsed, 2),
+            **percentiles(latencies)}
+
+
+async def measure_hot_swap(client: httpx.AsyncClient, workers: int, index_version: IndexVersion) -> dict:
+    """
+    Run /ingest on one worker, follow the job from any worker and time until
+    every worker serves the newly published index.
+    """
+    start = time.perf_counter()
+    job = (await client.post("/ingest")).json()
+    while True:
+        status = (await client.get(f"/jobs/{job['job_id']}")).json()
+        if status["status"] in ("succeeded", "failed", "cancelled"):
+            break
+        await asyncio.sleep(0.05)
+    finished = time.perf_counter()
+    if status["status"] != "succeeded":
+        raise RuntimeError(f"/ingest {status['status']}: {status['error']}")
+    await wait_until_ready(client, workers, version=index_version.current())
+    return {"ingest_seconds": round(finished - start, 3),
+            "propagation_seconds": round(time.perf_counter() - finished, 3)}
+
+
+async def bench_workers(workers: int, args, workdir: str, config: dict, queries: list) -> dict:
+    port = free_port()
+    env = {**os.environ, "APP_CONFIG": os.path.join(workdir, "config.yaml")}
+    env.pop("WEB_CONCURRENCY", None)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency * 2)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits) as client:
+            await wait_until_ready(client, workers)
+            await measure_chat(client, queries, args.concurrency, args.concurrency)  # Warm-up
+            result = await measure_chat(client, queries, args.requests, args.concurrency)
+            usage = [memory_mb(pid) for pid in worker_pids(server, workers)]
+            result["rss_mb"] = round(sum(item["rss_mb"] for item in usage), 1)
+            result["pss_mb"] = round(sum(item["pss_mb"] for item in usage), 1)
+            if args.hot_swap:
+                result.update(await measure_hot_swap(client, workers, IndexVersion.from_config(config)))
+        return result
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--catalog-rows", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=400, help="/chat requests per worker count")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="fake LLM latency in seconds")
+    parser.add_argument("--queries", default=DEFAULT_REQUESTS, help="JSONL request log to take queries from")
+    parser.add_argument("--no-hot-swap", dest="hot_swap", action="store_false",
+                        help="skip timing how fast a finished /ingest reaches every worker")
+    args = parser.parse_args()
+    queries = [request["query"] for request in load_requests(args.queries)]
+
+    with tempfile.TemporaryDirectory(prefix="bench-workers-") as workdir:
+        config = write_offline_config(workdir, args)
+        print(f"Ingesting a synthetic catalog of {args.catalog_rows:,} rows...")
+        write_synthetic_catalog(config["scraper"]["output_path"], args.catalog_rows)
+        set_settings(Settings(config, dict.fromkeys(ENV_VARS)))
+        from data_ingestion.ingestion_pipeline import DataIngestion
+        DataIngestion().run_pipeline()
+
+        print()
+        for workers in args.workers:
+            result = asyncio.run(bench_workers(workers, args, workdir, config, queries))
+            line = (f"{workers:>2} worker(s)  {result['throughput_rps']:>8.1f} req/s  p50 {result['p50_ms']} ms  "
+                    f"p95 {result['p95_ms']} ms  errors {result['errors']}  "
+                    f"RSS {result['rss_mb']:>7.1f} MB  PSS {result['pss_mb']:>7.1f} MB")
+            if args.hot_swap:
+                line += (f"  ingest {result['ingest_seconds']:.2f} s, "
+                         f"all workers reloaded {result['propagation_seconds']:.2f} s later")
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Local HTTP stand-in for flipkart.com serving saved HTML pages.
+
+/search?... serves search.html, and /product-N/... serves product-N.html.
+Responses carry an ETag and honour If-None-Match, so the scraper's page
+cache sees 304s on repeat runs just as it would against the real site.
+
+Run on its own (from the repository root):
+    python -m benchmarks.fixture_server [--port 8765] [--latency 0.05]
+"""
+import argparse
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PAGES = os.path.join(os.path.dirname(__file__), "fixtures", "pages")
+
+
+class FixtureServer:
+    """
+    Serves `pages_dir` on 127.0.0.1 in a background thread, adding
+    `latency` seconds to every response. Use as a context manager.
+    """
+
+    def __init__(self, pages_dir: str = DEFAULT_PAGES, port: int = 0, latency: float = 0.0):
+        self.pages = {}
+        for name in os.listdir(pages_dir):
+            if name.endswith(".html"):
+                with open(os.path.join(pages_dir, name), "rb") as file:
+                    body = file.read()
+                self.pages[name[:-len(".html")]] = (body, f'"{hashlib.sha1(body).hexdigest()}"')
+        self.latency = latency
+        self.requests = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                path = self.path.split("?", 1)[0].strip("/")
+                page = server.pages.get(path.split("/", 1)[0] or "search")
+                if page is None:
+                    self.send_error(404)
+                    return
+                body, etag = page
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default=DEFAULT_PAGES)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    server = FixtureServer(args.pages, port=args.port, latency=args.latency)
+    print(f"Serving {len(server.pages)} pages at {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Load test for /chat using a stubbed LLM with fixed latency and a stubbed
+retriever, run in-process against the FastAPI app.
+
+With a non-blocking handler, throughput should grow roughly linearly with
+concurrency (up to chat.max_concurrency) instead of staying at one request
+per LLM latency.
+
+Usage (from the repository root):
+    python -m benchmarks.load_test_chat [--latency 0.5] [--requests 64] [--concurrency 1 2 4 8 16 32]
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableLambda
+
+import main
+from myutils.chain_builder import build_chain
+from myutils.fake_models import FakeLatencyChatModel
+
+STUB_DOCUMENTS = [
+    Document(page_content="Battery lasts all day. Camera is superb.",
+             metadata={"product_title": "Stub Phone (Black, 128 GB)", "product_price": "₹19,999"}),
+]
+
+
+async def _stub_retrieve(query):
+    return STUB_DOCUMENTS
+
+
+def install_stubs(latency):
+    main.chain = build_chain(
+        RunnableLambda(lambda query: STUB_DOCUMENTS, afunc=_stub_retrieve),
+        FakeLatencyChatModel(latency=latency),
+    )
+    main.response_cache = None
+
+
+async def run_level(client, concurrency, total):
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(f"question {i}")
+    latencies = []
+
+    async def worker():
+        while not queue.empty():
+            question = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.post("/chat", json={"query": question})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return total / elapsed, sorted(latencies)[len(latencies) // 2]
+
+
+async def run(args):
+    install_stubs(args.latency)
+    main.chat_semaphore = asyncio.Semaphore(max(args.concurrency))
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        baseline = None
+        for concurrency in args.concurrency:
+            throughput, p50 = await run_level(client, concurrency, args.requests)
+            baseline = baseline or throughput
+            print(f"concurrency {concurrency:>3}: {throughput:>7.2f} req/s  "
+                  f"(x{throughput / baseline:>5.1f})  p50 {p50 * 1000:>7.1f} ms")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub LLM latency in seconds")
+    parser.add_argument("--requests", type=int, default=64, help="requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
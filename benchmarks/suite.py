@@ -0,0 +1,308 @@
+"""
+Offline end-to-end performance suite: no Gemini or AstraDB credentials needed.
+
+The app runs with deterministic stand-ins, swapped in through config:
+fake embeddings and a fixed-latency fake LLM (via ModelLoader), and the
+in-memory vector store (via load_vector_store, which Retriever uses). All
+on-disk state goes to a temporary directory.
+
+Stages:
+  scraper    scrape saved Flipkart HTML from a local HTTP server, cold and
+             with a warm page cache
+  ingestion  ingest a catalog CSV, first as a full load, then as an
+             incremental no-op run
+  chat       replay a JSONL request log ({"endpoint", "query"} per line)
+             against the FastAPI app at each concurrency level and report
+             p50/p95/p99 latency and throughput
+
+Results are written to benchmarks/results/<timestamp>.json and compared with
+a stored baseline. A metric that is worse than the baseline by more than
+--tolerance is reported as a regression.
+
+Usage (from the repository root):
+    python -m benchmarks.suite [--concurrency 1 4 16] [--llm-latency 0.2]
+        [--catalog-rows 0] [--save-baseline] [--fail-on-regression]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+import httpx
+
+from myutils.config_loader import load_config
+from myutils.settings import ENV_VARS, Settings, get_settings, set_settings
+
+BENCHMARK_DIR = os.path.dirname(__file__)
+DEFAULT_REQUESTS = os.path.join(BENCHMARK_DIR, "fixtures", "requests.jsonl")
+DEFAULT_CATALOG = os.path.join(os.path.dirname(BENCHMARK_DIR), "flipkart_data.csv")
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+
+def deep_merge(base: dict, overrides: dict) -> dict:
+    merged = dict(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def install_offline_settings(workdir: str, args) -> Settings:
+    """
+    Point every provider at its offline stand-in and every path at `workdir`.
+    """
+    overrides = {
+        "embedding_model": {"provider": "fake", "model_name": "fake-embeddings", "latency": args.embed_latency},
+        "llm": {"default": "fake", "fake": {"provider": "fake", "latency": args.llm_latency}},
+        "vector_store": {"backend": "memory", "memory": {"name": "benchmark"}},
+        "retriever": {"hybrid": {"bm25_path": os.path.join(workdir, "bm25_index")}},
+        "scraper": {"output_path": os.path.join(workdir, "flipkart_realtime_scrape.csv")},
+        "catalog": {"path": os.path.join(workdir, "catalog")},
+        "ingestion": {
+            "manifest_path": os.path.join(workdir, "ingestion_manifest.json"),
+            "checkpoint_path": os.path.join(workdir, "ingestion_checkpoint.log"),
+            "chunking": {"parent_store_path": os.path.join(workdir, "parent_store.sqlite")},
+        },
+        "embedding_cache": {"path": os.path.join(workdir, "embedding_cache")},
+        "page_cache": {"path": os.path.join(workdir, "page_cache.sqlite")},
+        "jobs": {"store_path": os.path.join(workdir, "jobs.sqlite"),
+                 "index_lock_path": os.path.join(workdir, "index.lock")},
+        "serving": {"index_version_path": os.path.join(workdir, "index_version.json")},
+        "response_cache": {"enabled": args.response_cache},
+        "chat": {"max_concurrency": max(args.concurrency)},
+        "startup": {"warm_up": False},
+    }
+    # No credentials: anything that still reaches for a real service fails loudly
+    settings = Settings(deep_merge(load_config(), overrides), dict.fromkeys(ENV_VARS))
+    set_settings(settings)
+    return settings
+
+
+def percentiles(latencies) -> dict:
+    ordered = sorted(latencies)
+    if not ordered:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+
+    def pick(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 2)
+
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+def bench_scraper(args) -> dict:
+    from benchmarks.fixture_server import FixtureServer
+    from Collection.fetcher import PageFetcher
+    from Collection.flipkart_scrapper import FlipkartScraper
+    from Collection.page_cache import PageCache
+
+    config = get_settings().config
+    results = {}
+    with FixtureServer(latency=args.page_latency) as server:
+        cache = PageCache.from_config(config)
+        for label in ["cold", "warm_cache"]:
+            pages = 0
+            start = time.perf_counter()
+            for _ in range(args.scrape_repeat):
+                fetcher = PageFetcher.from_config(config, cache=cache if label == "warm_cache" else None)
+                scraper = FlipkartScraper("phones", fetcher=fetcher, site_url=server.url)
+                pages += len(scraper.scrape_products()) + 1  # product pages plus the search page
+                fetcher.close()
+            elapsed = time.perf_counter() - start
+            results[label] = {"pages": pages, "seconds": round(elapsed, 3),
+                              "pages_per_sec": round(pages / elapsed, 2)}
+            if label == "cold":
+                # Prime the cache so the warm run revalidates instead of downloading
+                fetcher = PageFetcher.from_config(config, cache=cache)
+                FlipkartScraper("phones", fetcher=fetcher, site_url=server.url).scrape_products()
+                fetcher.close()
+        if cache is not None:
+            results["warm_cache"]["cache_hit_rate"] = round(cache.hit_rate(), 4)
+            cache.close()
+    return results
+
+
+def bench_ingestion(args, workdir: str) -> dict:
+    from data_ingestion.ingestion_pipeline import DataIngestion
+
+    csv_path = args.catalog
+    if args.catalog_rows:
+        from benchmarks.bench_transform import write_synthetic_catalog
+        csv_path = os.path.join(workdir, "catalog.csv")
+        write_synthetic_catalog(csv_path, args.catalog_rows)
+
+    results = {}
+    for label in ["full", "incremental"]:
+        start = time.perf_counter()
+        counts = DataIngestion(csv_path=csv_path).run_pipeline()
+        elapsed = time.perf_counter() - start
+        written = counts["inserted"] + counts["updated"]
+        results[label] = {**counts, "seconds": round(elapsed, 3),
+                          "docs_per_sec": round(written / elapsed, 2) if written else None}
+    return results
+
+
+def load_requests(path: str):
+    with open(path, "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+async def replay(client, requests, concurrency: int, rounds: int) -> dict:
+    queue = asyncio.Queue()
+    for _ in range(rounds):
+        for request in requests:
+            queue.put_nowait(request)
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            request = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.post(request.get("endpoint", "/chat"), json={"query": request["query"]})
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {"requests": len(latencies) + errors, "errors": errors,
+            "throughput_rps": round(len(latencies) / elapsed, 2), **percentiles(latencies)}
+
+
+async def bench_chat(args) -> dict:
+    import main
+
+    main.load_serving_components()
+    main.chat_semaphore = asyncio.Semaphore(max(args.concurrency))
+    requests = load_requests(args.requests)
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for concurrency in args.concurrency:
+            results[f"c{concurrency}"] = await replay(client, requests, concurrency, args.rounds)
+            print(f"chat concurrency {concurrency}: {results[f'c{concurrency}']}")
+    return results
+
+
+# (path into the results, True if higher is better)
+TRACKED_METRICS = {
+    "scraper.cold.pages_per_sec": True,
+    "scraper.warm_cache.pages_per_sec": True,
+    "ingestion.full.docs_per_sec": True,
+    "ingestion.incremental.seconds": False,
+}
+
+
+def tracked_metrics(results: dict) -> dict:
+    metrics = dict(TRACKED_METRICS)
+    for level in results.get("chat", {}):
+        metrics[f"chat.{level}.throughput_rps"] = True
+        for name in ["p50_ms", "p95_ms", "p99_ms"]:
+            metrics[f"chat.{level}.{name}"] = False
+    return metrics
+
+
+def lookup(results: dict, path: str):
+    value = results
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Print current vs. baseline for every tracked metric and return the ones
+    that got worse by more than `tolerance` (a fraction).
+    """
+    regressions = []
+    print(f"\n{'metric':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for path, higher_is_better in tracked_metrics(results).items():
+        current, previous = lookup(results, path), lookup(baseline, path)
+        if current is None or not previous:
+            continue
+        change = (current - previous) / previous
+        worse = -change if higher_is_better else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        print(f"{path:<40} {previous:>12.2f} {current:>12.2f} {change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(path)
+    return regressions
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", default=["scraper", "ingestion", "chat"],
+                        choices=["scraper", "ingestion", "chat"])
+    parser.add_argument("--requests", default=DEFAULT_REQUESTS, help="JSONL request log to replay")
+    parser.add_argument("--rounds", type=int, default=5, help="times the request log is replayed per level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake LLM latency in seconds")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="fake embedding latency per call")
+    parser.add_argument("--page-latency", type=float, default=0.02, help="fixture server latency per page")
+    parser.add_argument("--scrape-repeat", type=int, default=5)
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG, help="catalog CSV to ingest")
+    parser.add_argument("--catalog-rows", type=int, default=0, help="ingest a synthetic catalog of N rows instead")
+    parser.add_argument("--response-cache", action="store_true", help="keep the /chat response cache enabled")
+    parser.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        install_offline_settings(workdir, args)
+        results = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": git_commit(),
+                   "args": {key: value for key, value in vars(args).items()
+                            if key not in {"results_dir", "baseline", "save_baseline", "fail_on_regression"}}}
+        if "scraper" in args.stages:
+            results["scraper"] = bench_scraper(args)
+        # The chat stage serves whatever ingestion loaded into the in-memory store
+        if "ingestion" in args.stages or "chat" in args.stages:
+            results["ingestion"] = bench_ingestion(args, workdir)
+        if "chat" in args.stages:
+            results["chat"] = asyncio.run(bench_chat(args))
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    results_path = os.path.join(args.results_dir, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(results_path, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2, ensure_ascii=False)
+    print(f"\nResults written to {results_path}")
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, ensure_ascii=False)
+        print(f"Saved baseline to {args.baseline}")
+    if regressions and args.fail_on_regression:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
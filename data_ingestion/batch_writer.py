@@ -0,0 +1,198 @@
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List
+
+from langchain_core.documents import Document
+
+from data_ingestion.manifest import content_hash
+from myutils.jobs import report_progress
+from myutils.tracing import span
+
+
+class WriteCheckpoint:
+    """
+    Records which batches of a write have been committed, so an interrupted
+    ingest can skip them when it is re-run. Batches are identified by a hash
+    of their document IDs and contents, so the checkpoint stays valid as long
+    as the input is the same.
+
+    The file is an append-only log with one batch key per line, so marking a
+    batch costs one short write however many batches came before it. A line
+    cut short by a crash is ignored on load.
+    """
+
+    KEY_LENGTH = 64  # Hex SHA-256
+
+    def __init__(self, path: str):
+        self.path = path
+        self.committed = set()
+        self._file = None
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                self.committed = {line.strip() for line in file if len(line.strip()) == self.KEY_LENGTH}
+
+    @staticmethod
+    def batch_key(documents: List[Document]) -> str:
+        digest = hashlib.sha256()
+        for document in documents:
+            digest.update(f"{document.id}:{content_hash(document)};".encode("utf-8"))
+        return digest.hexdigest()
+
+    def mark(self, key: str):
+        self.committed.add(key)
+        if not self.path:
+            return
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(f"{key}\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def clear(self):
+        self.committed = set()
+        self.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class BatchedVectorWriter:
+    """
+    Writes documents to a vector store in fixed-size batches on a thread pool.
+
+    At most `max_in_flight` batches are queued or running at once, so a slow
+    store throttles how fast the input is consumed. Failed batches are retried
+    with exponential backoff, committed batches are checkpointed, and progress
+    is reported in docs/sec.
+    """
+
+    def __init__(self, vstore, batch_size: int = 64, max_concurrency: int = 4, max_in_flight: int = None,
+                 max_retries: int = 3, backoff_base: float = 1.0, checkpoint_path: str = None):
+        self.vstore = vstore
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_in_flight = max_in_flight or 2 * max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.checkpoint = WriteCheckpoint(checkpoint_path)
+
+        self._lock = threading.Lock()
+        self._written = 0
+        self._skipped = 0
+        self._batches = 0
+        self._start = None
+
+    @classmethod
+    def from_config(cls, vstore, config: dict):
+        """
+        Build a writer from the `ingestion` section of config.yaml.
+        """
+        ingestion_config = config.get("ingestion", {})
+        return cls(
+            vstore,
+            batch_size=ingestion_config.get("batch_size", 64),
+            max_concurrency=ingestion_config.get("max_concurrency", 4),
+            max_in_flight=ingestion_config.get("max_in_flight_batches"),
+            max_retries=ingestion_config.get("max_retries", 3),
+            checkpoint_path=ingestion_config.get("checkpoint_path", "Data/ingestion_checkpoint.log"),
+        )
+
+    @staticmethod
+    def _batches_of(documents: Iterable[Document], size: int):
+        batch = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def add_batch(self, batch: List[Document]) -> List[str]:
+        """
+        Write one batch, retrying with exponential backoff.
+        """
+        attempt = 0
+        while True:
+            try:
+                # Includes the "ingest.embed" time of the batch
+                with span("ingest.write"):
+                    return self.vstore.add_documents(batch, ids=[document.id for document in batch])
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = random.uniform(0, self.backoff_base * (2 ** attempt))
+                print(f"Batch of {len(batch)} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    def _write_batch(self, batch: List[Document], key: str) -> List[str]:
+        ids = self.add_batch(batch)
+        with self._lock:
+            self.checkpoint.mark(key)
+            self._written += len(batch)
+            self._batches += 1
+            elapsed = time.perf_counter() - self._start
+            print(f"Committed batch {self._batches}: {self._written} docs written "
+                  f"({self._written / elapsed:.1f} docs/sec)")
+        return ids
+
+    def write(self, documents: Iterable[Document]) -> dict:
+        """
+        Write all documents (each with its `id` set) and return a summary.
+        Raises the last error if a batch still fails after all retries; the
+        checkpoint keeps the batches committed before it.
+        """
+        self._start = time.perf_counter()
+        self._written = self._skipped = self._batches = 0
+        in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        inserted_ids = []
+        futures = []
+        failures = []
+
+        def release(future):
+            if future.exception() is not None:
+                failures.append(future.exception())
+            in_flight.release()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="vstore-writer") as executor:
+                for batch in self._batches_of(documents, self.batch_size):
+                    key = self.checkpoint.batch_key(batch)
+                    if key in self.checkpoint.committed:
+                        self._skipped += len(batch)
+                        continue
+                    in_flight.acquire()  # Backpressure: wait for a free in-flight slot
+                    future = executor.submit(self._write_batch, batch, key)
+                    future.add_done_callback(release)
+                    futures.append(future)
+                    report_progress("write", self._written)  # Also where a cancelled ingest job stops
+                    if failures:
+                        break  # Stop feeding batches; committed ones stay checkpointed
+        finally:
+            self.checkpoint.close()
+
+        if failures:
+            raise failures[0]
+        for future in futures:
+            inserted_ids.extend(future.result())
+
+        self.checkpoint.clear()
+        elapsed = time.perf_counter() - self._start
+        summary = {
+            "written": self._written,
+            "resumed_from_checkpoint": self._skipped,
+            "docs_per_sec": round(self._written / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+        print(f"Vector store write complete: {summary}")
+        return {"ids": inserted_ids, **summary}
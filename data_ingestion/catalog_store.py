@@ -0,0 +1,240 @@
+import os
+import re
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from langchain_core.documents import Document
+
+from data_ingestion.document_builder import EXPECTED_COLUMNS, METADATA_COLUMNS, REVIEW_COLUMN, record_document
+
+CATALOG_COLUMNS = METADATA_COLUMNS + [REVIEW_COLUMN]
+SCHEMA = pa.schema([(column, pa.string()) for column in CATALOG_COLUMNS])
+
+# One scrape of one category: <root>/category=<slug>/scraped_at=<UTC time>/part-<id>.arrow
+Partition = namedtuple("Partition", ["category", "scraped_at", "path"])
+
+
+def category_slug(category: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", category.lower()).strip("-") or "uncategorized"
+
+
+class CatalogWriter:
+    """
+    Writes one partition in record batches of `batch_rows`. The file only
+    appears under its final name on close(), so readers never see a partial
+    scrape; abort() (or an exception inside a `with` block) discards it, and
+    so does closing a partition without rows, so a failed or blocked scrape
+    never replaces its category's products with nothing.
+    """
+
+    def __init__(self, path: str, batch_rows: int = 1000, compression: str = None):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.rows = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._tmp_path = f"{path}.tmp"
+        self._sink = pa.OSFile(self._tmp_path, "wb")
+        self._writer = ipc.new_file(self._sink, SCHEMA, options=ipc.IpcWriteOptions(compression=compression))
+        self._pending = []
+
+    def write(self, record: dict):
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_rows:
+            self._flush()
+
+    def write_many(self, records: Iterable[dict]):
+        for record in records:
+            self.write(record)
+
+    def write_batch(self, batch: pa.RecordBatch):
+        """
+        Write a record batch with the catalog schema as is.
+        """
+        self._flush()
+        self._writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def _flush(self):
+        if not self._pending:
+            return
+        columns = {column: [_text(record.get(column)) for record in self._pending] for column in CATALOG_COLUMNS}
+        self._writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=SCHEMA))
+        self.rows += len(self._pending)
+        self._pending = []
+
+    def close(self) -> Optional[str]:
+        """
+        Publish the partition and return its path, or None if it has no rows.
+        """
+        self._flush()
+        self._writer.close()
+        self._sink.close()
+        if not self.rows:
+            os.remove(self._tmp_path)
+            return None
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self):
+        self._writer.close()
+        self._sink.close()
+        os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _has_rows(path: str) -> bool:
+    # From the footer: the writer never writes an empty record batch
+    with pa.memory_map(path) as source:
+        return ipc.open_file(source).num_record_batches > 0
+
+
+def _text(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+class CatalogStore:
+    """
+    Append-only product catalog in Arrow IPC files, partitioned by category
+    and scrape time.
+
+    Every scrape adds a partition, so scraping one category leaves the others
+    untouched. The current catalog is the latest partition of each category.
+    Reads memory-map the files and select only the requested columns, so
+    unused columns are never paged in. Compression shrinks the files but
+    makes reads decompress the selected columns instead of mapping them.
+    """
+
+    def __init__(self, root: str = "Data/catalog", batch_rows: int = 1000, compression: str = None):
+        self.root = root
+        self.batch_rows = batch_rows
+        self.compression = compression
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Build from the `catalog` section of config.yaml, or return None when
+        the scraper's CSV is used instead.
+        """
+        catalog_config = config.get("catalog", {})
+        if not catalog_config.get("enabled", False):
+            return None
+        return cls(
+            root=catalog_config.get("path", "Data/catalog"),
+            batch_rows=catalog_config.get("batch_rows", 1000),
+            compression=catalog_config.get("compression"),
+        )
+
+    def writer(self, category: str, scraped_at: str = None) -> CatalogWriter:
+        """
+        Start a new partition for a scrape of `category`.
+        """
+        scraped_at = scraped_at or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        path = os.path.join(self.root, f"category={category_slug(category)}", f"scraped_at={scraped_at}",
+                            f"part-{uuid.uuid4().hex[:8]}.arrow")
+        return CatalogWriter(path, batch_rows=self.batch_rows, compression=self.compression)
+
+    def append(self, category: str, records: Iterable[dict], scraped_at: str = None) -> Optional[str]:
+        """
+        Write `records` as a new partition and return its path, or None when
+        there were no records.
+        """
+        with self.writer(category, scraped_at) as writer:
+            writer.write_many(records)
+        return writer.path if writer.rows else None
+
+    def import_csv(self, csv_path: str, category: str, chunksize: int = 10_000) -> Optional[str]:
+        """
+        Copy a scraper CSV into a partition of `category`, as text.
+        """
+        import pandas as pd
+
+        with self.writer(category) as writer:
+            for chunk in pd.read_csv(csv_path, usecols=CATALOG_COLUMNS, chunksize=chunksize, dtype=str):
+                writer.write_batch(pa.RecordBatch.from_pandas(chunk[CATALOG_COLUMNS], schema=SCHEMA,
+                                                              preserve_index=False))
+        return writer.path if writer.rows else None
+
+    def partitions(self, category: str = None) -> List[Partition]:
+        """
+        All partitions, oldest first within each category.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        slugs = [f"category={category_slug(category)}"] if category else sorted(os.listdir(self.root))
+        found = []
+        for slug_dir in slugs:
+            category_dir = os.path.join(self.root, slug_dir)
+            if not slug_dir.startswith("category=") or not os.path.isdir(category_dir):
+                continue
+            for scrape_dir in sorted(os.listdir(category_dir)):
+                for name in sorted(os.listdir(os.path.join(category_dir, scrape_dir))):
+                    if name.endswith(".arrow"):
+                        found.append(Partition(slug_dir[len("category="):], scrape_dir[len("scraped_at="):],
+                                               os.path.join(category_dir, scrape_dir, name)))
+        return found
+
+    def latest_partitions(self) -> List[Partition]:
+        """
+        The partitions of each category's most recent scrape. Empty
+        partitions, which older versions wrote for scrapes that found
+        nothing, are skipped.
+        """
+        partitions = [partition for partition in self.partitions() if _has_rows(partition.path)]
+        latest = {}
+        for partition in partitions:
+            latest[partition.category] = max(latest.get(partition.category, ""), partition.scraped_at)
+        return [partition for partition in partitions if latest[partition.category] == partition.scraped_at]
+
+    def validate(self, partitions: List[Partition] = None):
+        """
+        Check every partition's schema from its footer, without reading rows.
+        """
+        for partition in self.latest_partitions() if partitions is None else partitions:
+            with pa.memory_map(partition.path) as source:
+                names = set(ipc.open_file(source).schema.names)
+            if not EXPECTED_COLUMNS.issubset(names):
+                raise ValueError(f"Catalog partition {partition.path} must contain columns: {EXPECTED_COLUMNS}")
+
+    def scan(self, columns: List[str] = None, partitions: List[Partition] = None) -> Iterator[pa.RecordBatch]:
+        """
+        Memory-mapped record batches of the given partitions (by default the
+        latest scrape of each category), projected to `columns`.
+        """
+        for partition in self.latest_partitions() if partitions is None else partitions:
+            with pa.memory_map(partition.path) as source:
+                reader = ipc.open_file(source)
+                for index in range(reader.num_record_batches):
+                    batch = reader.get_batch(index)
+                    yield batch.select(columns) if columns else batch
+
+    def iter_records(self, columns: List[str] = None, partitions: List[Partition] = None) -> Iterator[dict]:
+        for batch in self.scan(columns, partitions):
+            yield from batch.to_pylist()
+
+    def read(self, columns: List[str] = None, partitions: List[Partition] = None) -> pa.Table:
+        batches = list(self.scan(columns, partitions))
+        schema = pa.schema([SCHEMA.field(column) for column in columns]) if columns else SCHEMA
+        return pa.Table.from_batches(batches, schema=schema)
+
+
+def catalog_documents(store: CatalogStore, partitions: List[Partition] = None) -> Iterator[Document]:
+    """
+    Stream product documents from the catalog, one record batch at a time,
+    cleaned the same way as rows of the scraper CSV.
+    """
+    for record in store.iter_records(CATALOG_COLUMNS, partitions):
+        yield record_document(record)
@@ -0,0 +1,110 @@
+import hashlib
+from typing import Dict, Iterable, Iterator, List
+
+from langchain_core.documents import Document
+
+from data_ingestion.document_builder import NO_REVIEWS
+from retriever.context_assembler import split_sentences
+
+
+def chunk_id(text: str) -> str:
+    """
+    Content-addressed chunk ID, so identical review text shared by several
+    SKU variants maps to one vector-store document.
+    """
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha1(f"chunk:{normalized}".encode("utf-8")).hexdigest()
+
+
+class ReviewChunker:
+    """
+    Splits a product's concatenated reviews into chunks of at most
+    `max_chars`, packing whole sentences and hard-splitting on words only
+    when a single sentence is longer than the limit.
+    """
+
+    def __init__(self, max_chars: int = 600):
+        self.max_chars = max_chars
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Build from `ingestion.chunking` in config.yaml, or return None when
+        products are stored as single documents.
+        """
+        chunking_config = config.get("ingestion", {}).get("chunking", {})
+        if not chunking_config.get("enabled", False):
+            return None
+        return cls(max_chars=chunking_config.get("max_chars", 600))
+
+    def _pieces(self, sentence: str) -> Iterator[str]:
+        if len(sentence) <= self.max_chars:
+            yield sentence
+            return
+        piece = []
+        length = 0
+        for word in sentence.split():
+            if piece and length + len(word) + 1 > self.max_chars:
+                yield " ".join(piece)
+                piece, length = [], 0
+            piece.append(word)
+            length += len(word) + 1
+        if piece:
+            yield " ".join(piece)
+
+    def split(self, reviews: str) -> List[str]:
+        if not reviews or reviews == NO_REVIEWS:
+            return []
+        chunks = []
+        current = ""
+        for sentence in split_sentences(reviews):
+            for piece in self._pieces(sentence):
+                candidate = f"{current}. {piece}" if current else piece
+                if len(candidate) <= self.max_chars:
+                    current = candidate
+                else:
+                    chunks.append(current)
+                    current = piece
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def texts(self, product: Document) -> List[str]:
+        """
+        Chunks for a product; products without reviews get one chunk of title
+        and highlights so they stay reachable by vector search.
+        """
+        chunks = self.split(product.page_content)
+        if chunks:
+            return chunks
+        summary = ". ".join(str(product.metadata.get(field, "")) for field in ["product_title", "product_highlights"])
+        return [summary[:self.max_chars]] if summary.strip(". ") else []
+
+    def link(self, products: Iterable[Document]) -> Iterator[tuple]:
+        """
+        First pass over the products (with `id` set): yield parent-store rows
+        (parent_id, metadata, chunk_ids) and record which parents reference
+        each chunk in `self.parents_of`.
+        """
+        self.parents_of: Dict[str, List[str]] = {}
+        for product in products:
+            chunk_ids = list(dict.fromkeys(chunk_id(text) for text in self.texts(product)))
+            for cid in chunk_ids:
+                self.parents_of.setdefault(cid, []).append(product.id)
+            yield product.id, product.metadata, chunk_ids
+
+    def chunks(self, products: Iterable[Document]) -> Iterator[Document]:
+        """
+        Second pass: yield each distinct chunk once, carrying the IDs of every
+        parent that references it.
+        """
+        emitted = set()
+        for product in products:
+            for text in self.texts(product):
+                cid = chunk_id(text)
+                if cid in emitted:
+                    continue
+                emitted.add(cid)
+                # Sorted so the chunk's content hash doesn't depend on product order
+                parent_ids = sorted(self.parents_of.get(cid, [product.id]))
+                yield Document(id=cid, page_content=text, metadata={"parent_ids": parent_ids})
@@ -0,0 +1,63 @@
+from typing import Iterator
+
+import pandas as pd
+from langchain_core.documents import Document
+
+from myutils.attribute_parser import numeric_attributes
+
+METADATA_COLUMNS = ["product_title", "product_price", "product_rating",
+                    "product_highlights", "product_description", "product_link"]
+REVIEW_COLUMN = "product_reviews"
+EXPECTED_COLUMNS = set(METADATA_COLUMNS) | {REVIEW_COLUMN}
+NO_REVIEWS = "No reviews available."
+
+
+def validate_columns(csv_path: str):
+    """
+    Check the CSV header without reading the body of the file.
+    """
+    header = pd.read_csv(csv_path, nrows=0)
+    if not EXPECTED_COLUMNS.issubset(set(header.columns)):
+        raise ValueError(f"CSV must contain columns: {EXPECTED_COLUMNS}")
+
+
+def iter_documents(csv_path: str, chunksize: int = 10_000) -> Iterator[Document]:
+    """
+    Stream product documents from the CSV one chunk at a time.
+
+    Missing values (empty cells and "NA", which pandas reads as NaN) become
+    empty metadata strings, and missing reviews become a placeholder. Cleaning
+    is done per column on each chunk, so memory use is bounded by `chunksize`
+    rather than by the size of the file. Typed price, rating, RAM and
+    storage fields are added next to the display strings for filtering.
+    """
+    columns = METADATA_COLUMNS + [REVIEW_COLUMN]
+    # Read as text so metadata matches the scraped strings (record_document)
+    for chunk in pd.read_csv(csv_path, usecols=columns, chunksize=chunksize, dtype=str):
+        metadata = chunk[METADATA_COLUMNS].astype(object)
+        metadata = metadata.where(metadata.notna(), "")
+        reviews = chunk[REVIEW_COLUMN].astype(object).where(chunk[REVIEW_COLUMN].notna(), NO_REVIEWS)
+
+        values = [metadata[column].tolist() for column in METADATA_COLUMNS]
+        for review, *row in zip(reviews.tolist(), *values):
+            yield product_document(dict(zip(METADATA_COLUMNS, row)), review)
+
+
+def product_document(fields: dict, review: str) -> Document:
+    """
+    Product Document from cleaned metadata fields and review text, with the
+    typed attributes added.
+    """
+    fields.update(numeric_attributes(fields))
+    return Document(page_content=review, metadata=fields)
+
+
+def record_document(record: dict) -> Document:
+    """
+    Product Document from one scraped record, with missing values ("NA" or
+    empty) handled the same way iter_documents handles them in the CSV.
+    """
+    missing = lambda value: value is None or value == "NA" or value == ""
+    fields = {column: "" if missing(record.get(column)) else record[column] for column in METADATA_COLUMNS}
+    review = record.get(REVIEW_COLUMN)
+    return product_document(fields, NO_REVIEWS if missing(review) else review)
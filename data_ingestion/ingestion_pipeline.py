@@ -1,52 +1,65 @@
 import os
-import pandas as pd
-import numpy as np
-from dotenv import load_dotenv
-from typing import List, Tuple
+import itertools
+from typing import Iterable, Iterator
 from langchain_core.documents import Document
-from langchain_astradb import AstraDBVectorStore
 from myutils.model_loader import ModelLoader
-from myutils.config_loader import load_config
+from myutils.settings import get_settings
+from myutils.jobs import report_progress
+from myutils.tracing import TimedEmbeddings, timed_iter
+from myutils.vector_store_loader import load_vector_store, required_env_vars, vector_store_backend, vector_store_id
+from data_ingestion.manifest import IngestionManifest, document_id
+from data_ingestion.batch_writer import BatchedVectorWriter
+from data_ingestion.document_builder import iter_documents, validate_columns
+from data_ingestion.catalog_store import CatalogStore, catalog_documents
+from data_ingestion.near_duplicates import ClusterEmbeddings, NearDuplicateIndex
+from data_ingestion.chunking import ReviewChunker
+from retriever.bm25_index import BM25Index
+from retriever.parent_store import ParentStore
 
 class DataIngestion:
     """
-    Class to handle data transformation and ingestion into Astra DB vector store.
+    Class to handle data transformation and ingestion into the configured vector store.
     """
 
-    def __init__(self):
+    def __init__(self, csv_path: str = None):
         """
-        Initiate environment variables, embedding model and set CSV file path
+        Initiate environment variables, embedding model and the data source:
+        an explicit CSV file, else the catalog store when it is enabled, else
+        the scraper's output CSV
         """
         print("Initializing DataIngestion pipeline...")
         self.model_loader=ModelLoader()
+        self.settings=get_settings()
+        self.config=self.settings.config
         self._load_env_variables()
-        self.csv_path = self._get_csv_path()
-        self.product_data=self._load_csv()
-        self.config=load_config()
+        self.near_duplicates = None
+        self.cluster_embeddings = None
+        self.staged_parent_store = None
+        self.catalog = None if csv_path else CatalogStore.from_config(self.config)
+        if self.catalog is not None:
+            self.csv_path = None
+            self._load_catalog()
+        else:
+            self.csv_path = csv_path or self._get_csv_path()
+            self._load_csv()
 
     def _load_env_variables(self):
         """
         Load and validate required environment variables
         """
-        load_dotenv()
-        required_vars=["GOOGLE_API_KEY","ASTRA_DB_API_ENDPOINT","ASTRA_DB_APPLICATION_TOKEN",
-                       "ASTRA_DB_KEYSPACE"]
-        
-        missing_vars=[var for var in required_vars if os.getenv(var) is None]
-        if missing_vars:
-            raise EnvironmentError(f"Missing environment variables: {missing_vars}")
-        
-        self.google_api_key=os.getenv("GOOGLE_API_KEY")
-        self.db_api_endpoint=os.getenv("ASTRA_DB_API_ENDPOINT")
-        self.db_application_token=os.getenv("ASTRA_DB_APPLICATION_TOKEN")
-        self.db_keyspace=os.getenv("ASTRA_DB_KEYSPACE")
+        self.settings.require(required_env_vars(self.config))
+
+        self.google_api_key=self.settings.env["GOOGLE_API_KEY"]
+        self.db_api_endpoint=self.settings.env["ASTRA_DB_API_ENDPOINT"]
+        self.db_application_token=self.settings.env["ASTRA_DB_APPLICATION_TOKEN"]
+        self.db_keyspace=self.settings.env["ASTRA_DB_KEYSPACE"]
 
     def _get_csv_path(self):
         """
-        Get path to the csv file located inside 'data' folder
+        Get path to the scraper's output CSV (`scraper.output_path`)
         """
         current_dir=os.getcwd()
-        csv_path=os.path.join(current_dir,"data","flipkart_realtime_scrape.csv")
+        csv_path=os.path.join(current_dir,self.config.get("scraper", {}).get("output_path", "Data/flipkart_realtime_scrape.csv"))
 
         if not os.path.exists(csv_path):
             raise FileNotFoundError(f"CSV file not found at : {csv_path}")
@@ -55,79 +68,180 @@ class DataIngestion:
 
     def _load_csv(self):
         """
-        Load product data from CSV.
+        Validate the CSV columns. Rows are streamed later by transform_data.
         """
-        df=pd.read_csv(self.csv_path)
-        expected_columns={'product_title', 'product_price', 'product_rating',
-       'product_highlights', 'product_description', 'product_reviews',
-       'product_link'}
+        validate_columns(self.csv_path)
 
-        if not expected_columns.issubset(set(df.columns)):
-            raise ValueError(f"CSV must contain columns: {expected_columns}")
-        
-        return df
+    def _load_catalog(self):
+        """
+        Validate the schemas of the current catalog partitions from their file
+        footers. An empty catalog is seeded once from the scraper's CSV.
+        """
+        if not self.catalog.partitions():
+            csv_path=self._get_csv_path()
+            validate_columns(csv_path)
+            print(f"Catalog at {self.catalog.root} is empty; importing {csv_path}")
+            self.catalog.import_csv(csv_path, category="imported")
+        self.catalog.validate()
     
-    def transform_data(self):
-        product_list=[]
-        
-        for _,row in self.product_data.iterrows():
-            product_entry={
-                "product_title": row["product_title"],
-                "product_price": row["product_price"],
-                "product_rating": row["product_rating"],
-                "product_highlights": row["product_highlights"],
-                "product_reviews": row["product_reviews"],
-                "product_description": row["product_description"],
-                "product_link": row["product_link"]            
-                }
-            product_list.append(product_entry)
-
-        documents=[]
-        for entry in product_list:
-            metadata = {
-                "product_title": entry["product_title"],
-                "product_price": entry["product_price"],
-                "product_rating": entry["product_rating"],
-                "product_highlights": entry["product_highlights"],
-                "product_description": entry["product_description"],
-                "product_link": entry["product_link"]
-            }
-            for key, value in metadata.items():
-                if isinstance(value, float) and np.isnan(value):  # Check if it's NaN
-                    metadata[key] = ""  # Replace NaN with an empty string
-
-            review_content = entry.get("product_reviews", "")
-            if isinstance(review_content, float) and np.isnan(review_content):
-                review_content = "No reviews available."
-
-            doc = Document(page_content=review_content, metadata=metadata)
-            documents.append(doc)
-
-        return documents
+    def transform_data(self) -> Iterator[Document]:
+        """
+        Lazily build one Document per product row, reading the latest catalog
+        partition of each category, or the CSV in chunks. With near-duplicate
+        detection on, every pass clusters the products afresh, in input order,
+        and tags them with `cluster_id` and `is_canonical`.
+        """
+        if self.catalog is not None:
+            documents=catalog_documents(self.catalog)
+        else:
+            chunksize=self.config.get("ingestion", {}).get("csv_chunksize", 10000)
+            documents=iter_documents(self.csv_path, chunksize=chunksize)
+        self.near_duplicates=NearDuplicateIndex.from_config(self.config)
+        if self.near_duplicates is None:
+            return documents
+        return map(self.near_duplicates.annotate, documents)
+
+    def unique_products(self) -> Iterator[Document]:
+        """
+        Product documents with their IDs set, keeping the first row per product.
+        """
+        seen=set()
+        for document in self.transform_data():
+            document.id=document_id(document.metadata)
+            if document.id not in seen:
+                seen.add(document.id)
+                yield document
+
+    def chunk_documents(self, chunker: ReviewChunker) -> Iterator[Document]:
+        """
+        Stage product metadata in a new parent store, then lazily yield each
+        distinct review chunk once with the IDs of the products sharing it.
+        The staged store replaces the live one in publish_parent_store, once
+        the chunks are written.
+        """
+        path=self.config["ingestion"]["chunking"].get("parent_store_path", "Data/parent_store.sqlite")
+        staging_path=f"{path}.staging"
+        if os.path.exists(staging_path):
+            os.remove(staging_path)  # Left by a failed or cancelled run
+        parent_store=ParentStore(staging_path)
+        parent_store.replace_all(chunker.link(self.unique_products()))
+        self.staged_parent_store=(staging_path, path)
+        shared=sum(1 for parent_ids in chunker.parents_of.values() if len(parent_ids) > 1)
+        print(f"Chunked {len(parent_store)} products into {len(chunker.parents_of)} distinct chunks "
+              f"({shared} shared across variants)")
+        parent_store.close()
+        return chunker.chunks(self.unique_products())
+
+    def publish_parent_store(self):
+        """
+        Atomically replace the live parent store with the staged one. Readers
+        keep the store they opened until they reload.
+        """
+        if self.staged_parent_store is None:
+            return
+        staging_path, path=self.staged_parent_store
+        os.replace(staging_path, path)
+        self.staged_parent_store=None
         
-    def store_in_vector_db(self,documents: List[Document]):
+    def _load_vector_store(self, chunked: bool = False):
         """
-        Store documents into AstraDB vector store
+        Vector store for writing. Whole products in a near-duplicate cluster
+        share one embedding; review chunks are already shared by exact text.
         """
-        collection_name=self.config["astra_db"]["collection_name"]
-        vstore=AstraDBVectorStore(
-            embedding=self.model_loader.load_embeddings(),
-            collection_name=collection_name,
-            api_endpoint=self.db_api_endpoint,
-            token=self.db_application_token,
-            namespace=self.db_keyspace
-            )
-        inserted_ids=vstore.add_documents(documents)
-        print(f"Successfully inserted {len(inserted_ids)} documents into AstraDB")
+        embeddings=TimedEmbeddings(self.model_loader.load_embeddings(), "ingest.embed")
+        if self.near_duplicates is not None and not chunked:
+            embeddings=self.cluster_embeddings=ClusterEmbeddings(embeddings, self.near_duplicates)
+        return load_vector_store(self.config, embeddings)
+
+    def store_in_vector_db(self,documents: Iterable[Document], vstore=None):
+        """
+        Store documents into the vector store in checkpointed, parallel batches.
+        Documents whose IDs already exist in the collection are overwritten.
+        """
+        vstore=vstore or self._load_vector_store()
+        writer=BatchedVectorWriter.from_config(vstore, self.config)
+        result=writer.write(documents)
+        inserted_ids=result["ids"]
+        print(f"Successfully inserted {len(inserted_ids)} documents into the vector store")
         return vstore, inserted_ids
     
+    def compact_vector_store(self, vstore):
+        """
+        Compact the local vector store once rows tombstoned by updates and
+        deletes reach `vector_store.local.compact_dead_fraction` of it, so
+        re-ingests do not grow its files and filter scans without bound.
+        """
+        if vector_store_backend(self.config) != "local":
+            return
+        local_config=self.config.get("vector_store", {}).get("local", {})
+        threshold=local_config.get("compact_dead_fraction", 0.3)
+        if not threshold or vstore.dead_fraction() < threshold:
+            return
+        report_progress("compact")
+        vstore.compact(keep=local_config.get("keep_generations", 2))
+
+    def build_lexical_index(self, force: bool = False):
+        """
+        Rebuild the BM25 index used by hybrid retrieval from the products, keyed by
+        the same document IDs as the vector store.
+        """
+        hybrid_config=self.config.get("retriever", {}).get("hybrid", {})
+        if not hybrid_config.get("enabled", False):
+            return None
+        path=hybrid_config.get("bm25_path", "Data/bm25_index")
+        if not force and BM25Index.exists(path):
+            return None
+
+        index=BM25Index.build(self.unique_products())
+        index.save(path)
+        return index
+
     def run_pipeline(self):
         """
-        Run the full data ingestion pipeline : transform data and store into vector DB
+        Run the incremental ingestion pipeline: transform data, diff it against the
+        local manifest, and only embed and write new or changed documents.
+        With chunking enabled, the documents are review chunks linked to
+        parent products.
         """
+        manifest=IngestionManifest(
+            path=self.config.get("ingestion", {}).get("manifest_path", "Data/ingestion_manifest.json"),
+            collection_name=vector_store_id(self.config)
+            )
+        report_progress("transform")
+        chunker=ReviewChunker.from_config(self.config)
+        documents=self.chunk_documents(chunker) if chunker else self.transform_data()
+        plan=manifest.diff(timed_iter(documents, "ingest.transform"))
+
+        # Only connect to the store once there is something to write
+        upserts=plan.upserts()
+        first=next(upserts, None)
+        vstore=None
+        if first is not None:
+            vstore=self._load_vector_store(chunked=chunker is not None)
+            self.store_in_vector_db(itertools.chain([first], upserts), vstore=vstore)
+            if self.cluster_embeddings is not None:
+                print(f"Embedded {self.cluster_embeddings.embedded} texts, "
+                      f"reused {self.cluster_embeddings.reused} near-duplicate vectors")
+        if plan.deletes:
+            report_progress("delete", 0, len(plan.deletes))
+            vstore=vstore or self._load_vector_store(chunked=chunker is not None)
+            vstore.delete(ids=plan.deletes)
+            print(f"Deleted {len(plan.deletes)} documents from the vector store")
+        if vstore is not None:
+            self.compact_vector_store(vstore)
+        # Last cancellation point: past here the parents, manifest and BM25 index must all be updated
+        report_progress("index")
+        self.publish_parent_store()
+        if plan.changed:
+            manifest.apply(plan)
+            manifest.save()
+        self.build_lexical_index(force=plan.changed)
 
-        documents=self.transform_data()
-        vstore,inserted_ids = self.store_in_vector_db(documents)
+        counts=plan.counts()
+        if self.near_duplicates is not None:
+            print(f"Near-duplicate clusters: {self.near_duplicates.summary()}")
+        print(f"Ingestion summary: {counts}")
+        return counts
 
 
 if __name__=="__main__":
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Iterator, List
+
+from langchain_core.documents import Document
+
+from myutils.url_utils import normalize_product_url
+
+
+def document_id(metadata: dict) -> str:
+    """
+    Deterministic document ID derived from the normalized product link
+    (falling back to the title for rows without a link).
+    """
+    link = metadata.get("product_link") or ""
+    key = normalize_product_url(link) if link else f"title:{metadata.get('product_title', '')}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+# Near-duplicate tags depend on the order and scope of the run that clustered
+# the products, so a different canonical member alone is not a content change
+UNHASHED_METADATA = {"cluster_id", "is_canonical"}
+
+
+def content_hash(document: Document) -> str:
+    """
+    Hash of everything that is written to the vector store for a document,
+    except its near-duplicate cluster tags.
+    """
+    metadata = {key: value for key, value in document.metadata.items() if key not in UNHASHED_METADATA}
+    payload = json.dumps([document.page_content, metadata], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IngestionPlan:
+    """
+    Streaming diff of documents against the manifest.
+
+    `upserts()` yields new and changed documents (with their deterministic
+    `id` set, unless they arrive with one, as review chunks do) as the source
+    is consumed, counting unchanged ones; once it is exhausted, `deletes`
+    lists the IDs that no longer appear in the source.
+    """
+
+    def __init__(self, entries: Dict[str, str], documents: Iterable[Document]):
+        self._entries = entries
+        self._documents = documents
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deletes: List[str] = []
+        self.hashes: Dict[str, str] = {}
+
+    def upserts(self) -> Iterator[Document]:
+        for document in self._documents:
+            doc_id = document.id or document_id(document.metadata)
+            if doc_id in self.hashes:
+                continue  # Duplicate rows for one product: the first one wins
+            digest = content_hash(document)
+            self.hashes[doc_id] = digest
+            document.id = doc_id
+
+            previous = self._entries.get(doc_id)
+            if previous == digest:
+                self.unchanged += 1
+                continue
+            if previous is None:
+                self.inserted += 1
+            else:
+                self.updated += 1
+            yield document
+
+        self.deletes = [doc_id for doc_id in self._entries if doc_id not in self.hashes]
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.inserted or self.updated or self.deletes)
+
+    def counts(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "deleted": len(self.deletes),
+            "unchanged": self.unchanged,
+        }
+
+
+class IngestionManifest:
+    """
+    Local record of what has been written to a vector-store collection,
+    mapping each document ID to the content hash it was written with.
+    """
+
+    def __init__(self, path: str, collection_name: str):
+        self.path = path
+        self.collection_name = collection_name
+        self.entries: Dict[str, str] = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        # A manifest written for another collection says nothing about this one
+        if data.get("collection_name") == self.collection_name:
+            self.entries = data.get("documents", {})
+
+    def save(self):
+        """
+        Atomically write the manifest to disk.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"collection_name": self.collection_name, "documents": self.entries}, file)
+        os.replace(tmp_path, self.path)
+
+    def diff(self, documents: Iterable[Document]) -> IngestionPlan:
+        """
+        Start a streaming diff of `documents` against the manifest.
+        """
+        return IngestionPlan(self.entries, documents)
+
+    def apply(self, plan: IngestionPlan):
+        """
+        Record a plan whose writes and deletes have been committed.
+        """
+        for doc_id in plan.deletes:
+            self.entries.pop(doc_id, None)
+        self.entries.update(plan.hashes)
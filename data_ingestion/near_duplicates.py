@@ -0,0 +1,185 @@
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from data_ingestion.document_builder import NO_REVIEWS
+from data_ingestion.manifest import document_id
+from retriever.context_assembler import shingles
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class MinHasher:
+    """
+    MinHash signatures over the word shingles of a text (the same shingles
+    ContextAssembler compares), so the share of equal signature values
+    estimates the Jaccard similarity of two texts.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        # Shingle hashes are 32-bit and a, b < 2**31, so a * x + b fits in uint64
+        self.a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+
+    def signature(self, tokens: set) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(token.encode("utf-8")) for token in tokens), dtype=np.uint64,
+                             count=len(tokens))
+        return ((hashes[:, None] * self.a + self.b) % MERSENNE_PRIME).min(axis=0)
+
+
+class NearDuplicateIndex:
+    """
+    Clusters products whose review text is a near-duplicate, such as the
+    storage and colour variants of one phone, which repeat the same reviews.
+
+    Products are added one at a time. Each one is compared, through LSH
+    buckets over `bands` slices of its MinHash signature, with the canonical
+    (first-added) member of existing clusters. It joins the most similar
+    cluster whose estimated Jaccard is at least `threshold`, or else starts
+    a new cluster as its canonical member. A cluster's ID is its canonical
+    product's ID, so for a given input order the clusters are deterministic
+    and adding works on a stream. Reviews shorter than `min_shingles`
+    shingles (or missing) are too generic to compare and stay on their own.
+
+    Memory grows with the number of clusters (one signature and `bands`
+    bucket entries each) plus a few hashes per product.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16, min_shingles: int = 8,
+                 seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.min_shingles = min_shingles
+        self.hasher = MinHasher(num_perm, seed)
+        self.buckets: Dict[tuple, List[str]] = {}
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.text_clusters: Dict[str, str] = {}
+        self.assigned: Dict[str, str] = {}
+        self.products = 0
+        self.duplicates = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Build from `ingestion.near_duplicates` in config.yaml, or return None
+        when products are not clustered.
+        """
+        dedup_config = config.get("ingestion", {}).get("near_duplicates", {})
+        if not dedup_config.get("enabled", False):
+            return None
+        return cls(
+            threshold=dedup_config.get("threshold", 0.8),
+            num_perm=dedup_config.get("num_perm", 64),
+            bands=dedup_config.get("bands", 16),
+            min_shingles=dedup_config.get("min_shingles", 8),
+        )
+
+    def _band_keys(self, signature: np.ndarray) -> List[tuple]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def add(self, key: str, text: str) -> str:
+        """
+        Assign the product `key` with review `text` to a cluster and return
+        the cluster ID (`key` itself when it is the canonical member).
+        """
+        tokens = shingles(text) if text and text != NO_REVIEWS else set()
+        with self._lock:
+            if key in self.assigned:
+                return self.assigned[key]  # A repeated row of the same product
+            self.products += 1
+            if len(tokens) < self.min_shingles:
+                self.assigned[key] = key
+                return key
+            signature = self.hasher.signature(tokens)
+            band_keys = self._band_keys(signature)
+            best, best_similarity = None, self.threshold
+            for candidate in dict.fromkeys(c for band_key in band_keys for c in self.buckets.get(band_key, [])):
+                similarity = float(np.mean(self.signatures[candidate] == signature))
+                if similarity >= best_similarity:
+                    best, best_similarity = candidate, similarity
+            if best is not None:
+                self.duplicates += 1
+            else:
+                best = key
+                self.signatures[key] = signature
+                for band_key in band_keys:
+                    self.buckets.setdefault(band_key, []).append(key)
+            self.text_clusters[text_key(text)] = best
+            self.assigned[key] = best
+            return best
+
+    def annotate(self, product: Document) -> Document:
+        """
+        Set the product's `id` (if missing) and its `cluster_id` and
+        `is_canonical` metadata.
+        """
+        product.id = product.id or document_id(product.metadata)
+        cluster_id = self.add(product.id, product.page_content)
+        product.metadata["cluster_id"] = cluster_id
+        product.metadata["is_canonical"] = cluster_id == product.id
+        return product
+
+    def cluster_of_text(self, text: str):
+        return self.text_clusters.get(text_key(text))
+
+    def summary(self) -> dict:
+        return {"products": self.products, "clusters": self.products - self.duplicates,
+                "near_duplicates": self.duplicates}
+
+
+class ClusterEmbeddings(Embeddings):
+    """
+    Embeds one text per near-duplicate cluster: texts of products in the
+    same cluster of `index` reuse the vector of the first member embedded.
+    The last `max_vectors` cluster vectors are kept; variants are usually
+    scraped next to each other, so a small window catches most reuse.
+    """
+
+    def __init__(self, embeddings: Embeddings, index: NearDuplicateIndex, max_vectors: int = 10_000):
+        self.embeddings = embeddings
+        self.index = index
+        self.max_vectors = max_vectors
+        self.embedded = 0
+        self.reused = 0
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        clusters = [self.index.cluster_of_text(text) for text in texts]
+        with self._lock:
+            vectors = [self._vectors.get(cluster) if cluster else None for cluster in clusters]
+        # One text per missing cluster; texts outside any cluster are embedded as they are
+        missing = {}
+        for position, (cluster, vector) in enumerate(zip(clusters, vectors)):
+            if vector is None:
+                missing.setdefault(cluster or f"text:{position}", texts[position])
+        computed = dict(zip(missing, self.embeddings.embed_documents(list(missing.values())))) if missing else {}
+        with self._lock:
+            for cluster, vector in computed.items():
+                if not cluster.startswith("text:"):
+                    self._vectors[cluster] = vector
+                    self._vectors.move_to_end(cluster)
+            while len(self._vectors) > self.max_vectors:
+                self._vectors.popitem(last=False)
+            self.embedded += len(computed)
+            self.reused += len(texts) - len(computed)
+        return [vector if vector is not None else computed[cluster or f"text:{position}"]
+                for position, (cluster, vector) in enumerate(zip(clusters, vectors))]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
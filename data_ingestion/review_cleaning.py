@@ -0,0 +1,42 @@
+import re
+
+import emoji
+import pandas as pd
+
+
+def _emoji_pattern() -> str:
+    """
+    Regex for every emoji known to the `emoji` package: keycaps ("1️⃣") plus
+    runs of the non-ASCII code points that emoji sequences are built from
+    (pictographs, skin tones, ZWJ, variation selectors, flag letters).
+    """
+    code_points = sorted({ord(char) for text in emoji.EMOJI_DATA for char in text if ord(char) > 0x7F})
+    ranges = []
+    for code_point in code_points:
+        if ranges and code_point == ranges[-1][1] + 1:
+            ranges[-1][1] = code_point
+        else:
+            ranges.append([code_point, code_point])
+    char_class = "".join(re.escape(chr(start)) if start == end else f"{re.escape(chr(start))}-{re.escape(chr(end))}"
+                         for start, end in ranges)
+    return rf"[#*0-9]️?⃣|[{char_class}]+"
+
+
+# Scraped reviews end each entry with a "READ MORE" link; one pass removes it and all emoji
+REVIEW_NOISE = re.compile(rf"READ MORE|{_emoji_pattern()}")
+
+
+def clean_review(text):
+    """
+    Strip "READ MORE" links and emoji from one review blob; non-text values
+    (missing reviews) are returned unchanged.
+    """
+    return REVIEW_NOISE.sub("", text) if isinstance(text, str) else text
+
+
+def clean_reviews(reviews: pd.Series) -> pd.Series:
+    """
+    Column-wise clean_review over a whole Series of review blobs, keeping
+    missing values as they are.
+    """
+    return reviews.str.replace(REVIEW_NOISE, "", regex=True)
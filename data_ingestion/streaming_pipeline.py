@@ -0,0 +1,468 @@
+import csv
+import os
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from data_ingestion.batch_writer import BatchedVectorWriter
+from data_ingestion.catalog_store import CatalogStore
+from data_ingestion.chunking import ReviewChunker, chunk_id
+from data_ingestion.document_builder import record_document
+from data_ingestion.manifest import IngestionManifest, content_hash, document_id
+from data_ingestion.near_duplicates import ClusterEmbeddings, NearDuplicateIndex
+from data_ingestion.review_cleaning import clean_review
+from myutils.jobs import report_progress
+from myutils.model_loader import ModelLoader
+from myutils.settings import get_settings
+from myutils.tracing import span
+from myutils.vector_store_loader import load_vector_store, required_env_vars, vector_store_id
+from retriever.parent_store import ParentStore
+
+DONE = object()
+
+
+class PipelineStopped(Exception):
+    """
+    Raised in stage workers once another stage has failed or the run was cancelled.
+    """
+
+
+class Stage:
+    """
+    One step of a StagedPipeline: `fn` runs on `workers` threads, taking
+    one item at a time, or a list of up to `batch_size` items gathered for at
+    most `batch_wait` seconds. Returning None drops the item.
+    """
+
+    def __init__(self, name: str, fn: Callable, workers: int = 1, batch_size: int = None, batch_wait: float = 0.5):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+
+
+class StagedPipeline:
+    """
+    Runs stages connected by bounded queues of `queue_size` items.
+
+    A stage whose output queue is full blocks until the next stage catches
+    up, so memory is bounded by the queue sizes and batches in flight, not by
+    the input. The first error stops every stage and is re-raised by run().
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 32):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.processed = {stage.name: 0 for stage in stages}
+        self.blocked_seconds = {stage.name: 0.0 for stage in stages}
+        self._stop = threading.Event()
+        self._error = None
+        self._lock = threading.Lock()
+
+    def _fail(self, error: BaseException):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
+
+    def _put(self, target: queue.Queue, item, stage_name: str = None):
+        started = time.perf_counter()
+        while True:
+            try:
+                target.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                if self._stop.is_set():
+                    raise PipelineStopped()
+        if stage_name is not None:
+            with self._lock:
+                self.blocked_seconds[stage_name] += time.perf_counter() - started
+
+    def _get(self, source: queue.Queue, timeout: float = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._stop.is_set():
+                raise PipelineStopped()
+            wait = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+            if wait <= 0:
+                raise queue.Empty()
+            try:
+                return source.get(timeout=wait)
+            except queue.Empty:
+                continue
+
+    def _take(self, stage: Stage, inbox: queue.Queue):
+        """
+        Next item (or batch) for `stage`, and whether the input has ended.
+        """
+        item = self._get(inbox)
+        if item is DONE or stage.batch_size is None:
+            return item, item is DONE
+        batch = [item]
+        deadline = time.monotonic() + stage.batch_wait
+        while len(batch) < stage.batch_size:
+            try:
+                item = self._get(inbox, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _worker(self, stage: Stage, inbox: queue.Queue, outbox: queue.Queue, remaining: list):
+        try:
+            while True:
+                item, finished = self._take(stage, inbox)
+                if item is not DONE:
+                    result = stage.fn(item)
+                    with self._lock:
+                        self.processed[stage.name] += len(item) if stage.batch_size else 1
+                    if result is not None and outbox is not None:
+                        self._put(outbox, result, stage.name)
+                if finished:
+                    # Let sibling workers see the end of input too
+                    self._put(inbox, DONE)
+                    break
+        except PipelineStopped:
+            return
+        except BaseException as e:
+            self._fail(e)
+            return
+        with self._lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last and outbox is not None:
+            try:
+                self._put(outbox, DONE)
+            except PipelineStopped:
+                pass
+
+    def run(self, items: Iterable, on_tick: Callable[[], None] = None, tick_seconds: float = 0.5):
+        """
+        Feed `items` through the stages and wait for them to drain. `on_tick`
+        is called from this thread every `tick_seconds`; an exception it
+        raises (e.g. a job cancellation) stops the pipeline and is re-raised.
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads = []
+        for index, stage in enumerate(self.stages):
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            remaining = [stage.workers]
+            for number in range(stage.workers):
+                thread = threading.Thread(target=self._worker, args=(stage, queues[index], outbox, remaining),
+                                          name=f"stage-{stage.name}-{number}", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        def feed():
+            try:
+                for item in items:
+                    self._put(queues[0], item)
+                self._put(queues[0], DONE)
+            except PipelineStopped:
+                pass
+            except BaseException as e:
+                self._fail(e)
+
+        feeder = threading.Thread(target=feed, name="stage-feeder", daemon=True)
+        feeder.start()
+        try:
+            for thread in [feeder] + threads:
+                while thread.is_alive():
+                    thread.join(tick_seconds)
+                    if on_tick is not None:
+                        on_tick()
+        except BaseException as e:
+            self._fail(e)
+            for thread in [feeder] + threads:
+                thread.join()
+            raise
+        if self._error is not None:
+            raise self._error
+
+
+class PrecomputedEmbeddings(Embeddings):
+    """
+    Hands vectors computed by the embed stage to the vector store's
+    add_documents call in the upsert stage, so texts are embedded once.
+    Texts without a precomputed vector are embedded by `embeddings`.
+    """
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self._vectors = {}
+        self._lock = threading.Lock()
+
+    def put(self, texts: List[str], vectors: List[List[float]]):
+        with self._lock:
+            self._vectors.update(zip(texts, vectors))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            vectors = [self._vectors.pop(text, None) for text in texts]
+        missing = [text for text, vector in zip(texts, vectors) if vector is None]
+        if missing:
+            computed = iter(self.embeddings.embed_documents(missing))
+            vectors = [vector if vector is not None else next(computed) for vector in vectors]
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+class ScrapeToIndexPipeline:
+    """
+    Scrapes a product category and indexes each product as soon as it is
+    scraped: fetch -> parse -> clean -> embed -> upsert, each stage on its
+    own workers (`ingestion.streaming`) with bounded queues in between.
+
+    Cleaned records are also written to a new catalog partition (or the
+    scraper's CSV when the catalog is disabled), and the BM25 index is
+    rebuilt from it at the end. The partition is only published if the
+    scrape completes. Products are upserted only; nothing
+    is deleted, since one scrape covers a single category. With chunking, a
+    review chunk shared by several products is re-written with every parent
+    in the parent store as each new one is found, and any chunk whose latest
+    write raced an earlier one is re-written at the end.
+    """
+
+    def __init__(self, product_category: str, user_agent: str = None, site_url: str = None, fetcher=None):
+        # Scraping pulls in pandas and bs4, so it is only imported when used
+        from Collection.flipkart_scrapper import FlipkartScraper
+
+        self.settings = get_settings()
+        self.config = self.settings.config
+        self.settings.require(required_env_vars(self.config))
+        streaming_config = self.config.get("ingestion", {}).get("streaming", {})
+        self.queue_size = streaming_config.get("queue_size", 32)
+        self.workers = {name: streaming_config.get(f"{name}_workers", 1)
+                        for name in ["fetch", "parse", "clean", "embed", "upsert"]}
+        self.batch_size = streaming_config.get("batch_size", 16)
+        self.batch_wait = streaming_config.get("batch_wait_seconds", 0.5)
+
+        kwargs = {"user_agent": user_agent} if user_agent else {}
+        self.scraper = FlipkartScraper(product_category, fetcher=fetcher, site_url=site_url, **kwargs)
+        self.chunker = ReviewChunker.from_config(self.config)
+        self.near_duplicates = NearDuplicateIndex.from_config(self.config)
+        self.embeddings = ModelLoader().load_embeddings()
+        if self.near_duplicates is not None and self.chunker is None:
+            # Chunks are already shared by exact text; products reuse their cluster's vector
+            self.embeddings = ClusterEmbeddings(self.embeddings, self.near_duplicates)
+        self.precomputed = PrecomputedEmbeddings(self.embeddings)
+        self.vstore = load_vector_store(self.config, self.precomputed)
+        self.writer = BatchedVectorWriter.from_config(self.vstore, self.config)
+        self.manifest = IngestionManifest(
+            path=self.config.get("ingestion", {}).get("manifest_path", "Data/ingestion_manifest.json"),
+            collection_name=vector_store_id(self.config)
+            )
+        self.parent_store = None
+        if self.chunker is not None:
+            self.parent_store = ParentStore(self.config["ingestion"]["chunking"].get("parent_store_path",
+                                                                                      "Data/parent_store.sqlite"))
+
+        self.counts = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+        self.first_indexed_seconds = None
+        self._lock = threading.Lock()
+        self._seen = set()
+        self._shared_texts = {}
+        self._written_parents = {}
+        self.catalog = CatalogStore.from_config(self.config)
+        self._catalog_writer = None
+        self._csv_file = None
+        self._csv_writer = None
+        self._started = None
+
+    # Stages
+
+    def _fetch(self, url: str):
+        with span("scrape.fetch"):
+            return self.scraper.fetcher.fetch_page(url)
+
+    def _parse(self, page):
+        if page is None:
+            return None
+        record = page.record
+        if page.changed or record is None:
+            with span("scrape.parse"):
+                record = self.scraper.parse_product(page.content)
+            if self.scraper.fetcher.cache is not None:
+                self.scraper.fetcher.cache.store_record(page.url, record)
+        return {**record, "product_link": page.url}
+
+    def _clean(self, record: dict):
+        if record.get("product_title") == "NA":
+            return None
+        reviews = record.get("product_reviews")
+        if isinstance(reviews, str):
+            with span("scrape.clean"):
+                record["product_reviews"] = clean_review(reviews)
+        with self._lock:
+            if self._catalog_writer is not None:
+                self._catalog_writer.write(record)
+            else:
+                self._csv_writer.writerow({field: record.get(field, "") for field in self._csv_writer.fieldnames})
+                self._csv_file.flush()
+        return record
+
+    def _documents(self, record: dict) -> List[Document]:
+        product = record_document(record)
+        product.id = document_id(product.metadata)
+        with self._lock:
+            if product.id in self._seen:
+                return []  # Duplicate listing of one product: the first one wins
+            self._seen.add(product.id)
+        if self.near_duplicates is not None:
+            self.near_duplicates.annotate(product)
+        if self.chunker is None:
+            return [product]
+
+        texts = {chunk_id(text): text for text in self.chunker.texts(product)}
+        self.parent_store.upsert_many([(product.id, product.metadata, list(texts))])
+        # Parents already indexed, in this run or before, that share a chunk
+        parents_of = self.parent_store.parents_of(list(texts))
+        documents = []
+        for cid, text in texts.items():
+            parent_ids = parents_of.get(cid, [product.id])
+            if len(parent_ids) > 1:
+                with self._lock:
+                    self._shared_texts[cid] = text
+            documents.append(Document(id=cid, page_content=text, metadata={"parent_ids": parent_ids}))
+        return documents
+
+    def _embed(self, records: List[dict]):
+        documents = []
+        for record in records:
+            for document in self._documents(record):
+                digest = content_hash(document)
+                with self._lock:
+                    previous = self.manifest.entries.get(document.id)
+                    if previous == digest:
+                        self.counts["unchanged"] += 1
+                        continue
+                documents.append(document)
+        if not documents:
+            return None
+        texts = [document.page_content for document in documents]
+        with span("ingest.embed"):
+            self.precomputed.put(texts, self.embeddings.embed_documents(texts))
+        return documents
+
+    def _upsert(self, documents: List[Document]):
+        self.writer.add_batch(documents)
+        with self._lock:
+            for document in documents:
+                previous = self.manifest.entries.get(document.id)
+                self.counts["inserted" if previous is None else "updated"] += 1
+                self.manifest.entries[document.id] = content_hash(document)
+                if document.id in self._shared_texts:
+                    self._written_parents[document.id] = document.metadata["parent_ids"]
+            if self.first_indexed_seconds is None:
+                self.first_indexed_seconds = time.perf_counter() - self._started
+                print(f"First products searchable {self.first_indexed_seconds:.2f}s after the scrape started")
+        return None
+
+    def _stale_chunks(self) -> List[Document]:
+        """
+        Shared chunks whose last completed write raced a write with an older
+        parent list.
+        """
+        if not self._written_parents:
+            return []
+        parents_of = self.parent_store.parents_of(list(self._written_parents))
+        return [Document(id=cid, page_content=self._shared_texts[cid], metadata={"parent_ids": parents_of[cid]})
+                for cid, written in self._written_parents.items() if parents_of.get(cid, written) != written]
+
+    def run(self) -> dict:
+        """
+        Scrape and index the category; returns the ingestion counts and timings.
+        """
+        print(f"Starting streaming scrape of {self.scraper.product_category}...")
+        self._started = time.perf_counter()
+        self._open_output()
+
+        completed = False
+        pipeline = StagedPipeline([
+            Stage("fetch", self._fetch, self.workers["fetch"]),
+            Stage("parse", self._parse, self.workers["parse"]),
+            Stage("clean", self._clean, self.workers["clean"]),
+            Stage("embed", self._embed, self.workers["embed"], batch_size=self.batch_size, batch_wait=self.batch_wait),
+            Stage("upsert", self._upsert, self.workers["upsert"]),
+        ], queue_size=self.queue_size)
+
+        try:
+            links = self.scraper.get_product_links()
+            pipeline.run(links, on_tick=lambda: report_progress("stream", pipeline.processed["embed"], len(links)))
+            stale = self._stale_chunks()
+            if stale:
+                self._upsert(self._embed_documents(stale))
+            completed = True
+        finally:
+            self._close_output(published=completed)
+            if self.parent_store is not None:
+                self.parent_store.close()
+            self.scraper.close()
+            # Whatever was written is recorded, so a re-run skips it
+            self.manifest.save()
+
+        report_progress("index")
+        from data_ingestion.ingestion_pipeline import DataIngestion
+        DataIngestion(None if self.catalog is not None else self.scraper.file_path).build_lexical_index(force=True)
+
+        elapsed = time.perf_counter() - self._started
+        summary = {
+            "counts": dict(self.counts),
+            "products": len(self._seen),
+            "seconds": round(elapsed, 3),
+            "first_indexed_seconds": round(self.first_indexed_seconds, 3) if self.first_indexed_seconds else None,
+            "stages": {name: {"processed": pipeline.processed[name],
+                              "blocked_seconds": round(pipeline.blocked_seconds[name], 3)}
+                       for name in pipeline.processed},
+        }
+        if self.near_duplicates is not None:
+            summary["near_duplicates"] = self.near_duplicates.summary()
+            if isinstance(self.embeddings, ClusterEmbeddings):
+                summary["near_duplicates"]["reused_embeddings"] = self.embeddings.reused
+        print(f"Streaming scrape complete: {summary}")
+        return summary
+
+    def _open_output(self):
+        if self.catalog is not None:
+            self._catalog_writer = self.catalog.writer(self.scraper.product_category)
+            return
+        directory = os.path.dirname(self.scraper.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._csv_file = open(self.scraper.file_path, "w", encoding="utf-8", newline="")
+        self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=list(self.scraper.data_dict))
+        self._csv_writer.writeheader()
+
+    def _close_output(self, published: bool):
+        if self._catalog_writer is None:
+            self._csv_file.close()
+        elif published:
+            path = self._catalog_writer.close()
+            print(f"Scraped products saved to {path}" if path else "No products scraped; catalog unchanged")
+        else:
+            self._catalog_writer.abort()
+
+    def records(self) -> List[dict]:
+        """
+        The products written by the last run, as scraped.
+        """
+        if self._catalog_writer is not None:
+            written = [partition for partition in self.catalog.partitions(self.scraper.product_category)
+                       if partition.path == self._catalog_writer.path]
+            return self.catalog.read(partitions=written).to_pylist()
+        import pandas as pd
+        return pd.read_csv(self.scraper.file_path, keep_default_na=False).to_dict(orient="records")
+
+    def _embed_documents(self, documents: List[Document]) -> List[Document]:
+        texts = [document.page_content for document in documents]
+        self.precomputed.put(texts, self.embeddings.embed_documents(texts))
+        return documents
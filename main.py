@@ -1,21 +1,141 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
 import uvicorn
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-from Collection.flipkart_scrapper import FlipkartScraper
-from data_ingestion.ingestion_pipeline import DataIngestion
 from retriever.retrievals import Retriever
+from retriever.context_assembler import ContextAssembler
 from myutils.model_loader import ModelLoader
-from prompt_library.prompt import PROMPT_TEMPLATES
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
-import pandas as pd
+from myutils.llm_router import LLMRouter
+from myutils.index_version import IndexVersion
+from myutils.jobs import IndexLock, JobScheduler, report_progress
+from myutils.response_cache import ResponseCache
+from myutils.settings import get_settings
+from myutils.chain_builder import assemble_context, build_answer_chain, build_chain
+from myutils.vector_store_loader import vector_store_backend
+from myutils import tracing
+from myutils.metrics import REGISTRY
+
+settings = get_settings()
+tracing.configure(settings.config)
+
+# Scrapes and ingests run here, off the event loop that serves /chat
+jobs = JobScheduler.from_config(settings.config)
+# Ingests and streaming scrapes each rewrite the manifest and BM25 index, so they run one at a time
+index_lock = IndexLock.from_config(settings.config)
+
+# Each server worker process (uvicorn --workers / WEB_CONCURRENCY) reloads when another one publishes a new index
+serving_config = settings.config.get("serving", {})
+index_version = IndexVersion.from_config(settings.config)
+reload_lock = threading.RLock()
+
+# Global variables for retriever, model, compiled chain and response cache (Initially None)
+retriever_loader = None
+retriever_obj = None
+model_loader = None
+chain = None
+answer_chain = None
+response_cache = None
+context_assembler = None
+loaded_version = None
+
+def load_serving_components():
+    """Build the retriever, embeddings, LLM client and compiled chains against the current collection.
+
+    Everything is built first and swapped in at once, so requests keep using
+    the previous snapshot until the new one is ready. The LLM client and the
+    query embeddings are built once and reused, so a reload keeps the
+    router's latency windows and circuit-breaker state, and the single
+    coalescer thread the response cache also embeds through.
+    """
+    global retriever_loader, retriever_obj, model_loader, chain, answer_chain, response_cache, context_assembler
+    global loaded_version
+    with reload_lock:
+        version = index_version.current()
+        new_loader = Retriever(previous=retriever_loader)
+        new_retriever = new_loader.load_retriever()
+        new_model = model_loader if model_loader is not None else ModelLoader().load_llm()
+        new_assembler = ContextAssembler.from_config(settings.config)
+        new_chain = build_chain(new_retriever, new_model, new_assembler)
+        new_answer_chain = build_answer_chain(new_model)
+        retriever_loader, retriever_obj, model_loader = new_loader, new_retriever, new_model
+        context_assembler, chain, answer_chain = new_assembler, new_chain, new_answer_chain
+        if response_cache is None:
+            response_cache = ResponseCache.from_config(settings.config, retriever_loader.embeddings)
+        loaded_version = version
+
+def publish_index(reason: str):
+    """Publish a new index version for the other workers, then reload this one against it."""
+    with reload_lock:
+        index_version.bump(reason)
+        load_serving_components()
+
+def reload_if_changed():
+    """Reload against the index another worker published; returns whether a reload happened."""
+    with reload_lock:
+        if index_version.current() == loaded_version:
+            return False
+        load_serving_components()
+        # Cached answers may come from the previous index. Only invalidate after the swap,
+        # so no answer from the old chain is cached under the new generation
+        if response_cache is not None:
+            response_cache.invalidate()
+        return True
+
+async def watch_index_version():
+    """Poll the published index version and hot-swap this worker's retriever when it changes.
+
+    A failed reload, e.g. while a snapshot is being rotated, is retried with
+    a growing delay until this worker serves the published version.
+    """
+    poll_seconds = serving_config.get("reload_poll_seconds", 1.0)
+    # With warm-up off or failed, the version found at startup still waits for /ingest
+    idle = index_version.current() if loaded_version is None else None
+    delay = poll_seconds
+    while True:
+        await asyncio.sleep(delay)
+        version = index_version.current()
+        if version == loaded_version or version == idle:
+            delay = poll_seconds
+            continue
+        started = time.perf_counter()
+        try:
+            if await run_in_threadpool(reload_if_changed):
+                print(f"Reloaded index version {version} in {time.perf_counter() - started:.2f}s")
+            delay = poll_seconds
+        except Exception as e:
+            delay = min(delay * 2, max(poll_seconds, 30.0))
+            print(f"Reload of index version {version} failed, keeping the previous one; retrying in {delay:.1f}s: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up against the existing collection so /chat works right after a restart."""
+    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1 and vector_store_backend(settings.config) == "memory":
+        print("Warning: the memory vector store is per process; other workers will not see ingested data")
+    if settings.config.get("startup", {}).get("warm_up", True):
+        started = time.perf_counter()
+        try:
+            await run_in_threadpool(load_serving_components)
+            print(f"Warm-up finished in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            print(f"Warm-up skipped, run /ingest to load the retriever: {e}")
+    watcher = asyncio.create_task(watch_index_version())
+    yield
+    watcher.cancel()
+    jobs.shutdown()
+    if retriever_loader is not None and retriever_loader.coalescer is not None:
+        retriever_loader.coalescer.close()
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -23,74 +143,254 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # Setup templates
 templates = Jinja2Templates(directory="templates")
 
+REQUESTS = REGISTRY.counter("app_http_requests", "HTTP requests by route and status.", ("route", "status"))
+REQUEST_SECONDS = REGISTRY.histogram("app_http_request_duration_seconds", "HTTP request latency by route.", ("route",))
+# Records the chain's retrieve, prompt, llm and parse stages
+run_config = {"callbacks": [tracing.StageTimer()]} if tracing.enabled() else {}
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    """Collect per-stage timings for the request and return them in a Server-Timing header.
+
+    Streaming responses only report the stages that ran before the stream opened.
+    """
+    if not tracing.enabled():
+        return await call_next(request)
+    started = time.perf_counter()
+    timings = {}
+    token = tracing.REQUEST_TIMINGS.set(timings)
+    try:
+        response = await call_next(request)
+    finally:
+        tracing.REQUEST_TIMINGS.reset(token)
+    elapsed = time.perf_counter() - started
+    route = request.scope.get("route")
+    route = route.path if route is not None else "unmatched"
+    REQUESTS.labels(route, str(response.status_code)).inc()
+    REQUEST_SECONDS.labels(route).observe(elapsed)
+    response.headers["Server-Timing"] = tracing.server_timing({**timings, "total": elapsed})
+    return response
+
+def semantic_cacheable(query: str) -> bool:
+    """Whether the response cache may embed `query`: model-number queries answered from BM25 alone never are."""
+    return retriever_obj is None or not retriever_obj.lexical_only(query)
+
 # Define the Query model
 class Query(BaseModel):
     query: str
 
-# Global variables for retriever and model (Initially None)
-retriever_obj = None
-model_loader = None
+# Bound concurrent LLM calls and how long a single answer may take
+chat_config = settings.config.get("chat", {})
+chat_semaphore = asyncio.Semaphore(chat_config.get("max_concurrency", 32))
+chat_timeout = chat_config.get("timeout_seconds", 60)
 
 @app.get("/", response_class=HTMLResponse)
 async def get_chat_page(request: Request):
     """Serve the chat interface."""
     return templates.TemplateResponse("chat.html", {"request": request})
 
-@app.post("/scrape/{product_category}")
-async def scrape_data(product_category: str,request: Request):
-    """Scrape product data from Flipkart."""
-    try:
-        user_agent = request.headers.get("User-Agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/136.0.0.0 Safari/537.36")
-        
-        # Pass the User-Agent to the scraper
-        scraper = FlipkartScraper(product_category, user_agent=user_agent)
+def scrape_job(product_category: str, user_agent: str) -> dict:
+    """Scrape product data from Flipkart; runs on a job worker.
 
-        #scraper = FlipkartScraper(product_category)
+    With ingestion.streaming enabled, products are indexed while the scrape
+    runs and the retriever is reloaded at the end.
+    """
+    if not settings.config.get("ingestion", {}).get("streaming", {}).get("enabled", False):
+        # Scraping pulls in pandas and bs4, so it is only imported when used
+        from Collection.flipkart_scrapper import FlipkartScraper
+        scraper = FlipkartScraper(product_category, user_agent=user_agent)
         df = scraper.run_pipeline()
         data = df.to_dict(orient='records')
         return {"message": f"Data scraped for {product_category}", "data": data}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+    from data_ingestion.streaming_pipeline import ScrapeToIndexPipeline
+    with index_lock.hold():
+        pipeline = ScrapeToIndexPipeline(product_category, user_agent=user_agent)
+        summary = pipeline.run()
+        counts = summary["counts"]
+        report_progress("reload")
+        publish_index(f"scrape {product_category}")
+        # Only after the swap, so no answer from the old chain is cached under the new generation
+        if response_cache is not None and (counts["inserted"] or counts["updated"]):
+            response_cache.invalidate()
+    data = pipeline.records()
+    return {"message": f"Data scraped and indexed for {product_category}", "data": data, **summary}
+
+def ingest_job() -> dict:
+    """Ingest data into AstraDB and reload the retriever & model; runs on a job worker."""
+    from data_ingestion.ingestion_pipeline import DataIngestion
+    with index_lock.hold():
+        ingestion = DataIngestion()
+        counts = ingestion.run_pipeline()
+        report_progress("reload")
+        publish_index("ingest")
+
+        # Cached answers may be stale once the collection has changed. Only invalidate after the swap,
+        # so no answer from the old chain is cached under the new generation
+        if response_cache is not None and (counts["inserted"] or counts["updated"] or counts["deleted"]):
+            response_cache.invalidate()
+    return {"message": "Data successfully stored in AstraDB!", "counts": counts}
+
+def job_accepted(job, created: bool) -> JSONResponse:
+    """202 response for a submitted job; `deduplicated` means an identical job was already in flight."""
+    return JSONResponse(status_code=202, content={**job.snapshot(), "deduplicated": not created})
+
+@app.post("/scrape/{product_category}")
+async def scrape_data(product_category: str,request: Request):
+    """Queue a scrape of `product_category` and return its job ID; poll /jobs/{job_id} for the data."""
+    user_agent = request.headers.get("User-Agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/136.0.0.0 Safari/537.36")
+    job, created = jobs.submit("scrape", product_category.strip().lower(),
+                               lambda: scrape_job(product_category, user_agent))
+    return job_accepted(job, created)
 
 @app.post("/ingest")
 async def ingest_data():
-    """Ingest data into AstraDB and load retriever & model once."""
-    global retriever_obj, model_loader  # Use global variables
-    try:
-        ingestion = DataIngestion()
-        ingestion.run_pipeline()
+    """Queue an ingest of the scraped data and return its job ID."""
+    job, created = jobs.submit("ingest", "default", ingest_job)
+    return job_accepted(job, created)
 
-        # Load retriever and model **ONLY ONCE**
-        retriever_obj = Retriever().load_retriever()
-        model_loader = ModelLoader().load_llm()
-        
-        return {"message": "Data successfully stored in AstraDB!"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+@app.get("/jobs")
+async def list_jobs():
+    """List queued, running and recently finished jobs, newest first."""
+    return {"jobs": jobs.list()}
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Report a job's status, progress and, once finished, its result or error."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job {job_id}")
+    return job.snapshot()
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a job: queued jobs never start, running ones stop at their next progress report."""
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job {job_id}")
+    return {**job.snapshot(), "cancel_requested": True}
 
 @app.post("/chat")
 async def chat(query: Query):
-    """Process chat queries with preloaded retriever & model."""
-    global retriever_obj, model_loader
+    """Process chat queries with the chain compiled at /ingest, without blocking the event loop."""
+    global chain, response_cache
 
-    if retriever_obj is None or model_loader is None:
+    if chain is None:
         raise HTTPException(status_code=500, detail="Model & retriever not loaded. Run /ingest first.")
 
     try:
-        prompt = ChatPromptTemplate.from_template(PROMPT_TEMPLATES["customer_support_bot"])
+        generation = None
+        semantic = semantic_cacheable(query.query)
+        if response_cache is not None:
+            cached_response, cache_kind = await run_in_threadpool(response_cache.lookup, query.query, semantic)
+            if cached_response is not None:
+                return {"response": cached_response, "cached": cache_kind}
+            generation = response_cache.generation
 
-        chain = (
-            {"context": retriever_obj, "question": RunnablePassthrough()}
-            | prompt
-            | model_loader
-            | StrOutputParser()
-        )
+        async with chat_semaphore:
+            response = await asyncio.wait_for(chain.ainvoke(query.query, config=run_config), timeout=chat_timeout)
 
-        response = chain.invoke(query.query)
-        return {"response": response}
+        if response_cache is not None:
+            await run_in_threadpool(response_cache.store, query.query, response, generation, semantic)
+        return {"response": response, "cached": False}
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"No answer within {chat_timeout} seconds.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_event(data: dict, event: str = None) -> str:
+    """Format one Server-Sent Event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(query: Query, request: Request):
+    """Stream the answer token by token as Server-Sent Events.
+
+    Retrieval runs before the stream opens so the first token is flushed as soon
+    as the LLM produces it. If the client disconnects, generation is cancelled.
+    """
+    if chain is None or answer_chain is None:
+        raise HTTPException(status_code=500, detail="Model & retriever not loaded. Run /ingest first.")
+
+    generation = None
+    semantic = semantic_cacheable(query.query)
+    if response_cache is not None:
+        cached_response, cache_kind = await run_in_threadpool(response_cache.lookup, query.query, semantic)
+        if cached_response is not None:
+            async def cached_events():
+                yield sse_event({"token": cached_response})
+                yield sse_event({"cached": cache_kind}, event="done")
+            return StreamingResponse(cached_events(), media_type="text/event-stream",
+                                     headers=SSE_HEADERS)
+        generation = response_cache.generation
+
+    try:
+        context = await asyncio.wait_for(retriever_obj.ainvoke(query.query, config=run_config), timeout=chat_timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"No context within {chat_timeout} seconds.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if context_assembler is not None:
+        context = assemble_context(context_assembler, query.query, context)
+
+    async def events():
+        tokens = []
+        try:
+            async with chat_semaphore:
+                stream = answer_chain.astream({"context": context, "question": query.query}, config=run_config)
+                try:
+                    async for token in stream:
+                        if await request.is_disconnected():
+                            print("Client disconnected; cancelling generation")
+                            return
+                        tokens.append(token)
+                        yield sse_event({"token": token})
+                finally:
+                    await stream.aclose()  # Stops the upstream LLM call early on disconnect
+            response = "".join(tokens)
+            if response_cache is not None:
+                await run_in_threadpool(response_cache.store, query.query, response, generation, semantic)
+            yield sse_event({"cached": False}, event="done")
+        except Exception as e:
+            yield sse_event({"detail": str(e)}, event="error")
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers=SSE_HEADERS)
+
+@app.get("/health")
+async def health():
+    """Report whether the retriever and model are loaded and /chat can answer."""
+    return {"status": "ok", "ready": chain is not None, "pid": os.getpid(), "index_version": loaded_version}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Expose stage latencies, request counts and context sizes in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Report response cache hit rates."""
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.snapshot()}
+
+@app.get("/coalescer/stats")
+async def coalescer_stats():
+    """Report query-embedding batch-size and queue-wait histograms."""
+    if retriever_loader is None or retriever_loader.coalescer is None:
+        return {"enabled": False}
+    return {"enabled": True, **retriever_loader.coalescer.stats()}
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """Report per-provider latency, error rate and circuit-breaker state of the LLM router."""
+    if not isinstance(model_loader, LLMRouter):
+        return {"enabled": False}
+    return {"enabled": True, "providers": model_loader.stats()}
+
 # Run application
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8888)
\ No newline at end of file
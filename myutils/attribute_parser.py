@@ -0,0 +1,138 @@
+import re
+from typing import Optional
+
+NUMBER = r"(\d+(?:,\d+)*(?:\.\d+)?)"
+CURRENCY = r"(?:₹|rs\.?|inr)"
+PRICE_MULTIPLIERS = {"k": 1_000, "thousand": 1_000, "l": 100_000, "lakh": 100_000, "lakhs": 100_000}
+# Spec units that make a number something other than a price ("256 gb", "5000 mah")
+SPEC_UNIT = r"(?:gb|tb|mb|mah|mp|hz|inch(?:es)?|\"|-inch)"
+# (currency, amount, multiplier); a price needs a currency or a multiplier, see _is_price
+PRICE_AMOUNT = rf"({CURRENCY})?\s*{NUMBER}\s*(k|thousand|lakhs?|l)?\b(?!\s*{SPEC_UNIT})"
+SIZE_UNITS = {"mb": 1 / 1024, "gb": 1, "tb": 1024}
+
+# Bare "max"/"min" are left out: they are part of model names ("iPhone 15 Pro Max")
+UPPER_WORDS = (r"(?:under|below|less than|cheaper than|within|up ?to|upto|maximum|max (?:price|budget)(?: of)?"
+               r"|budget(?: of)?|at most|<=?)")
+LOWER_WORDS = r"(?:above|over|more than|at least|minimum|min price(?: of)?|starting (?:at|from)|from|>=?)"
+
+PRICE_RANGE = re.compile(rf"between\s+{PRICE_AMOUNT}\s+(?:and|to|-)\s+{PRICE_AMOUNT}")
+PRICE_UPPER = re.compile(rf"{UPPER_WORDS}\s+{PRICE_AMOUNT}")
+PRICE_LOWER = re.compile(rf"{LOWER_WORDS}\s+{PRICE_AMOUNT}")
+RATING_LOWER = re.compile(
+    rf"(?:rated|rating|ratings|stars?)\s+(?:of\s+)?{LOWER_WORDS}?\s*(\d(?:\.\d+)?)\b"
+    rf"|{LOWER_WORDS}\s+(\d(?:\.\d+)?)\s*(?:stars?|rating|\+? ?rated)"
+    rf"|(\d(?:\.\d+)?)\s*(?:\+|and above|or above|or more)\s*(?:stars?|rating|rated)"
+)
+RAM_QUERY = re.compile(rf"(?:{LOWER_WORDS}\s+)?(\d+)\s*(gb|mb)\s*(?:of\s+)?ram")
+STORAGE_QUERY = re.compile(rf"(?:{LOWER_WORDS}\s+)?(\d+)\s*(gb|tb)\s*(?:of\s+)?(?:storage|rom|internal|memory)")
+
+RAM_FIELD = re.compile(r"(\d+(?:\.\d+)?)\s*(mb|gb|tb)\s*ram", re.IGNORECASE)
+STORAGE_FIELD = re.compile(r"(\d+(?:\.\d+)?)\s*(mb|gb|tb)\s*rom", re.IGNORECASE)
+STORAGE_IN_TITLE = re.compile(r"\(.*?(\d+(?:\.\d+)?)\s*(gb|tb)\)", re.IGNORECASE)
+
+
+def _number(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+def parse_price(value) -> Optional[float]:
+    """
+    "₹1,41,999" -> 141999.0; None when there is no number.
+    """
+    match = re.search(NUMBER, str(value))
+    return _number(match.group(1)) if match else None
+
+
+def parse_rating(value) -> Optional[float]:
+    """
+    "4.6" -> 4.6; None for "NA", blanks and values outside 0-5.
+    """
+    try:
+        rating = float(str(value).strip())
+    except ValueError:
+        return None
+    return rating if 0 <= rating <= 5 else None
+
+
+def _size_gb(match) -> float:
+    return round(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()], 3)
+
+
+def parse_ram_gb(text: str) -> Optional[float]:
+    match = RAM_FIELD.search(text)
+    return _size_gb(match) if match else None
+
+
+def parse_storage_gb(text: str, title: str = "") -> Optional[float]:
+    match = STORAGE_FIELD.search(text) or STORAGE_IN_TITLE.search(title)
+    return _size_gb(match) if match else None
+
+
+def numeric_attributes(metadata: dict) -> dict:
+    """
+    Typed price, rating, RAM and storage fields parsed from a product's
+    display strings. Fields that cannot be parsed are left out, so filters
+    on them never match the product.
+    """
+    title = str(metadata.get("product_title", ""))
+    specs = f"{title} {metadata.get('product_highlights', '')}"
+    attributes = {
+        "price": parse_price(metadata.get("product_price", "")),
+        "rating": parse_rating(metadata.get("product_rating", "")),
+        "ram_gb": parse_ram_gb(specs),
+        "storage_gb": parse_storage_gb(specs, title),
+    }
+    return {name: value for name, value in attributes.items() if value is not None}
+
+
+def _price(match, offset: int = 0) -> float:
+    amount = _number(match.group(2 + offset))
+    multiplier = match.group(3 + offset)
+    return amount * PRICE_MULTIPLIERS[multiplier] if multiplier else amount
+
+
+def _is_price(match, offset: int = 0) -> bool:
+    """
+    Whether the amount has a currency marker or a k/thousand/lakh multiplier.
+    Bare numbers are more often specs or years ("above 200", "from 2023").
+    """
+    return bool(match.group(1 + offset) or match.group(3 + offset))
+
+
+def extract_constraints(query: str) -> dict:
+    """
+    Structured constraints in a query, as a metadata filter, e.g.
+    "phones under ₹30,000 rated above 4.3" ->
+    {"price": {"$lte": 30000.0}, "rating": {"$gte": 4.3}}.
+    """
+    text = query.lower()
+    constraints = {}
+
+    range_match = PRICE_RANGE.search(text)
+    if range_match and (_is_price(range_match) or _is_price(range_match, offset=3)):
+        low, high = sorted([_price(range_match), _price(range_match, offset=3)])
+        constraints["price"] = {"$gte": low, "$lte": high}
+    else:
+        price = {}
+        upper = next((match for match in PRICE_UPPER.finditer(text) if _is_price(match)), None)
+        if upper:
+            price["$lte"] = _price(upper)
+        lower = next((match for match in PRICE_LOWER.finditer(text) if _is_price(match)), None)
+        if lower:
+            price["$gte"] = _price(lower)
+        if price:
+            constraints["price"] = price
+
+    rating = RATING_LOWER.search(text)
+    if rating:
+        value = float(next(group for group in rating.groups() if group))
+        if 0 < value <= 5:
+            constraints["rating"] = {"$gte": value}
+
+    ram = RAM_QUERY.search(text)
+    if ram:
+        constraints["ram_gb"] = {"$gte": _size_gb(ram)}
+    storage = STORAGE_QUERY.search(text)
+    if storage:
+        constraints["storage_gb"] = {"$gte": _size_gb(storage)}
+    return constraints
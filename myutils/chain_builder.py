@@ -0,0 +1,48 @@
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda, RunnableParallel, RunnablePassthrough
+
+from myutils.tracing import CONTEXT_TOKENS, enabled, span
+from prompt_library.prompt import PROMPT_TEMPLATES
+from retriever.context_assembler import estimate_tokens
+
+
+def assemble_context(assembler, question: str, documents) -> str:
+    """
+    Run the ContextAssembler as the "assemble" stage and record the context size.
+    """
+    with span("assemble"):
+        context = assembler.assemble(question, documents)
+    if enabled():
+        CONTEXT_TOKENS.labels().observe(estimate_tokens(context) if context else 0)
+    return context
+
+
+def build_answer_chain(llm):
+    """
+    Prompt -> LLM -> text, taking {"context", "question"}. Used on its own by
+    the streaming endpoint, which retrieves context before the stream opens.
+    """
+    prompt = ChatPromptTemplate.from_template(PROMPT_TEMPLATES["customer_support_bot"])
+    return prompt | llm | StrOutputParser()
+
+
+def build_chain(retriever, llm, assembler=None):
+    """
+    Compile the customer-support RAG chain once, so requests only run it.
+    With a ContextAssembler, retrieved documents are condensed into a
+    token-budgeted context before they reach the prompt.
+    """
+    if assembler is None:
+        return (
+            {"context": retriever, "question": RunnablePassthrough()}
+            | build_answer_chain(llm)
+        )
+    return (
+        RunnableParallel(documents=retriever, question=RunnablePassthrough())
+        | RunnableLambda(lambda inputs: {
+            "context": assemble_context(assembler, inputs["question"], inputs["documents"]),
+            "question": inputs["question"],
+        })
+        | build_answer_chain(llm)
+    )
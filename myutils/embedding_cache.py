@@ -0,0 +1,277 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingStore:
+    """
+    Persistent embedding store: SQLite maps each key to a row of a
+    memory-mapped float32 matrix. A small in-memory LRU of float32 arrays
+    sits in front of it, and the least recently used rows are evicted once
+    `max_entries` is exceeded. Lookups return float32 arrays.
+
+    Several processes (server workers, ingestion) can share one store. Rows
+    are allocated inside an immediate SQLite transaction, and the matrix is
+    re-mapped when another process has grown it. Evicted rows are reused
+    only after `REUSE_AFTER_SECONDS`, so a reader that has just looked up a
+    row never sees it overwritten.
+    """
+
+    REUSE_AFTER_SECONDS = 60.0
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str = "Data/embedding_cache", max_entries: int = 200_000,
+                 memory_entries: int = 4096):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()
+        self._conn = sqlite3.connect(os.path.join(path, "index.sqlite"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, row INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY, freed_at REAL NOT NULL)")
+        self._conn.commit()
+
+        self.matrix_path = os.path.join(path, "vectors.f32")
+        self.dim = None
+        self._capacity = 0
+        self._matrix = None
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            if self._meta().get("next_row") is None:
+                # Stores written before rows were tracked in SQLite
+                used = {row for (row,) in self._conn.execute("SELECT row FROM entries")}
+                next_row = max(used) + 1 if used else 0
+                self._conn.executemany("INSERT OR IGNORE INTO free_rows (row, freed_at) VALUES (?, 0)",
+                                       [(row,) for row in range(next_row) if row not in used])
+                self._set_meta("next_row", next_row)
+        self._sync_matrix()
+
+    @classmethod
+    def shared(cls, path: str, **kwargs):
+        """
+        Return the process-wide store for `path`, so ingestion and retrieval
+        share one in-memory LRU as well as the files on disk.
+        """
+        with cls._shared_lock:
+            if path not in cls._shared:
+                cls._shared[path] = cls(path, **kwargs)
+            return cls._shared[path]
+
+    def _meta(self) -> dict:
+        return dict(self._conn.execute("SELECT name, value FROM meta").fetchall())
+
+    def _open_matrix(self):
+        self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(self._capacity, self.dim))
+
+    def _sync_matrix(self):
+        """
+        Re-map the matrix if another process has created or grown it.
+        """
+        meta = self._meta()
+        if meta.get("dim") and meta.get("capacity", 0) != self._capacity:
+            self.dim = meta["dim"]
+            self._capacity = meta["capacity"]
+            self._open_matrix()
+
+    def _set_meta(self, name: str, value: int):
+        self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value))
+
+    def _ensure_capacity(self, rows_needed: int, dim: int):
+        if self.dim is None:
+            self.dim = dim
+            self._set_meta("dim", dim)
+        elif dim != self.dim:
+            raise ValueError(f"Embedding dimension changed from {self.dim} to {dim}; clear {self.path}")
+        if rows_needed <= self._capacity:
+            return
+        capacity = max(1024, self._capacity)
+        while capacity < rows_needed:
+            capacity *= 2
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+        with open(self.matrix_path, "ab") as file:
+            file.truncate(capacity * dim * np.dtype(np.float32).itemsize)
+        self._capacity = capacity
+        self._set_meta("capacity", capacity)
+        self._open_matrix()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: List[str]) -> dict:
+        """
+        Look up keys, returning {key: float32 array} for the ones that are cached.
+        """
+        found = {}
+        with self._lock:
+            disk_keys = []
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.stats["memory_hits"] += 1
+                else:
+                    disk_keys.append(key)
+            if disk_keys:
+                placeholders = ",".join("?" * len(disk_keys))
+                rows = self._conn.execute(
+                    f"SELECT key, row FROM entries WHERE key IN ({placeholders})", disk_keys
+                ).fetchall()
+                if rows and (self._matrix is None or max(row for _, row in rows) >= self._capacity):
+                    self._sync_matrix()
+                now = time.time()
+                for key, row in rows:
+                    # A copy: the row may be reused once the entry is evicted
+                    vector = np.array(self._matrix[row])
+                    found[key] = vector
+                    self._remember(key, vector)
+                    self.stats["disk_hits"] += 1
+                if rows:
+                    self._conn.executemany("UPDATE entries SET last_used = ? WHERE key = ?",
+                                           [(now, key) for key, _ in rows])
+                    self._conn.commit()
+            self.stats["misses"] += len(set(keys) - set(found))
+        return found
+
+    def put_many(self, items: dict):
+        """
+        Persist {key: vector} pairs, evicting least recently used rows if needed.
+        """
+        if not items:
+            return
+        with self._lock:
+            dim = len(next(iter(items.values())))
+            # Serializes row allocation with every other process using the store
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._sync_matrix()
+                new_keys = [key for key in items
+                            if self._conn.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is None]
+                now = time.time()
+                self._evict(len(new_keys), now)
+                rows = self._allocate(len(new_keys), now)
+                if rows:
+                    self._ensure_capacity(max(rows) + 1, dim)
+                for key, row in zip(new_keys, rows):
+                    self._matrix[row] = np.asarray(items[key], dtype=np.float32)
+                    self._conn.execute("INSERT INTO entries (key, row, last_used) VALUES (?, ?, ?)", (key, row, now))
+                if self._matrix is not None:
+                    self._matrix.flush()
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            for key, vector in items.items():
+                self._remember(key, np.asarray(vector, dtype=np.float32))
+
+    def _allocate(self, count: int, now: float) -> List[int]:
+        """
+        Rows for `count` new entries: free rows past the reuse grace period
+        first, then new rows at the end of the matrix.
+        """
+        if not count:
+            return []
+        rows = [row for (row,) in self._conn.execute(
+            "SELECT row FROM free_rows WHERE freed_at <= ? ORDER BY row LIMIT ?",
+            (now - self.REUSE_AFTER_SECONDS, count),
+        )]
+        self._conn.executemany("DELETE FROM free_rows WHERE row = ?", [(row,) for row in rows])
+        next_row = self._meta()["next_row"]
+        rows += list(range(next_row, next_row + count - len(rows)))
+        self._set_meta("next_row", max(next_row, max(rows) + 1))
+        return rows
+
+    def _evict(self, incoming: int, now: float):
+        count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        overflow = count + incoming - self.max_entries
+        if overflow <= 0:
+            return
+        victims = self._conn.execute(
+            "SELECT key, row FROM entries ORDER BY last_used ASC LIMIT ?", (overflow,)
+        ).fetchall()
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in victims])
+        self._conn.executemany("INSERT OR REPLACE INTO free_rows (row, freed_at) VALUES (?, ?)",
+                               [(row, now) for _, row in victims])
+        for key, _ in victims:
+            self._memory.pop(key, None)
+        self.stats["evictions"] += len(victims)
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from an EmbeddingStore,
+    keyed by (model_name, query/document, text hash), and only sends misses
+    to the underlying model.
+
+    `query_batch_kwargs` are the extra `embed_documents` arguments that make
+    the model embed a batch as queries (e.g. a task type); without them,
+    batched queries fall back to one `embed_query` call per miss.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, store: EmbeddingStore,
+                 query_batch_kwargs: dict = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.store = store
+        self.query_batch_kwargs = query_batch_kwargs
+
+    def _key(self, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _embed_cached(self, kind: str, texts: List[str], compute) -> List[List[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        found = self.store.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            computed = dict(zip(missing.keys(), compute(list(missing.values()))))
+            self.store.put_many(computed)
+            found.update(computed)
+        # Lists, as the wrapped model returns them; the store keeps float32 arrays
+        return [found[key].tolist() if isinstance(found[key], np.ndarray) else found[key] for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_cached("document", texts, self.embeddings.embed_documents)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several queries at once, batching the cache misses into one call.
+        """
+        def compute(missing: List[str]) -> List[List[float]]:
+            if self.query_batch_kwargs:
+                return self.embeddings.embed_documents(missing, **self.query_batch_kwargs)
+            return [self.embeddings.embed_query(text) for text in missing]
+
+        return self._embed_cached("query", texts, compute)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_cached("query", [text], lambda missing: [self.embeddings.embed_query(missing[0])])[0]
@@ -0,0 +1,63 @@
+import json
+import os
+import threading
+import time
+
+
+class IndexVersion:
+    """
+    A small JSON file naming the current version of the retrieval indexes,
+    shared by every server worker process.
+
+    The worker that finishes an /ingest or streaming /scrape calls `bump()`;
+    the others poll `current()`, which only re-reads the file when its mtime
+    changes, and reload their retriever when the version differs from the
+    one they loaded. The file is replaced atomically, so readers never see a
+    partial write.
+    """
+
+    def __init__(self, path: str = "Data/index_version.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._version = None
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Build from `serving.index_version_path` in config.yaml.
+        """
+        return cls(config.get("serving", {}).get("index_version_path", "Data/index_version.json"))
+
+    def current(self):
+        """
+        Return the published version, or None if nothing was published yet.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        with self._lock:
+            if stamp != self._stamp:
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        self._version = json.load(f).get("version")
+                except (OSError, ValueError):
+                    return self._version  # Replaced under us; the next poll reads the new file
+                self._stamp = stamp
+            return self._version
+
+    def bump(self, reason: str = ""):
+        """
+        Publish a new version and return it.
+        """
+        version = time.time_ns()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "updated_at": time.time(), "reason": reason, "pid": os.getpid()}, f)
+        os.replace(tmp_path, self.path)
+        return version
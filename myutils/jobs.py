@@ -0,0 +1,376 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: the lock only covers the current process
+    fcntl = None
+
+# The job running in the current worker thread, for report_progress()
+CURRENT_JOB: ContextVar[Optional["Job"]] = ContextVar("current_job", default=None)
+
+FINISHED = {"succeeded", "failed", "cancelled"}
+
+
+class JobCancelled(Exception):
+    """
+    Raised at the next progress report of a job whose cancellation was requested.
+    """
+
+
+class Job:
+    """
+    One unit of background work. `status` moves from queued to running to
+    succeeded, failed or cancelled; `progress` holds the latest report.
+    """
+
+    def __init__(self, kind: str, key: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = "queued"
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self.store = None
+        self._cancel = threading.Event()
+        self._saved_at = 0.0
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict) -> "Job":
+        """
+        A read-only view of a job run by another worker process.
+        """
+        job = cls(snapshot["kind"], snapshot["key"])
+        job.id = snapshot["job_id"]
+        for field in ["status", "progress", "result", "error", "created_at", "started_at", "finished_at"]:
+            setattr(job, field, snapshot[field])
+        return job
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def report(self, stage: str, done: int = None, total: int = None):
+        """
+        Record progress and stop the job here if it has been cancelled.
+        """
+        self.progress = {"stage": stage, "done": done, "total": total}
+        if self.store is not None and time.monotonic() - self._saved_at >= self.store.progress_interval:
+            # Publishes progress and picks up cancellations made through other workers
+            self._saved_at = time.monotonic()
+            if self.store.save(self):
+                self._cancel.set()
+        if self._cancel.is_set():
+            raise JobCancelled(f"Job {self.id} cancelled during {stage}")
+
+    def snapshot(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "key": self.key,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def report_progress(stage: str, done: int = None, total: int = None):
+    """
+    Report progress for the job running in this thread; a no-op outside jobs,
+    so pipelines can report unconditionally.
+    """
+    job = CURRENT_JOB.get()
+    if job is not None:
+        job.report(stage, done, total)
+
+
+class IndexLock:
+    """
+    Serializes the jobs that modify the indexes (/ingest and streaming
+    /scrape). Each run loads and saves the ingestion manifest and rebuilds
+    the BM25 index, so two concurrent runs would drop each other's entries.
+
+    A thread lock covers this process; with `path`, an exclusive flock on
+    that file covers the other server worker processes too. A job waiting
+    for the lock reports progress, so it can still be cancelled.
+    """
+
+    def __init__(self, path: str = None, poll_seconds: float = 0.5):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Build from `jobs.index_lock_path` in config.yaml.
+        """
+        return cls(config.get("jobs", {}).get("index_lock_path"))
+
+    @contextmanager
+    def hold(self):
+        while not self._lock.acquire(timeout=self.poll_seconds):
+            report_progress("waiting for index")
+        try:
+            if self.path is None or fcntl is None:
+                yield
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a") as file:
+                while True:
+                    try:
+                        fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        report_progress("waiting for index")
+                        time.sleep(self.poll_seconds)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(file, fcntl.LOCK_UN)
+        finally:
+            self._lock.release()
+
+
+class JobStore:
+    """
+    Job snapshots in SQLite, shared by every server worker process so that
+    any worker can report, list or cancel a job another one runs, and an
+    identical job is not started twice.
+
+    The owning worker writes a job when it is queued, starts and finishes,
+    and on progress reports at most every `progress_interval` seconds. An
+    unfinished job not written for `stale_seconds` is taken to belong to a
+    worker that died.
+    """
+
+    def __init__(self, path: str, stale_seconds: float = 600, progress_interval: float = 1.0):
+        self.progress_interval = progress_interval
+        self.stale_seconds = stale_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT, key TEXT, status TEXT, "
+                "snapshot TEXT, created_at REAL, updated_at REAL, cancel INTEGER NOT NULL DEFAULT 0)"
+            )
+
+    def claim(self, job: Job) -> Optional[dict]:
+        """
+        Record `job` unless an identical one is in flight in any worker, in
+        which case that job's snapshot is returned instead.
+        """
+        now = time.time()
+        placeholders = ", ".join("?" * len(FINISHED))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT snapshot FROM jobs WHERE kind = ? AND key = ? AND status NOT IN ({placeholders}) "
+                    "AND updated_at >= ? ORDER BY created_at DESC LIMIT 1",
+                    (job.kind, job.key, *FINISHED, now - self.stale_seconds),
+                ).fetchone()
+                if row is None:
+                    self._write(job, now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return json.loads(row[0]) if row is not None else None
+
+    def _write(self, job: Job, now: float):
+        self._conn.execute(
+            "INSERT INTO jobs (id, kind, key, status, snapshot, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET status = excluded.status, snapshot = excluded.snapshot, "
+            "updated_at = excluded.updated_at",
+            (job.id, job.kind, job.key, job.status, json.dumps(job.snapshot(), default=str), job.created_at, now),
+        )
+
+    def save(self, job: Job) -> bool:
+        """
+        Write the job's snapshot; returns whether its cancellation was
+        requested through any worker.
+        """
+        with self._lock:
+            self._write(job, time.time())
+            row = self._conn.execute("SELECT cancel FROM jobs WHERE id = ?", (job.id,)).fetchone()
+        return bool(row and row[0])
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT snapshot FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def list(self, limit: int) -> list:
+        with self._lock:
+            rows = self._conn.execute("SELECT snapshot FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def request_cancel(self, job_id: str) -> Optional[dict]:
+        """
+        Flag the job for its owning worker to stop at its next progress report.
+        """
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET cancel = 1 WHERE id = ?", (job_id,))
+        return self.get(job_id)
+
+    def trim(self, history: int):
+        placeholders = ", ".join("?" * len(FINISHED))
+        with self._lock:
+            self._conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({placeholders}) AND id NOT IN "
+                f"(SELECT id FROM jobs WHERE status IN ({placeholders}) ORDER BY created_at DESC LIMIT ?)",
+                (*FINISHED, *FINISHED, history),
+            )
+
+
+class JobScheduler:
+    """
+    Runs jobs on a small worker pool, away from the event loop that serves
+    /chat.
+
+    A job is identified by (kind, key): submitting while an identical job is
+    queued or running returns that job instead of starting another.
+    Cancellation drops queued jobs at once and stops running ones at their
+    next progress report. The last `history` finished jobs are kept for
+    status queries.
+
+    With a `store`, jobs are also visible to, deduplicated across and
+    cancellable from the other server worker processes.
+    """
+
+    def __init__(self, max_workers: int = 2, history: int = 100, store: JobStore = None):
+        self.history = history
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._jobs = OrderedDict()
+        self._active = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Build a scheduler from the `jobs` section of config.yaml.
+        """
+        jobs_config = config.get("jobs", {})
+        store = None
+        if jobs_config.get("store_path"):
+            store = JobStore(jobs_config["store_path"], stale_seconds=jobs_config.get("stale_seconds", 600))
+        return cls(max_workers=jobs_config.get("max_workers", 2), history=jobs_config.get("history", 100),
+                   store=store)
+
+    def submit(self, kind: str, key: str, fn: Callable[[], object]):
+        """
+        Queue `fn` as a job and return (job, created). `created` is False when
+        an identical job was already in flight and is returned instead.
+        """
+        with self._lock:
+            active = self._active.get((kind, key))
+            if active is not None:
+                return active, False
+            job = Job(kind, key)
+            if self.store is not None:
+                job.store = self.store
+                remote = self.store.claim(job)
+                if remote is not None:
+                    return Job.from_snapshot(remote), False
+            self._jobs[job.id] = job
+            self._active[(kind, key)] = job
+            self._trim()
+        job.future = self._executor.submit(self._run, job, fn)
+        return job, True
+
+    def _run(self, job: Job, fn: Callable[[], object]):
+        if job.cancel_requested:
+            return self._finish(job, "cancelled")
+        job.status = "running"
+        job.started_at = time.time()
+        if self.store is not None:
+            self.store.save(job)
+        token = CURRENT_JOB.set(job)
+        try:
+            job.result = fn()
+            self._finish(job, "succeeded")
+        except JobCancelled:
+            self._finish(job, "cancelled")
+        except Exception as e:
+            job.error = str(e)
+            print(f"Job {job.kind} {job.id} failed: {e}")
+            self._finish(job, "failed")
+        finally:
+            CURRENT_JOB.reset(token)
+
+    def _finish(self, job: Job, status: str):
+        job.status = status
+        job.finished_at = time.time()
+        if self.store is not None:
+            self.store.save(job)
+        with self._lock:
+            if self._active.get((job.kind, job.key)) is job:
+                del self._active[(job.kind, job.key)]
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+        if self.store is not None:
+            self.store.trim(self.history)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            snapshot = self.store.get(job_id)
+            job = Job.from_snapshot(snapshot) if snapshot is not None else None
+        return job
+
+    def list(self) -> list:
+        if self.store is not None:
+            return self.store.list(self.history + len(self._active))
+        return [job.snapshot() for job in reversed(list(self._jobs.values()))]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Request cancellation; returns the job, or None if it is unknown.
+        """
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            snapshot = self.store.get(job_id)
+            if snapshot is None or snapshot["status"] in FINISHED:
+                return Job.from_snapshot(snapshot) if snapshot is not None else None
+            return Job.from_snapshot(self.store.request_cancel(job_id))
+        if job is None or job.status in FINISHED:
+            return job
+        job._cancel.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, "cancelled")
+        return job
+
+    def shutdown(self):
+        for job in list(self._jobs.values()):
+            if job.status not in FINISHED:
+                self.cancel(job.id)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,331 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict, PrivateAttr
+
+from myutils.metrics import REGISTRY
+
+LLM_REQUESTS = REGISTRY.counter("app_llm_requests", "LLM provider calls by outcome.", ("provider", "outcome"))
+LLM_HEDGES = REGISTRY.counter("app_llm_hedges", "Hedged requests fired after the primary's deadline.", ("provider",))
+
+
+def percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `cooldown_seconds`. After the cooldown one trial call is let through
+    (half-open): success closes the breaker, failure opens it again, and a
+    trial that is cancelled (it lost a hedge or the request timed out) frees
+    the slot for the next call.
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._trial or time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            return "half_open"
+        return "open"
+
+    def available(self) -> bool:
+        """
+        Whether a call may be sent now, without claiming the half-open trial.
+        """
+        with self._lock:
+            return self.state == "closed" or (self.state == "half_open" and not self._trial)
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def release(self):
+        """
+        Give back a half-open trial whose call was cancelled before it
+        succeeded or failed.
+        """
+        with self._lock:
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._trial = False
+
+
+class ProviderStats:
+    """
+    Rolling latency and outcome windows for one provider. Answers and
+    streams are tracked apart: a stream's latency is its time to first token.
+    """
+
+    def __init__(self, window: int = 100, breaker: CircuitBreaker = None):
+        self.latencies = {"answer": deque(maxlen=window), "first_token": deque(maxlen=window)}
+        self.outcomes = deque(maxlen=window)
+        self.breaker = breaker or CircuitBreaker()
+        self._lock = threading.Lock()
+
+    def record_success(self, kind: str, seconds: float):
+        with self._lock:
+            self.latencies[kind].append(seconds)
+            self.outcomes.append(True)
+        self.breaker.success()
+
+    def record_failure(self):
+        with self._lock:
+            self.outcomes.append(False)
+        self.breaker.failure()
+
+    def record_cancelled(self, kind: str, seconds: float):
+        # A call that lost a hedge took at least this long
+        with self._lock:
+            self.latencies[kind].append(seconds)
+        self.breaker.release()
+
+    def latency(self, kind: str, p: float) -> Optional[float]:
+        with self._lock:
+            samples = list(self.latencies[kind])
+        return percentile(samples, p) if samples else None
+
+    def sample_count(self, kind: str) -> int:
+        return len(self.latencies[kind])
+
+    def error_rate(self) -> float:
+        with self._lock:
+            outcomes = list(self.outcomes)
+        return outcomes.count(False) / len(outcomes) if outcomes else 0.0
+
+
+class LLMRouter(BaseChatModel):
+    """
+    Chat model that routes each call across several providers.
+
+    Providers are ranked by rolling median latency (untried ones first, in
+    config order) and those whose circuit breaker is open are skipped. If the
+    chosen provider has not answered within its `hedge_percentile` latency,
+    the request is also sent to the next provider and the first answer wins;
+    the loser is cancelled. A provider that fails hands over to the next one
+    straight away. Streams are hedged on time to first token and commit to
+    whichever provider produces it. Hedging applies to async calls, which is
+    how the app calls the chain; sync calls only fall back.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    providers: Dict[str, Any]
+    hedge_percentile: float = 95.0
+    hedge_delay_seconds: float = 2.0
+    min_samples: int = 10
+    window: int = 100
+    failure_threshold: int = 5
+    cooldown_seconds: float = 30.0
+
+    _stats: Dict[str, ProviderStats] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context: Any):
+        self._stats = {
+            name: ProviderStats(self.window, CircuitBreaker(self.failure_threshold, self.cooldown_seconds))
+            for name in self.providers
+        }
+
+    @classmethod
+    def from_config(cls, config: dict, load_model: Callable[[dict], BaseChatModel]):
+        """
+        Build a router over `llm.router.providers` (entries of the `llm`
+        section), or return None when routing is disabled.
+        """
+        llm_config = config["llm"]
+        router_config = llm_config.get("router", {})
+        if not router_config.get("enabled", False):
+            return None
+        return cls(
+            providers={name: load_model(llm_config[name]) for name in router_config["providers"]},
+            hedge_percentile=router_config.get("hedge_percentile", 95.0),
+            hedge_delay_seconds=router_config.get("hedge_delay_seconds", 2.0),
+            min_samples=router_config.get("min_samples", 10),
+            window=router_config.get("window", 100),
+            failure_threshold=router_config.get("failure_threshold", 5),
+            cooldown_seconds=router_config.get("cooldown_seconds", 30.0),
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "llm-router"
+
+    def _candidates(self, kind: str) -> List[str]:
+        order = {name: index for index, name in enumerate(self.providers)}
+        healthy = [name for name in self.providers if self._stats[name].breaker.available()]
+        return sorted(healthy, key=lambda name: (self._stats[name].latency(kind, 50) or 0.0, order[name]))
+
+    def _deadline(self, name: str, kind: str) -> float:
+        stats = self._stats[name]
+        if stats.sample_count(kind) < self.min_samples:
+            return self.hedge_delay_seconds
+        return stats.latency(kind, self.hedge_percentile)
+
+    def _no_provider(self) -> RuntimeError:
+        return RuntimeError("No LLM provider available: every circuit breaker is open")
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        error = self._no_provider()
+        for name in self._candidates("answer"):
+            if not self._stats[name].breaker.allow():
+                continue
+            started = time.perf_counter()
+            try:
+                message = self.providers[name].invoke(messages, stop=stop, **kwargs)
+            except Exception as e:
+                self._failed(name, e)
+                error = e
+                continue
+            self._succeeded(name, "answer", time.perf_counter() - started)
+            return ChatResult(generations=[ChatGeneration(message=message)])
+        raise error
+
+    async def _race(self, kind: str, start: Callable[[str], Any], discard: Callable[[Any], Any] = None):
+        """
+        Run `start(provider)` on the best provider, hedging and falling back
+        as described on the class. Returns the first successful result.
+        """
+        candidates = self._candidates(kind)
+        pending = {}
+        error = self._no_provider()
+        hedged = False
+
+        def launch() -> bool:
+            while candidates:
+                name = candidates.pop(0)
+                if self._stats[name].breaker.allow():
+                    pending[asyncio.ensure_future(start(name))] = (name, time.perf_counter())
+                    return True
+            return False
+
+        try:
+            while True:
+                if not pending and not launch():
+                    raise error
+                timeout = None
+                if not hedged and candidates and len(pending) == 1:
+                    name, started = next(iter(pending.values()))
+                    timeout = max(0.0, started + self._deadline(name, kind) - time.perf_counter())
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    primary = next(iter(pending.values()))[0]
+                    if launch():
+                        LLM_HEDGES.labels(primary).inc()
+                        print(f"LLM provider {primary} is slow; hedging")
+                    continue
+
+                winner = None
+                for task in done:
+                    name, started = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        self._failed(name, e)
+                        error = e
+                        continue
+                    if winner is None:
+                        self._succeeded(name, kind, time.perf_counter() - started)
+                        winner = result
+                    elif discard is not None:
+                        await discard(result)
+                if winner is not None:
+                    return winner
+        finally:
+            for task, (name, started) in pending.items():
+                task.cancel()
+                self._stats[name].record_cancelled(kind, time.perf_counter() - started)
+                LLM_REQUESTS.labels(name, "cancelled").inc()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        async def start(name: str):
+            return await self.providers[name].ainvoke(messages, stop=stop, **kwargs)
+
+        message = await self._race("answer", start)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        async def start(name: str):
+            stream = self.providers[name].astream(messages, stop=stop, **kwargs)
+            try:
+                return name, stream, await stream.__anext__()
+            except BaseException:
+                await stream.aclose()
+                raise
+
+        async def discard(result):
+            await result[1].aclose()
+
+        name, stream, chunk = await self._race("first_token", start, discard)
+        try:
+            while True:
+                yield ChatGenerationChunk(message=chunk)
+                try:
+                    chunk = await stream.__anext__()
+                except StopAsyncIteration:
+                    break
+        except Exception as e:
+            self._failed(name, e)
+            raise
+        finally:
+            await stream.aclose()
+
+    def _succeeded(self, name: str, kind: str, seconds: float):
+        self._stats[name].record_success(kind, seconds)
+        LLM_REQUESTS.labels(name, "success").inc()
+
+    def _failed(self, name: str, error: Exception):
+        print(f"LLM provider {name} failed: {error}")
+        self._stats[name].record_failure()
+        LLM_REQUESTS.labels(name, "error").inc()
+
+    def stats(self) -> dict:
+        """
+        Per-provider breaker state, error rate and rolling latencies.
+        """
+        report = {}
+        for name, stats in self._stats.items():
+            report[name] = {
+                "state": stats.breaker.state,
+                "error_rate": stats.error_rate(),
+                "p50_seconds": stats.latency("answer", 50),
+                f"p{self.hedge_percentile:g}_seconds": stats.latency("answer", self.hedge_percentile),
+                "first_token_p50_seconds": stats.latency("first_token", 50),
+            }
+        return report
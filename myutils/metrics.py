@@ -0,0 +1,130 @@
+import bisect
+import threading
+
+
+class Histogram:
+    """
+    Cumulative histogram over fixed bucket upper bounds (Prometheus style).
+    """
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        """
+        Return cumulative bucket counts keyed by upper bound, plus sum and count.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets + [float("inf")], counts):
+            running += bucket_count
+            cumulative["+Inf" if bound == float("inf") else repr(bound)] = running
+        return {"buckets": cumulative, "sum": total, "count": count,
+                "mean": total / count if count else 0.0}
+
+
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class MetricFamily:
+    """
+    One named metric with a child Counter or Histogram per label combination.
+    """
+
+    def __init__(self, name: str, help: str, kind: str, label_names=(), buckets=None):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self.buckets = buckets
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = Histogram(self.buckets) if self.kind == "histogram" else Counter()
+                    self._children[values] = child
+        return child
+
+    def _label_text(self, values, extra=None) -> str:
+        pairs = list(zip(self.label_names, values)) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            if self.kind == "counter":
+                lines.append(f"{self.name}_total{self._label_text(values)} {child.value}")
+                continue
+            snapshot = child.snapshot()
+            for bound, count in snapshot["buckets"].items():
+                lines.append(f"{self.name}_bucket{self._label_text(values, ('le', bound))} {count}")
+            lines.append(f"{self.name}_sum{self._label_text(values)} {snapshot['sum']}")
+            lines.append(f"{self.name}_count{self._label_text(values)} {snapshot['count']}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsRegistry:
+    """
+    Process-wide set of metric families, rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _family(self, name: str, help: str, kind: str, label_names, buckets=None) -> MetricFamily:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = MetricFamily(name, help, kind, label_names, buckets)
+            return family
+
+    def counter(self, name: str, help: str, label_names=()) -> MetricFamily:
+        return self._family(name, help, "counter", label_names)
+
+    def histogram(self, name: str, help: str, label_names=(), buckets=LATENCY_BUCKETS) -> MetricFamily:
+        return self._family(name, help, "histogram", label_names, buckets)
+
+    def render(self) -> str:
+        lines = []
+        for name in sorted(self._families):
+            lines.extend(self._families[name].render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
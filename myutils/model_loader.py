@@ -1,44 +1,106 @@
-import os
-from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_google_genai import ChatGoogleGenerativeAI
-from myutils.config_loader import load_config
-from langchain_groq import ChatGroq
+from myutils.settings import get_settings
+from myutils.embedding_cache import CachedEmbeddings, EmbeddingStore
+from myutils.llm_router import LLMRouter
+
+PROVIDER_ENV_VARS={"google": "GOOGLE_API_KEY", "groq": "GROQ_API_KEY"}
 
 class ModelLoader:
     """
     A utility class to load embedding models and LLM models.
+
+    Providers are chosen in config: `embedding_model.provider` and the
+    `provider` of the `llm.default` entry (or of each `llm.router` provider).
+    "google" and "groq" are the real models; "fake" loads the deterministic
+    stand-ins from myutils.fake_models for benchmarks and offline runs.
     """
     def __init__(self):
-        load_dotenv()
+        self.settings=get_settings()
+        self.config=self.settings.config
+        # Set by load_embeddings: embed_documents arguments that embed a batch as queries
+        self.query_batch_kwargs=None
         self._validate_env()
-        self.config=load_config()
+
+    def _llm_config(self):
+        llm_config=self.config["llm"]
+        return llm_config[llm_config.get("default", "google")]
 
     def _validate_env(self):
         """
-        Validate necessary environment variables.
+        Validate the environment variables the configured providers need.
+        """
+        providers={self.config["embedding_model"].get("provider", "google")}
+        providers.update(llm_config["provider"] for llm_config in self._llm_configs())
+        self.settings.require([PROVIDER_ENV_VARS[provider] for provider in sorted(providers)
+                               if provider in PROVIDER_ENV_VARS])
+        self.google_api_key=self.settings.env["GOOGLE_API_KEY"]
+        self.groq_api_key=self.settings.env["GROQ_API_KEY"]
+
+    def _llm_configs(self):
+        """
+        The `llm` entries that will be loaded: the router's providers when
+        routing is enabled, otherwise `llm.default`.
         """
-        required_vars = ["GOOGLE_API_KEY"]
-        self.google_api_key=os.getenv("GOOGLE_API_KEY")
-        missing_vars = [var for var in required_vars if not os.getenv(var)]
-        if missing_vars:
-            raise EnvironmentError(f"Missing environment variables: {missing_vars}")
+        llm_config=self.config["llm"]
+        router_config=llm_config.get("router", {})
+        if router_config.get("enabled", False):
+            return [llm_config[name] for name in router_config["providers"]]
+        return [self._llm_config()]
 
     def load_embeddings(self):
         """
-        Load and return the embedding model.
+        Load and return the embedding model, wrapped in the persistent
+        embedding cache when it is enabled in config.
         """
         print("Loading Embedding model")
-        model_name=self.config["embedding_model"]["model_name"]
-        return GoogleGenerativeAIEmbeddings(model=model_name)
+        embedding_config=self.config["embedding_model"]
+        model_name=embedding_config["model_name"]
+        query_batch_kwargs=None
+        if embedding_config.get("provider", "google") == "fake":
+            from myutils.fake_models import FakeEmbeddings
+            embeddings=FakeEmbeddings(size=embedding_config.get("dimensions", 256),
+                                      latency=embedding_config.get("latency", 0.0))
+        else:
+            # Imported here so that importing the app doesn't pay for the provider SDK
+            from langchain_google_genai import GoogleGenerativeAIEmbeddings
+            embeddings=GoogleGenerativeAIEmbeddings(model=model_name)
+            # Lets batched query embedding keep the query task type
+            query_batch_kwargs={"task_type": "RETRIEVAL_QUERY"}
+        self.query_batch_kwargs=query_batch_kwargs
+
+        cache_config=self.config.get("embedding_cache", {})
+        if not cache_config.get("enabled", False):
+            return embeddings
+        store=EmbeddingStore.shared(
+            cache_config.get("path", "Data/embedding_cache"),
+            max_entries=cache_config.get("max_entries", 200000),
+            memory_entries=cache_config.get("memory_entries", 4096)
+            )
+        return CachedEmbeddings(embeddings, model_name, store, query_batch_kwargs=query_batch_kwargs)
+
+    def _load_chat_model(self, llm_config):
+        """
+        Build the chat model for one entry of the `llm` section.
+        """
+        provider=llm_config["provider"]
+        if provider == "fake":
+            from myutils.fake_models import FakeLatencyChatModel
+            return FakeLatencyChatModel(latency=llm_config.get("latency", 0.5))
+        if provider == "google":
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            return ChatGoogleGenerativeAI(model=llm_config["model_name"],api_key=self.google_api_key)
+        if provider == "groq":
+            from langchain_groq import ChatGroq
+            return ChatGroq(model=llm_config["model_name"],api_key=self.groq_api_key)
+        raise ValueError(f"Unsupported LLM provider: {provider}")
 
     def load_llm(self):
         """
-        Load and return the LLM model.
+        Load and return the LLM model: an LLMRouter over several providers
+        when `llm.router` is enabled, otherwise the `llm.default` model.
         """
         print("LLM loading...")
-        model_name=self.config["llm"]["google"]["model_name"]
-        google_model=ChatGoogleGenerativeAI(model=model_name,api_key=self.google_api_key)
-        
-        return google_model
\ No newline at end of file
+        router=LLMRouter.from_config(self.config, self._load_chat_model)
+        if router is not None:
+            print(f"Routing LLM calls across {list(router.providers)}")
+            return router
+        return self._load_chat_model(self._llm_config())
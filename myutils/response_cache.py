@@ -0,0 +1,152 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from myutils.attribute_parser import extract_constraints
+
+
+def normalize_query(query: str) -> str:
+    """
+    Lower-case, drop punctuation and collapse whitespace so trivially
+    different wordings share one exact-match key.
+    """
+    query = re.sub(r"(?<=\d),(?=\d)", "", query.lower())
+    query = re.sub(r"[^\w\s₹.]", " ", query)
+    query = re.sub(r"(?<!\d)\.|\.(?!\d)", " ", query)
+    return " ".join(query.split())
+
+
+class ResponseCache:
+    """
+    Cache of /chat answers with two lookups: an exact match on the normalized
+    query, then a semantic match on query-embedding cosine similarity above
+    `similarity_threshold`. Entries expire after `ttl_seconds` and the least
+    recently used ones are evicted beyond `max_entries`. `invalidate()` drops
+    everything, e.g. after the collection changes. A semantic match also needs
+    the same price/rating/RAM/storage constraints, since "under ₹30,000" and
+    "under ₹40,000" embed almost identically.
+    """
+
+    def __init__(self, embeddings=None, similarity_threshold: float = 0.95, ttl_seconds: float = 3600,
+                 max_entries: int = 1000):
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.generation = 0
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "invalidations": 0}
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._matrix = None
+        self._matrix_keys = []
+
+    @classmethod
+    def from_config(cls, config: dict, embeddings=None):
+        """
+        Build a cache from the `response_cache` section of config.yaml, or
+        return None when it is disabled.
+        """
+        cache_config = config.get("response_cache", {})
+        if not cache_config.get("enabled", False):
+            return None
+        return cls(
+            embeddings=embeddings if cache_config.get("semantic", True) else None,
+            similarity_threshold=cache_config.get("similarity_threshold", 0.95),
+            ttl_seconds=cache_config.get("ttl_seconds", 3600),
+            max_entries=cache_config.get("max_entries", 1000),
+        )
+
+    def _embed(self, query: str):
+        # The raw query, as the retriever embeds it, so the embedding cache serves both with one model call
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [key for key, entry in self._entries.items() if entry["created"] < cutoff]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _semantic_matrix(self):
+        if self._matrix is None:
+            self._matrix_keys = [key for key, entry in self._entries.items() if entry["vector"] is not None]
+            vectors = [self._entries[key]["vector"] for key in self._matrix_keys]
+            self._matrix = np.stack(vectors) if vectors else None
+        return self._matrix
+
+    def lookup(self, query: str, semantic: bool = True):
+        """
+        Return (response, "exact" | "semantic"), or (None, None) on a miss.
+        With `semantic=False` only the exact key is checked and the query is
+        not embedded.
+        """
+        key = normalize_query(query)
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                return entry["response"], "exact"
+            has_candidates = semantic and self.embeddings is not None and bool(self._entries)
+
+        if has_candidates:
+            vector = self._embed(query)
+            with self._lock:
+                matrix = self._semantic_matrix()
+                if matrix is not None:
+                    similarities = matrix @ vector
+                    best = int(np.argmax(similarities))
+                    match = self._matrix_keys[best]
+                    if (similarities[best] >= self.similarity_threshold
+                            and self._entries[match]["constraints"] == extract_constraints(key)):
+                        self._entries.move_to_end(match)
+                        self.stats["semantic_hits"] += 1
+                        return self._entries[match]["response"], "semantic"
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None, None
+
+    def store(self, query: str, response, generation: int = None, semantic: bool = True):
+        """
+        Cache a response. Pass the `generation` read before the answer was
+        computed so answers produced against an invalidated collection are dropped.
+        With `semantic=False` the entry only serves exact matches and the
+        query is not embedded.
+        """
+        if generation is not None and generation != self.generation:
+            return
+        key = normalize_query(query)
+        vector = self._embed(query) if semantic and self.embeddings is not None else None
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = {"response": response, "vector": vector, "created": time.time(),
+                                  "constraints": extract_constraints(key)}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self.generation += 1
+            self.stats["invalidations"] += 1
+
+    def hit_rate(self) -> float:
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "entries": len(self._entries), "hit_rate": round(self.hit_rate(), 4)}
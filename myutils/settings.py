@@ -0,0 +1,78 @@
+import os
+import threading
+from types import MappingProxyType
+from typing import List
+
+from dotenv import load_dotenv
+
+from myutils.config_loader import load_config
+
+ENV_VARS = ["GOOGLE_API_KEY", "GROQ_API_KEY", "ASTRA_DB_API_ENDPOINT", "ASTRA_DB_APPLICATION_TOKEN",
+            "ASTRA_DB_KEYSPACE"]
+
+
+def freeze(value):
+    """
+    Recursively turn dicts into read-only mappings and lists into tuples.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class Settings:
+    """
+    Configuration and environment, parsed once per process.
+
+    `config` is a read-only view of config/config.yaml and `env` holds the
+    environment variables the app uses, read after `.env` is loaded.
+    """
+
+    def __init__(self, config: dict, env: dict):
+        self.config = freeze(config)
+        self.env = MappingProxyType(dict(env))
+
+    @classmethod
+    def load(cls, config_path: str = None):
+        """
+        Load `config_path`, else the file named by APP_CONFIG, else
+        config/config.yaml. APP_CONFIG reaches every server worker process.
+        """
+        load_dotenv()
+        config_path = config_path or os.getenv("APP_CONFIG") or "config/config.yaml"
+        return cls(load_config(config_path), {name: os.getenv(name) for name in ENV_VARS})
+
+    def require(self, names: List[str]):
+        """
+        Raise EnvironmentError listing any of `names` that are not set.
+        """
+        missing_vars = [name for name in names if not self.env.get(name)]
+        if missing_vars:
+            raise EnvironmentError(f"Missing environment variables: {missing_vars}")
+
+
+_settings = None
+_settings_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    """
+    Return the process-wide Settings, loading them on first use.
+    """
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            _settings = Settings.load()
+        return _settings
+
+
+def set_settings(settings: Settings):
+    """
+    Install `settings` as the process-wide Settings, e.g. for benchmarks that
+    swap in fake providers. Call before the app or loaders are created.
+    """
+    global _settings
+    with _settings_lock:
+        _settings = settings
@@ -0,0 +1,196 @@
+import time
+from contextvars import ContextVar
+from typing import Iterable, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+
+from myutils.metrics import REGISTRY
+
+STAGE_SECONDS = REGISTRY.histogram("app_stage_duration_seconds", "Time spent in each pipeline stage.", ("stage",))
+STAGE_ERRORS = REGISTRY.counter("app_stage_errors", "Pipeline stages that raised.", ("stage",))
+RETRIEVED_DOCUMENTS = REGISTRY.histogram("app_retrieved_documents", "Documents returned by the retriever.",
+                                         buckets=[0, 1, 2, 3, 5, 10, 20, 50])
+RETRIEVED_CONTEXT_CHARS = REGISTRY.histogram("app_retrieved_context_chars", "Characters of retrieved context.",
+                                             buckets=[0, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000])
+CONTEXT_TOKENS = REGISTRY.histogram("app_context_tokens", "Estimated tokens of assembled prompt context.",
+                                    buckets=[0, 100, 200, 400, 800, 1200, 1600, 2400, 3200])
+
+# Per-request stage totals, read back into the Server-Timing header
+REQUEST_TIMINGS: ContextVar[Optional[dict]] = ContextVar("request_timings", default=None)
+
+_enabled = True
+
+
+def configure(config: dict):
+    """
+    Turn stage timing on or off from the `metrics` section of config.
+    """
+    global _enabled
+    _enabled = config.get("metrics", {}).get("enabled", True)
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def record(stage: str, seconds: float, failed: bool = False):
+    """
+    Add one observation of `stage` to the histograms and the current request.
+    """
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    if failed:
+        STAGE_ERRORS.labels(stage).inc()
+    timings = REQUEST_TIMINGS.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+class span:
+    """
+    Times the enclosed block as `stage`:
+
+        with span("scrape.parse"):
+            ...
+
+    Spans may nest; each stage is recorded on its own, so an outer stage
+    includes the time of the stages inside it.
+    """
+
+    __slots__ = ("stage", "_started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._started = None
+
+    def __enter__(self):
+        if _enabled:
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self._started is not None:
+            record(self.stage, time.perf_counter() - self._started, failed=exc_type is not None)
+        return False
+
+
+def timed_iter(iterable: Iterable, stage: str):
+    """
+    Yield from `iterable`, recording the time spent producing items as
+    `stage`. Used for lazy pipelines where work happens on each next().
+    """
+    if not _enabled:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    elapsed = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - started
+                break
+            elapsed += time.perf_counter() - started
+            yield item
+    finally:
+        record(stage, elapsed)
+
+
+def record_retrieved(documents: List):
+    if _enabled:
+        RETRIEVED_DOCUMENTS.labels().observe(len(documents))
+        RETRIEVED_CONTEXT_CHARS.labels().observe(sum(len(document.page_content) for document in documents))
+
+
+def server_timing(timings: dict) -> str:
+    """
+    Format stage totals as a Server-Timing header value, in milliseconds.
+    """
+    return ", ".join(f"{stage.replace('.', '_')};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+class TimedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model so that query and document embedding are
+    recorded as `<stage>` spans.
+    """
+
+    def __init__(self, embeddings: Embeddings, stage: str = "embed"):
+        self.embeddings = embeddings
+        self.stage = stage
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with span(self.stage):
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with span(self.stage):
+            return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        with span(self.stage):
+            return await self.embeddings.aembed_query(text)
+
+    def __getattr__(self, name):
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+
+class StageTimer(BaseCallbackHandler):
+    """
+    LangChain callback handler that records the chain's retriever, prompt,
+    LLM and output-parser runs as stages, and the size of retrieved context.
+    Pass it in the run config: chain.ainvoke(query, config={"callbacks": [timer]}).
+    When streaming, the parser's run lasts as long as the stream, so "parse"
+    then overlaps "llm".
+    """
+
+    run_inline = True
+    CHAIN_STAGES = {"ChatPromptTemplate": "prompt", "StrOutputParser": "parse"}
+
+    def __init__(self):
+        self._runs = {}
+
+    def _start(self, run_id, stage: str):
+        if stage is not None:
+            self._runs[run_id] = (stage, time.perf_counter())
+
+    def _end(self, run_id, failed: bool = False):
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            stage, started = run
+            record(stage, time.perf_counter() - started, failed=failed)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, **kwargs):
+        self._start(run_id, self.CHAIN_STAGES.get(kwargs.get("name")))
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, failed=True)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "llm")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "llm")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, failed=True)
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id, "retrieve")
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id)
+        record_retrieved(documents)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, failed=True)
@@ -0,0 +1,22 @@
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters Flipkart appends for tracking; they do not change the page.
+TRACKING_PARAMS = {"otracker", "otracker1", "iid", "ssid", "qh"}
+
+
+def normalize_product_url(url: str) -> str:
+    """
+    Normalize a product URL so that the same product always maps to the same key:
+    lower-case scheme and host, drop 'www.', drop tracking parameters and the
+    fragment, and sort the remaining query parameters.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[len("www."):]
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), host, path, urlencode(query), ""))
@@ -0,0 +1,66 @@
+from typing import List
+
+from myutils.settings import Settings, get_settings
+
+ASTRA_ENV_VARS = ["ASTRA_DB_API_ENDPOINT", "ASTRA_DB_APPLICATION_TOKEN", "ASTRA_DB_KEYSPACE"]
+
+
+def vector_store_backend(config: dict) -> str:
+    return config.get("vector_store", {}).get("backend", "astra")
+
+
+def vector_store_id(config: dict) -> str:
+    """
+    Identifies the collection ingestion writes to, e.g. for the ingestion manifest.
+    """
+    backend = vector_store_backend(config)
+    if backend == "local":
+        return f"local:{config.get('vector_store', {}).get('local', {}).get('path', 'Data/local_index')}"
+    if backend == "memory":
+        return f"memory:{config.get('vector_store', {}).get('memory', {}).get('name', 'default')}"
+    return f"{backend}:{config['astra_db']['collection_name']}"
+
+
+def required_env_vars(config: dict) -> List[str]:
+    """
+    Environment variables needed for the configured vector-store backend and
+    embedding provider.
+    """
+    required = []
+    if config.get("embedding_model", {}).get("provider", "google") == "google":
+        required.append("GOOGLE_API_KEY")
+    if vector_store_backend(config) == "astra":
+        required += ASTRA_ENV_VARS
+    return required
+
+
+def load_vector_store(config: dict, embeddings, settings: Settings = None):
+    """
+    Build the vector store selected by `vector_store.backend` in config.yaml:
+    "astra" (AstraDB, the default), "local" (in-process memory-mapped index)
+    or "memory" (non-persistent, for benchmarks and offline runs).
+
+    AstraDB credentials are read from `settings`, by default the process-wide
+    Settings, which raise EnvironmentError naming any that are missing.
+    """
+    backend = vector_store_backend(config)
+    if backend == "memory":
+        from retriever.memory_vector_store import MemoryVectorStore
+        return MemoryVectorStore.shared(config.get("vector_store", {}).get("memory", {}).get("name", "default"),
+                                        embeddings)
+    if backend == "local":
+        from retriever.local_vector_store import LocalVectorStore
+        path = config.get("vector_store", {}).get("local", {}).get("path", "Data/local_index")
+        return LocalVectorStore(embeddings, path=path)
+    if backend == "astra":
+        settings = settings or get_settings()
+        settings.require(ASTRA_ENV_VARS)
+        from langchain_astradb import AstraDBVectorStore
+        return AstraDBVectorStore(
+            embedding=embeddings,
+            collection_name=config["astra_db"]["collection_name"],
+            api_endpoint=settings.env["ASTRA_DB_API_ENDPOINT"],
+            token=settings.env["ASTRA_DB_APPLICATION_TOKEN"],
+            namespace=settings.env["ASTRA_DB_KEYSPACE"]
+        )
+    raise ValueError(f"Unknown vector_store.backend: {backend}")
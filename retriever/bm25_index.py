@@ -0,0 +1,301 @@
+import bisect
+import json
+import math
+import os
+import re
+import shutil
+import time
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from langchain_core.documents import Document
+
+from retriever.metadata_filter import matches_filter
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+SPLIT_PATTERN = re.compile(r"[a-z]+|[0-9]+(?:\.[0-9]+)?")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "best", "by", "can", "for", "from", "good", "i", "in",
+    "is", "it", "me", "my", "of", "on", "or", "show", "suggest", "the", "this", "to", "what", "which",
+    "with", "you",
+}
+
+# Fields indexed for lexical search, with their term-frequency weights
+INDEXED_FIELDS = {"product_title": 2, "product_highlights": 1, "product_reviews": 1}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-case word/number tokens. Mixed tokens such as "s25" or "512gb" are
+    kept whole and also split into their letter and number parts, and a
+    number followed by a unit ("512 GB") also yields the joined form, so
+    "512GB" and "512 GB" match each other.
+    """
+    tokens = []
+    previous = None
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            previous = None
+            continue
+        tokens.append(token)
+        parts = SPLIT_PATTERN.findall(token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part not in STOPWORDS)
+        elif previous is not None and previous[0].isdigit() and token.isalpha():
+            tokens.append(previous + token)
+        previous = token
+    return tokens
+
+
+# Letters and digits in one token ("s25", "a15", "g84", "14t"), not a decimal
+MODEL_TOKEN = re.compile(r"(?=[a-z0-9]*[a-z])(?=[a-z0-9]*[0-9])[a-z0-9]+")
+# Numbers with a unit or price multiplier ("8gb", "5000mah", "120hz", "30k", "5g") are specs, not models
+SPEC_TOKEN = re.compile(r"[0-9]+(?:gb|tb|mb|mah|mp|hz|inch|inches|k|l|lakh|lakhs|w|g|nm|fps|x|th|st|nd|rd)")
+
+
+def model_numbers(query: str) -> List[str]:
+    """
+    Tokens of the query that look like a model number ("S25", "A15"),
+    which usually names a specific SKU.
+    """
+    return [token for token in TOKEN_PATTERN.findall(query.lower())
+            if MODEL_TOKEN.fullmatch(token) and not SPEC_TOKEN.fullmatch(token)
+            and not token.startswith(("rs", "inr"))]
+
+
+def document_fields(document: Document) -> dict:
+    return {
+        "product_title": document.metadata.get("product_title", ""),
+        "product_highlights": document.metadata.get("product_highlights", ""),
+        "product_reviews": document.page_content,
+    }
+
+
+def _write_arrow(path: str, table: pa.Table):
+    with pa.OSFile(path, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _read_arrow(path: str) -> pa.Table:
+    # Zero-copy: the table's buffers point into the memory map
+    return ipc.open_file(pa.memory_map(path)).read_all()
+
+
+class SortedTerms:
+    """
+    Read-only term -> index lookup over the sorted vocabulary, by binary
+    search on a memory-mapped Arrow string column.
+    """
+
+    def __init__(self, terms: pa.Array):
+        self.terms = terms
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __getitem__(self, position: int) -> str:
+        return self.terms[position].as_py()
+
+    def get(self, term: str, default=None):
+        position = bisect.bisect_left(self, term)
+        return position if position < len(self.terms) and self[position] == term else default
+
+
+class StoredDocuments:
+    """
+    Read-only list of stored documents backed by a memory-mapped Arrow table
+    (id, page_content, metadata as JSON); rows are decoded on access.
+    """
+
+    def __init__(self, table: pa.Table):
+        self.ids = table.column("id")
+        self.page_contents = table.column("page_content")
+        self.metadatas = table.column("metadata")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, position: int) -> dict:
+        return {"id": self.ids[position].as_py(), "page_content": self.page_contents[position].as_py(),
+                "metadata": json.loads(self.metadatas[position].as_py())}
+
+
+class BM25Index:
+    """
+    BM25 inverted index over product title, highlights and reviews.
+
+    Postings are stored CSR-style in flat NumPy arrays (term offsets, doc
+    indices, term frequencies) saved as .npy files; the sorted vocabulary and
+    the stored documents are Arrow IPC files. Everything loads memory-mapped,
+    so server worker processes share one copy through the page cache.
+
+    Each save writes a new snapshot directory and then repoints the
+    `CURRENT` file at it. Loads never see a half-written index, and workers
+    still reading the previous snapshot keep it until they reload.
+    """
+
+    def __init__(self, vocabulary: dict, offsets: np.ndarray, postings: np.ndarray, frequencies: np.ndarray,
+                 doc_lengths: np.ndarray, documents: List[dict], k1: float = 1.5, b: float = 0.75):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.postings = postings
+        self.frequencies = frequencies
+        self.doc_lengths = doc_lengths
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    def __len__(self):
+        return len(self.documents)
+
+    @classmethod
+    def build(cls, documents: Iterable[Document]) -> "BM25Index":
+        """
+        Build the index from documents that carry their `id`.
+        """
+        term_postings = {}
+        doc_lengths = []
+        stored = []
+        for doc_index, document in enumerate(documents):
+            counts = Counter()
+            for field, weight in INDEXED_FIELDS.items():
+                for token in tokenize(str(document_fields(document)[field])):
+                    counts[token] += weight
+            for token, count in counts.items():
+                term_postings.setdefault(token, []).append((doc_index, count))
+            doc_lengths.append(sum(counts.values()))
+            stored.append({"id": document.id, "page_content": document.page_content, "metadata": document.metadata})
+
+        vocabulary = {}
+        offsets = [0]
+        postings = []
+        frequencies = []
+        for term_index, token in enumerate(sorted(term_postings)):
+            vocabulary[token] = term_index
+            for doc_index, count in term_postings[token]:
+                postings.append(doc_index)
+                frequencies.append(min(count, np.iinfo(np.uint16).max))
+            offsets.append(len(postings))
+
+        return cls(vocabulary, np.asarray(offsets, dtype=np.int64), np.asarray(postings, dtype=np.int32),
+                   np.asarray(frequencies, dtype=np.uint16), np.asarray(doc_lengths, dtype=np.int32), stored)
+
+    def save(self, path: str, keep: int = 2):
+        """
+        Write the index as a new snapshot under `path`, make it current and
+        remove all but the `keep` newest snapshots.
+        """
+        os.makedirs(path, exist_ok=True)
+        name = f"v{time.time_ns()}"
+        tmp_dir = os.path.join(path, f"{name}.tmp")
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, "offsets.npy"), self.offsets)
+        np.save(os.path.join(tmp_dir, "postings.npy"), self.postings)
+        np.save(os.path.join(tmp_dir, "frequencies.npy"), self.frequencies)
+        np.save(os.path.join(tmp_dir, "doc_lengths.npy"), self.doc_lengths)
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        _write_arrow(os.path.join(tmp_dir, "vocabulary.arrow"), pa.table({"term": pa.array(terms, pa.string())}))
+        _write_arrow(os.path.join(tmp_dir, "documents.arrow"), pa.table({
+            "id": pa.array([document["id"] for document in self.documents], pa.string()),
+            "page_content": pa.array([document["page_content"] for document in self.documents], pa.string()),
+            "metadata": pa.array([json.dumps(document["metadata"], ensure_ascii=False)
+                                  for document in self.documents], pa.string()),
+        }))
+        os.rename(tmp_dir, os.path.join(path, name))
+
+        pointer = os.path.join(path, "CURRENT")
+        with open(f"{pointer}.tmp", "w", encoding="utf-8") as file:
+            file.write(name)
+        os.replace(f"{pointer}.tmp", pointer)
+        # Snapshots still being written by another saver end in .tmp and are left alone
+        snapshots = sorted(entry for entry in os.listdir(path)
+                           if entry.startswith("v") and not entry.endswith(".tmp") and entry != name)
+        for old in snapshots[:max(0, len(snapshots) - (keep - 1))]:
+            shutil.rmtree(os.path.join(path, old), ignore_errors=True)
+        print(f"Saved BM25 index over {len(self.documents)} documents to {os.path.join(path, name)}")
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, "CURRENT"))
+
+    @staticmethod
+    def version(path: str) -> Optional[str]:
+        """
+        Name of the current snapshot, or None if there is no index at `path`.
+        """
+        try:
+            with open(os.path.join(path, "CURRENT"), "r", encoding="utf-8") as file:
+                return file.read().strip()
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Map the current snapshot, or return None if there is no index at `path`.
+        """
+        name = cls.version(path)
+        if name is None:
+            return None
+        snapshot = os.path.join(path, name)
+        arrays = {name: np.load(os.path.join(snapshot, f"{name}.npy"), mmap_mode="r")
+                  for name in ["offsets", "postings", "frequencies", "doc_lengths"]}
+        vocabulary = SortedTerms(_read_arrow(os.path.join(snapshot, "vocabulary.arrow")).column("term"))
+        documents = StoredDocuments(_read_arrow(os.path.join(snapshot, "documents.arrow")))
+        return cls(vocabulary, arrays["offsets"], arrays["postings"], arrays["frequencies"],
+                   np.asarray(arrays["doc_lengths"]), documents)
+
+    def _metadata(self, position: int) -> dict:
+        if isinstance(self.documents, StoredDocuments):
+            return json.loads(self.documents.metadatas[position].as_py())
+        return self.documents[position]["metadata"]
+
+    def has_model_number(self, query: str) -> bool:
+        """
+        True when the query names a model number that occurs in the index.
+        """
+        return any(self.vocabulary.get(token) is not None for token in model_numbers(query))
+
+    def search(self, query: str, k: int = 10, filter: Optional[dict] = None) -> List[Tuple[Document, float, float]]:
+        """
+        Return the top-k (document, BM25 score, coverage) triples, where
+        coverage is the fraction of the query's terms the document contains.
+        A metadata `filter` removes non-matching documents before ranking.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not len(self.documents):
+            return []
+
+        n_docs = len(self.documents)
+        scores = np.zeros(n_docs, dtype=np.float32)
+        matched = np.zeros(n_docs, dtype=np.int32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / (self.avg_length or 1.0))
+        for term in terms:
+            term_index = self.vocabulary.get(term)
+            if term_index is None:
+                continue
+            start, end = self.offsets[term_index], self.offsets[term_index + 1]
+            docs = np.asarray(self.postings[start:end])
+            tf = np.asarray(self.frequencies[start:end], dtype=np.float32)
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm[docs])
+            matched[docs] += 1
+
+        hits = np.flatnonzero(scores > 0)
+        if filter:
+            hits = np.asarray([hit for hit in hits if matches_filter(self._metadata(hit), filter)], dtype=np.int64)
+        if not len(hits):
+            return []
+        k = min(k, len(hits))
+        top = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        results = []
+        for doc_index in top:
+            stored = self.documents[doc_index]
+            document = Document(id=stored["id"], page_content=stored["page_content"], metadata=stored["metadata"])
+            results.append((document, float(scores[doc_index]), float(matched[doc_index]) / len(terms)))
+        return results
@@ -0,0 +1,178 @@
+import math
+import re
+from typing import List
+
+from langchain_core.documents import Document
+
+from retriever.bm25_index import tokenize
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\s{2,}|(?<=[a-z]{2})(?=[A-Z][a-z])")
+SHINGLE_SIZE = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (about four characters per token), good enough for budgeting.
+    """
+    return max(1, math.ceil(len(text) / 4))
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split review text into sentences. Scraped reviews are concatenated with
+    little punctuation, so double spaces and run-together words
+    ("iphoneColour") also count as boundaries.
+    """
+    sentences = []
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        sentence = sentence.strip(" .")
+        if len(sentence.split()) >= 2:
+            sentences.append(sentence)
+    return sentences
+
+
+def shingles(text: str) -> set:
+    words = text.lower().split()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+
+
+class ContextAssembler:
+    """
+    Turns retrieved documents into a compact prompt context.
+
+    Documents whose review text is a near-duplicate (shingle Jaccard at or
+    above `duplicate_threshold`) are collapsed into one entry listing the
+    variants. Each entry gets a one-line metadata header and the review
+    sentences that best match the query. Entries and sentences are added in
+    rank order until `token_budget` is reached.
+    """
+
+    def __init__(self, token_budget: int = 1200, max_products: int = 5, sentences_per_product: int = 4,
+                 duplicate_threshold: float = 0.8, highlight_chars: int = 160):
+        self.token_budget = token_budget
+        self.max_products = max_products
+        self.sentences_per_product = sentences_per_product
+        self.duplicate_threshold = duplicate_threshold
+        self.highlight_chars = highlight_chars
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Build from the `context` section of config.yaml, or return None when
+        it is disabled and documents go into the prompt as they are.
+        """
+        context_config = config.get("context", {})
+        if not context_config.get("enabled", False):
+            return None
+        return cls(
+            token_budget=context_config.get("token_budget", 1200),
+            max_products=context_config.get("max_products", 5),
+            sentences_per_product=context_config.get("sentences_per_product", 4),
+            duplicate_threshold=context_config.get("duplicate_threshold", 0.8),
+            highlight_chars=context_config.get("highlight_chars", 160),
+        )
+
+    def collapse_duplicates(self, documents: List[Document]) -> List[List[Document]]:
+        """
+        Group near-duplicate documents, keeping the best-ranked one first.
+        """
+        groups = []
+        for document in documents:
+            document_shingles = shingles(document.page_content)
+            for group, group_shingles in groups:
+                union = len(document_shingles | group_shingles)
+                if union and len(document_shingles & group_shingles) / union >= self.duplicate_threshold:
+                    group.append(document)
+                    break
+            else:
+                groups.append(([document], document_shingles))
+        return [group for group, _ in groups]
+
+    def _header(self, number: int, group: List[Document]) -> str:
+        metadata = group[0].metadata
+        parts = [f"[{number}] {metadata.get('product_title', '')}"]
+        if metadata.get("product_price"):
+            parts.append(str(metadata["product_price"]))
+        if metadata.get("product_rating"):
+            parts.append(f"rating {metadata['product_rating']}")
+        # Near-duplicates collapsed here or already by the retriever
+        variants = [doc.metadata.get("product_title", "") for doc in group[1:]]
+        variants += [title for doc in group for title in doc.metadata.get("variants", [])]
+        if variants:
+            parts.append("also: " + "; ".join(variants))
+        header = " | ".join(parts)
+        highlights = str(metadata.get("product_highlights", ""))
+        if highlights:
+            if len(highlights) > self.highlight_chars:
+                highlights = highlights[:self.highlight_chars].rsplit(" ", 1)[0] + "…"
+            header += f"\nHighlights: {highlights}"
+        return header
+
+    def _ranked_sentences(self, query: str, groups: List[List[Document]]) -> List[List[tuple]]:
+        """
+        Per group, (position, sentence) pairs ordered by query relevance:
+        summed IDF of matched query terms, ties broken by original position.
+        """
+        candidates = [split_sentences(group[0].page_content) for group in groups]
+        query_terms = set(tokenize(query))
+        sentence_terms = [[set(tokenize(sentence)) & query_terms for sentence in sentences]
+                          for sentences in candidates]
+        total = sum(len(sentences) for sentences in candidates) or 1
+        document_frequency = {}
+        for terms_list in sentence_terms:
+            for terms in terms_list:
+                for term in terms:
+                    document_frequency[term] = document_frequency.get(term, 0) + 1
+
+        seen = set()
+        ranked = []
+        for sentences, terms_list in zip(candidates, sentence_terms):
+            scored = []
+            for position, (sentence, terms) in enumerate(zip(sentences, terms_list)):
+                key = sentence.lower()
+                if key in seen:
+                    continue
+                seen.add(key)
+                score = sum(math.log(1 + total / document_frequency[term]) for term in terms)
+                scored.append((-score, position, sentence))
+            scored.sort()
+            ranked.append([(position, sentence) for _, position, sentence in scored])
+        return ranked
+
+    def assemble(self, query: str, documents: List[Document]) -> str:
+        """
+        Build the context string for `query` within the token budget.
+        """
+        groups = self.collapse_duplicates(documents)[:self.max_products]
+        if not groups:
+            return ""
+
+        remaining = self.token_budget
+        headers = []
+        for number, group in enumerate(groups, 1):
+            header = self._header(number, group)
+            cost = estimate_tokens(header)
+            if headers and cost > remaining:
+                break
+            headers.append(header)
+            remaining -= cost
+        groups = groups[:len(headers)]
+
+        ranked = self._ranked_sentences(query, groups)
+        chosen = [[] for _ in groups]
+        for rank in range(self.sentences_per_product):
+            for index, sentences in enumerate(ranked):
+                if rank >= len(sentences):
+                    continue
+                position, sentence = sentences[rank]
+                cost = estimate_tokens(sentence) + 1
+                if cost <= remaining:
+                    chosen[index].append((position, sentence))
+                    remaining -= cost
+
+        entries = []
+        for header, sentences in zip(headers, chosen):
+            if sentences:
+                header += "\nReviews: " + ". ".join(sentence for _, sentence in sorted(sentences)) + "."
+            entries.append(header)
+        return "\n\n".join(entries)
@@ -0,0 +1,184 @@
+import os
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+from data_ingestion.manifest import document_id
+from retriever.bm25_index import BM25Index
+from retriever.parent_store import ParentStore
+from retriever.metadata_filter import matches_filter
+from myutils.attribute_parser import extract_constraints
+from myutils.tracing import span
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Fuses BM25 and vector results with reciprocal-rank fusion (RRF).
+
+    Vector hits scoring below `score_threshold` are dropped before fusion.
+    Queries naming a model number ("S25", "A15": letters and digits, not a
+    spec such as "8GB" or a price) that occurs in the lexical index, and
+    whose terms are all found by it, are answered from BM25 alone, without
+    embedding the query. With no
+    BM25 index this is a thresholded vector retriever.
+
+    With a `parent_store`, vector hits are review chunks: they are regrouped
+    into their parent products, which are ranked by their best chunk and
+    carry the matched chunks as `page_content`.
+
+    Price, rating, RAM and storage constraints stated in the query ("under
+    ₹30,000", "rated above 4.3") are pushed down as metadata filters to both
+    the vector store and BM25, so only matching products are ranked.
+
+    With `collapse_variants`, products sharing a near-duplicate `cluster_id`
+    (set at ingestion) are returned once, as the best-ranked member, with the
+    other members' titles under `variants`.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: Any
+    bm25: Optional[BM25Index] = None
+    parent_store: Optional[ParentStore] = None
+    k: int = 10
+    score_threshold: Optional[float] = None
+    candidates: int = 30
+    rrf_k: int = 60
+    lexical_shortcut: bool = True
+    extract_filters: bool = True
+    max_filter_ids: int = 100
+    collapse_variants: bool = True
+
+    @classmethod
+    def from_config(cls, config: dict, vectorstore):
+        """
+        Build from the `retriever` section of config.yaml, loading the BM25
+        index written by ingestion when hybrid search is enabled.
+        """
+        retriever_config = config.get("retriever", {})
+        hybrid_config = retriever_config.get("hybrid", {})
+        bm25 = None
+        if hybrid_config.get("enabled", False):
+            bm25 = BM25Index.load(hybrid_config.get("bm25_path", "Data/bm25_index"))
+            if bm25 is None:
+                print("No BM25 index found; falling back to vector-only retrieval")
+        parent_store = None
+        chunking_config = config.get("ingestion", {}).get("chunking", {})
+        parent_store_path = chunking_config.get("parent_store_path", "Data/parent_store.sqlite")
+        if chunking_config.get("enabled", False) and os.path.exists(parent_store_path):
+            parent_store = ParentStore(parent_store_path)
+        return cls(
+            vectorstore=vectorstore,
+            bm25=bm25,
+            parent_store=parent_store,
+            k=retriever_config.get("top_k", 3),
+            score_threshold=retriever_config.get("score_threshold"),
+            candidates=hybrid_config.get("candidates", 30),
+            rrf_k=hybrid_config.get("rrf_k", 60),
+            lexical_shortcut=hybrid_config.get("lexical_shortcut", True),
+            extract_filters=retriever_config.get("filters", {}).get("enabled", True),
+            max_filter_ids=retriever_config.get("filters", {}).get("max_filter_ids", 100),
+            collapse_variants=retriever_config.get("collapse_variants", True),
+        )
+
+    @staticmethod
+    def _key(document: Document) -> str:
+        return document.id or document_id(document.metadata)
+
+    def _vector_filter(self, constraints: dict):
+        """
+        Translate query constraints into a vector-store filter. Chunks only
+        carry `parent_ids`, so with a parent store the matching products are
+        looked up first and pushed down as a `$in` on them; beyond
+        `max_filter_ids` products the filter is applied after regrouping.
+        Returns (filter, no_matches).
+        """
+        if not constraints:
+            return None, False
+        if self.parent_store is None:
+            return dict(constraints), False
+        parent_ids = self.parent_store.filter_ids(constraints)
+        if not parent_ids:
+            return None, True
+        if len(parent_ids) > self.max_filter_ids:
+            return None, False
+        return {"parent_ids": {"$in": parent_ids}}, False
+
+    def _dense(self, query: str, constraints: dict) -> List[Document]:
+        filter, no_matches = self._vector_filter(constraints)
+        if no_matches:
+            return []
+        with span("vector_search"):
+            results = self.vectorstore.similarity_search_with_relevance_scores(
+                query, k=max(self.k, self.candidates), filter=filter
+            )
+        documents = [doc for doc, score in results if self.score_threshold is None or score >= self.score_threshold]
+        if self.parent_store is None:
+            return documents
+        # Shared chunks also list variants that miss the constraints
+        return [doc for doc in self._regroup(documents) if matches_filter(doc.metadata, constraints)]
+
+    def _regroup(self, chunks: List[Document]) -> List[Document]:
+        matched = {}
+        for chunk in chunks:
+            for parent_id in chunk.metadata.get("parent_ids", []):
+                matched.setdefault(parent_id, []).append(chunk.page_content)
+        metadata = self.parent_store.get_many(list(matched))
+        return [Document(id=parent_id, page_content=". ".join(texts), metadata=metadata[parent_id])
+                for parent_id, texts in matched.items() if parent_id in metadata]
+
+    def _fuse(self, *rankings: List[Document]) -> List[Document]:
+        scores = {}
+        documents = {}
+        for ranking in rankings:
+            for rank, document in enumerate(ranking):
+                key = self._key(document)
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+                documents.setdefault(key, document)
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        return self._collapse([documents[key] for key in ranked])[:self.k]
+
+    def _collapse(self, documents: List[Document]) -> List[Document]:
+        """
+        Keep the first document of each near-duplicate cluster, copying it to
+        list the titles of the ones dropped.
+        """
+        if not self.collapse_variants:
+            return documents
+        kept = {}
+        for document in documents:
+            cluster = document.metadata.get("cluster_id") or self._key(document)
+            if cluster not in kept:
+                kept[cluster] = document
+                continue
+            first = kept[cluster]
+            if "variants" not in first.metadata:
+                first = kept[cluster] = Document(id=first.id, page_content=first.page_content,
+                                                 metadata={**first.metadata, "variants": []})
+            first.metadata["variants"].append(document.metadata.get("product_title", ""))
+        return list(kept.values())
+
+    def lexical_only(self, query: str) -> bool:
+        """
+        Whether `query` names a model number in the lexical index, so it may
+        be answered from BM25 alone. Callers such as the response cache skip
+        embedding these queries too.
+        """
+        return self.lexical_shortcut and self.bm25 is not None and self.bm25.has_model_number(query)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        constraints = extract_constraints(query) if self.extract_filters else {}
+        lexical = []
+        if self.bm25 is not None:
+            with span("bm25_search"):
+                lexical = self.bm25.search(query, k=max(self.k, self.candidates), filter=constraints)
+
+        if lexical and self.lexical_only(query):
+            exact = [doc for doc, _, coverage in lexical if coverage == 1.0]
+            if exact:
+                return self._collapse(exact)[:self.k]
+
+        return self._fuse(self._dense(query, constraints), [doc for doc, _, _ in lexical])
@@ -0,0 +1,404 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from retriever.metadata_filter import matches_filter
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store for running without AstraDB.
+
+    Normalized float32 embeddings are appended to a memory-mapped matrix and
+    each row's ID, text and metadata live in a SQLite sidecar. Updates and
+    deletes tombstone the old row; `compact()` rewrites the files without
+    them. Top-k search is one matrix-vector product plus `argpartition`.
+
+    Several processes may open the same index. Searches see the rows that
+    existed when the store was opened. Writes allocate rows inside an
+    immediate SQLite transaction, so concurrent writers never collide.
+
+    Compaction renumbers rows, so it writes a new generation directory
+    (`g<time_ns>`) and points the CURRENT file at it, as BM25 snapshots do.
+    Until the first compaction the files sit directly under `path`. Readers
+    switch to the new generation on their next search and writers on their
+    next write; the previous generation is kept for searches still running.
+    """
+
+    def __init__(self, embedding: Embeddings, path: str = "Data/local_index"):
+        self.embedding = embedding
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._current_stamp = None
+        self._open(self._current_generation())
+
+    @staticmethod
+    def _connect(directory: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(os.path.join(directory, "meta.sqlite"), timeout=30, check_same_thread=False)
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS rows (
+                row INTEGER PRIMARY KEY,
+                id TEXT,
+                page_content TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS rows_id ON rows (id)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.commit()
+        return conn
+
+    def _directory(self, generation: str) -> str:
+        return os.path.join(self.path, generation) if generation else self.path
+
+    def _current_generation(self) -> str:
+        try:
+            with open(os.path.join(self.path, "CURRENT"), encoding="utf-8") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return ""
+
+    def _open(self, generation: str):
+        # The previous connection is not closed: a search may still be reading rows through it
+        self.generation = generation
+        directory = self._directory(generation)
+        self.matrix_path = os.path.join(directory, "vectors.f32")
+        self._conn = self._connect(directory)
+        self._load()
+
+    def _refresh(self):
+        """
+        Switch to the generation a compaction (in any process) published.
+        """
+        try:
+            stat = os.stat(os.path.join(self.path, "CURRENT"))
+        except FileNotFoundError:
+            return
+        stamp = (stat.st_mtime_ns, stat.st_ino)
+        if stamp == self._current_stamp:
+            return
+        self._current_stamp = stamp
+        generation = self._current_generation()
+        if generation != self.generation:
+            self._open(generation)
+
+    def _begin_write(self):
+        """
+        Start an immediate transaction on the current generation, reopening
+        it first if a compaction has replaced the one this store has open.
+        """
+        while True:
+            self._conn.execute("BEGIN IMMEDIATE")
+            generation = self._current_generation()
+            if generation == self.generation:
+                return
+            self._conn.rollback()
+            self._open(generation)
+
+    def _load(self):
+        meta = dict(self._conn.execute("SELECT name, value FROM meta").fetchall())
+        self.dim = meta.get("dim")
+        self._capacity = meta.get("capacity", 0)
+        self._matrix = None
+        if self.dim and self._capacity:
+            self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+",
+                                     shape=(self._capacity, self.dim))
+
+        rows = self._conn.execute("SELECT row, id, metadata, deleted FROM rows ORDER BY row").fetchall()
+        self._size = rows[-1][0] + 1 if rows else 0
+        self._alive = np.zeros(max(self._capacity, 1), dtype=bool)
+        self._metadata = [None] * self._size
+        self._row_of = {}
+        for row, doc_id, metadata, deleted in rows:
+            if not deleted:
+                self._alive[row] = True
+                self._metadata[row] = json.loads(metadata)
+                self._row_of[doc_id] = row
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def _set_meta(self, name: str, value: int):
+        self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value))
+
+    def _ensure_capacity(self, rows_needed: int, dim: int):
+        if self.dim is None:
+            self.dim = dim
+            self._set_meta("dim", dim)
+        elif dim != self.dim:
+            raise ValueError(f"Embedding dimension changed from {self.dim} to {dim}; rebuild {self.path}")
+        if rows_needed <= self._capacity:
+            return
+        capacity = max(1024, self._capacity)
+        while capacity < rows_needed:
+            capacity *= 2
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+        with open(self.matrix_path, "ab") as file:
+            file.truncate(capacity * dim * np.dtype(np.float32).itemsize)
+        self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self._alive)] = self._alive[:capacity]
+        self._alive = alive
+        self._capacity = capacity
+        self._set_meta("capacity", capacity)
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _tombstone(self, doc_ids: Iterable[str]):
+        for doc_id in doc_ids:
+            # Also covers rows written by other processes since this store was opened
+            self._conn.execute("UPDATE rows SET deleted = 1 WHERE id = ? AND deleted = 0", (doc_id,))
+            row = self._row_of.pop(doc_id, None)
+            if row is None:
+                continue
+            self._alive[row] = False
+            self._metadata[row] = None
+
+    def _sync_capacity(self):
+        """
+        Re-map the matrix if another process has grown it.
+        """
+        meta = dict(self._conn.execute("SELECT name, value FROM meta").fetchall())
+        if meta.get("capacity", 0) <= self._capacity:
+            return
+        self.dim = meta["dim"]
+        self._capacity = meta["capacity"]
+        self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(self._capacity, self.dim))
+        alive = np.zeros(self._capacity, dtype=bool)
+        alive[:len(self._alive)] = self._alive
+        self._alive = alive
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        """
+        Embed and append texts. Existing IDs are replaced (upsert).
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = [doc_id or str(uuid.uuid4()) for doc_id in (ids or [None] * len(texts))]
+        vectors = self._normalize(self.embedding.embed_documents(texts))
+
+        with self._lock:
+            # Serializes row allocation with every other process writing to the index
+            self._begin_write()
+            try:
+                self._sync_capacity()
+                self._tombstone(ids)
+                start = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM rows").fetchone()[0]
+                self._ensure_capacity(start + len(texts), vectors.shape[1])
+                self._matrix[start:start + len(texts)] = vectors
+                self._matrix.flush()
+                self._conn.executemany(
+                    "INSERT INTO rows (row, id, page_content, metadata, deleted) VALUES (?, ?, ?, ?, 0)",
+                    [(start + i, doc_id, text, json.dumps(metadata))
+                     for i, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas))],
+                )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            # Rows other processes added in between stay hidden until the store is reopened
+            self._metadata.extend([None] * (start - len(self._metadata)))
+            for i, (doc_id, metadata) in enumerate(zip(ids, metadatas)):
+                self._row_of[doc_id] = start + i
+                self._metadata.append(metadata)
+            self._alive[start:start + len(texts)] = True
+            self._size = start + len(texts)
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._lock:
+            self._begin_write()
+            try:
+                self._tombstone(ids)
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return True
+
+    def _filter_mask(self, size: int, filter: Optional[Any]) -> np.ndarray:
+        mask = self._alive[:size].copy()
+        if not filter:
+            return mask
+        for row in np.flatnonzero(mask):
+            if not self._matches(self._metadata[row], filter):
+                mask[row] = False
+        return mask
+
+    @staticmethod
+    def _matches(metadata: dict, filter: Any) -> bool:
+        return matches_filter(metadata, filter)
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Any] = None) -> List[Tuple[Document, float]]:
+        """
+        Return the top-k documents with scores in [0, 1] ((1 + cosine) / 2,
+        the same scale AstraDB reports), optionally restricted by `filter`:
+        a metadata filter in AstraDB syntax (equalities, $lte/$gte/$in, ...)
+        or a callable on the metadata.
+        """
+        with self._lock:
+            self._refresh()
+            size = self._size
+            matrix = self._matrix
+            conn = self._conn
+            mask = self._filter_mask(size, filter)
+        if matrix is None or not mask.any():
+            return []
+
+        query = self._normalize(embedding)
+        scores = matrix[:size] @ query
+        scores = np.where(mask, scores, -np.inf)
+        k = min(k, int(mask.sum()))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        placeholders = ",".join("?" * len(top))
+        # The connection of the generation `matrix` belongs to, whose row numbers `top` refers to
+        with self._lock:
+            rows = dict(
+                (row, (doc_id, text, metadata)) for row, doc_id, text, metadata in conn.execute(
+                    f"SELECT row, id, page_content, metadata FROM rows WHERE row IN ({placeholders})",
+                    [int(row) for row in top],
+                )
+            )
+        results = []
+        for row in top:
+            doc_id, text, metadata = rows[int(row)]
+            document = Document(id=doc_id, page_content=text, metadata=json.loads(metadata))
+            results.append((document, float((1.0 + scores[row]) / 2.0)))
+        return results
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[Any] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k=k, filter=filter)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[Any] = None,
+                                    **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k=k, filter=filter)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Any] = None,
+                          **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Scores are already on a [0, 1] similarity scale
+        return lambda score: score
+
+    def dead_fraction(self) -> float:
+        """
+        Share of the rows in the current generation that are tombstoned, by
+        updates and deletes from any process.
+        """
+        with self._lock:
+            self._refresh()
+            total, dead = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(deleted), 0) FROM rows").fetchone()
+        return dead / total if total else 0.0
+
+    def compact(self, keep: int = 2):
+        """
+        Write a new generation without tombstoned rows and make it current,
+        keeping the last `keep` generations.
+        """
+        with self._lock:
+            # Blocks writers in every process until the new generation is published
+            self._begin_write()
+            try:
+                meta = dict(self._conn.execute("SELECT name, value FROM meta").fetchall())
+                dim, capacity = meta.get("dim"), meta.get("capacity", 0)
+                if not dim or not capacity:
+                    self._conn.rollback()
+                    return
+                rows = self._conn.execute(
+                    "SELECT row, id, page_content, metadata FROM rows WHERE deleted = 0 ORDER BY row"
+                ).fetchall()
+                # Vectors come from the same row list as the documents, including other processes' rows
+                source = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(capacity, dim))
+
+                generation = f"g{time.time_ns()}"
+                tmp_directory = os.path.join(self.path, f"{generation}.tmp")
+                os.makedirs(tmp_directory)
+                compacted_capacity = max(1024, len(rows))
+                compacted = np.memmap(os.path.join(tmp_directory, "vectors.f32"), dtype=np.float32, mode="w+",
+                                      shape=(compacted_capacity, dim))
+                if rows:
+                    compacted[:len(rows)] = source[[row for row, _, _, _ in rows]]
+                compacted.flush()
+                del compacted, source
+
+                conn = self._connect(tmp_directory)
+                conn.executemany(
+                    "INSERT INTO rows (row, id, page_content, metadata, deleted) VALUES (?, ?, ?, ?, 0)",
+                    [(new_row, doc_id, text, metadata) for new_row, (_, doc_id, text, metadata) in enumerate(rows)],
+                )
+                conn.executemany("INSERT INTO meta (name, value) VALUES (?, ?)",
+                                 [("dim", dim), ("capacity", compacted_capacity)])
+                conn.commit()
+                conn.close()
+                os.rename(tmp_directory, os.path.join(self.path, generation))
+                current_tmp = os.path.join(self.path, "CURRENT.tmp")
+                with open(current_tmp, "w", encoding="utf-8") as f:
+                    f.write(generation)
+                os.replace(current_tmp, os.path.join(self.path, "CURRENT"))
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._open(generation)
+            self._prune(keep)
+        print(f"Compacted local index to {len(rows)} rows in generation {generation}")
+
+    def _prune(self, keep: int):
+        """
+        Remove generations older than the last `keep`. Directories still being
+        written (`.tmp`) are left alone.
+        """
+        generations = sorted((name for name in os.listdir(self.path)
+                              if name.startswith("g") and not name.endswith(".tmp")
+                              and os.path.isdir(os.path.join(self.path, name))),
+                             key=lambda name: int(name[1:]))
+        stale = generations[:-keep] if keep else generations
+        for name in stale:
+            if name != self.generation:
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+        # The files of the original, pre-compaction generation
+        if len(generations) >= keep:
+            for name in ["vectors.f32", "meta.sqlite", "meta.sqlite-journal"]:
+                if os.path.exists(os.path.join(self.path, name)):
+                    os.remove(os.path.join(self.path, name))
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, path: str = "Data/local_index",
+                   **kwargs: Any) -> "LocalVectorStore":
+        store = cls(embedding, path=path)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,47 @@
+import threading
+from typing import Any, Callable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from retriever.metadata_filter import matches_filter
+
+
+class MemoryVectorStore(InMemoryVectorStore):
+    """
+    In-process, non-persistent vector store for benchmarks and offline runs.
+
+    Accepts the same dict metadata filters as the AstraDB and local backends
+    and reports relevance on the same (1 + cosine) / 2 scale. `shared()`
+    returns one store per name, so ingestion and retrieval in the same
+    process see the same documents.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, name: str, embedding: Embeddings) -> "MemoryVectorStore":
+        with cls._shared_lock:
+            store = cls._shared.get(name)
+            if store is None:
+                store = cls._shared[name] = cls(embedding)
+            else:
+                store.embedding = embedding
+            return store
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Any] = None,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        if filter and not callable(filter):
+            conditions = filter
+            filter = lambda document: matches_filter(document.metadata, conditions)
+        return super().similarity_search_with_score_by_vector(embedding, k=k, filter=filter, **kwargs)
+
+    def similarity_search_with_score(self, query: str, k: int = 4,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k=k, **kwargs)
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return lambda score: (1.0 + score) / 2.0
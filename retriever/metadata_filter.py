@@ -0,0 +1,48 @@
+from typing import Any
+
+OPERATORS = {
+    "$eq": lambda value, target: value == target,
+    "$ne": lambda value, target: value != target,
+    "$lt": lambda value, target: value is not None and value < target,
+    "$lte": lambda value, target: value is not None and value <= target,
+    "$gt": lambda value, target: value is not None and value > target,
+    "$gte": lambda value, target: value is not None and value >= target,
+    "$in": lambda value, target: value in target,
+    "$nin": lambda value, target: value not in target,
+}
+
+NEGATED = {"$ne", "$nin"}
+
+
+def _compare(value: Any, condition: Any) -> bool:
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    # List-valued fields (e.g. a chunk's parent_ids) match if any element
+    # does, and negated operators only if every element does
+    values = value if isinstance(value, list) else [value]
+    for op, target in condition.items():
+        combine = all if op in NEGATED else any
+        if not combine(OPERATORS[op](item, target) for item in values):
+            return False
+    return True
+
+
+def matches_filter(metadata: dict, filter: Any) -> bool:
+    """
+    Evaluate a metadata filter in the AstraDB/MongoDB-style syntax the vector
+    stores accept: {"field": value}, {"field": {"$gte": 4.0, "$lte": 5.0}},
+    {"field": {"$in": [...]}} and "$and"/"$or" lists, or a callable on the
+    metadata.
+    """
+    if callable(filter):
+        return filter(metadata)
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif not _compare(metadata.get(key), condition):
+            return False
+    return True
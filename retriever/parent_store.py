@@ -0,0 +1,133 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+SQL_OPERATORS = {"$eq": "=", "$lt": "<", "$lte": "<=", "$gt": ">", "$gte": ">="}
+
+
+class ParentStore:
+    """
+    Product-level metadata for chunked documents.
+
+    Each parent (product) row holds the product metadata once, plus the IDs
+    of the review chunks it references; chunks in the vector store carry
+    only their text and `parent_ids`. The chunk_parents table indexes the
+    same links by chunk, for parents_of().
+    """
+
+    def __init__(self, path: str = "Data/parent_store.sqlite"):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS parents (id TEXT PRIMARY KEY, metadata TEXT NOT NULL, chunk_ids TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_parents (chunk_id TEXT NOT NULL, parent_id TEXT NOT NULL, "
+            "PRIMARY KEY (chunk_id, parent_id))"
+        )
+        # Stores written before chunk_parents existed
+        if not self._conn.execute("SELECT 1 FROM chunk_parents LIMIT 1").fetchone():
+            self._conn.execute("INSERT OR IGNORE INTO chunk_parents "
+                               "SELECT j.value, p.id FROM parents p, json_each(p.chunk_ids) j")
+        self._conn.commit()
+
+    def _link(self, rows: List[Tuple[str, str, str]]):
+        self._conn.executemany("INSERT OR REPLACE INTO parents VALUES (?, ?, ?)", rows)
+        self._conn.executemany("INSERT OR IGNORE INTO chunk_parents VALUES (?, ?)",
+                               [(cid, parent_id) for parent_id, _, chunk_ids in rows for cid in json.loads(chunk_ids)])
+
+    def replace_all(self, parents: Iterable[Tuple[str, dict, List[str]]], batch_size: int = 1000):
+        """
+        Replace the store's contents with (parent_id, metadata, chunk_ids)
+        rows in a single transaction, so readers never see a partial catalog.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM parents")
+                self._conn.execute("DELETE FROM chunk_parents")
+                batch = []
+                for parent_id, metadata, chunk_ids in parents:
+                    batch.append((parent_id, json.dumps(metadata, ensure_ascii=False), json.dumps(chunk_ids)))
+                    if len(batch) >= batch_size:
+                        self._link(batch)
+                        batch = []
+                if batch:
+                    self._link(batch)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def upsert_many(self, parents: Iterable[Tuple[str, dict, List[str]]]):
+        """
+        Insert or replace (parent_id, metadata, chunk_ids) rows, keeping the
+        others; used when products are indexed as they are scraped.
+        """
+        rows = [(parent_id, json.dumps(metadata, ensure_ascii=False), json.dumps(chunk_ids))
+                for parent_id, metadata, chunk_ids in parents]
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunk_parents WHERE parent_id = ?", [(row[0],) for row in rows])
+            self._link(rows)
+            self._conn.commit()
+
+    def parents_of(self, chunk_ids: List[str]) -> Dict[str, List[str]]:
+        """
+        Return {chunk_id: sorted IDs of the parents referencing it}.
+        """
+        if not chunk_ids:
+            return {}
+        placeholders = ",".join("?" * len(chunk_ids))
+        parents = {}
+        with self._lock:
+            for cid, parent_id in self._conn.execute(
+                    f"SELECT chunk_id, parent_id FROM chunk_parents WHERE chunk_id IN ({placeholders}) "
+                    "ORDER BY chunk_id, parent_id", list(chunk_ids)):
+                parents.setdefault(cid, []).append(parent_id)
+        return parents
+
+    def get_many(self, parent_ids: List[str]) -> Dict[str, dict]:
+        """
+        Return {parent_id: metadata} for the parents that exist.
+        """
+        if not parent_ids:
+            return {}
+        placeholders = ",".join("?" * len(parent_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, metadata FROM parents WHERE id IN ({placeholders})", list(parent_ids)
+            ).fetchall()
+        return {parent_id: json.loads(metadata) for parent_id, metadata in rows}
+
+    def filter_ids(self, constraints: dict) -> List[str]:
+        """
+        IDs of parents whose numeric metadata satisfies range constraints
+        such as {"price": {"$lte": 30000}}, evaluated in SQLite.
+        """
+        clauses = []
+        params = []
+        for field, condition in constraints.items():
+            for op, value in condition.items():
+                clauses.append(f"json_extract(metadata, ?) {SQL_OPERATORS[op]} ?")
+                params.extend([f"$.{field}", value])
+        where = " AND ".join(clauses) or "1"
+        with self._lock:
+            return [parent_id for (parent_id,) in self._conn.execute(f"SELECT id FROM parents WHERE {where}", params)]
+
+    def chunk_ids(self, parent_id: str) -> List[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT chunk_ids FROM parents WHERE id = ?", (parent_id,)).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM parents").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,152 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from myutils.metrics import Histogram
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128]
+QUEUE_WAIT_BUCKETS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1]
+
+
+class QueryEmbeddingCoalescer(Embeddings):
+    """
+    Coalesces concurrent query embeddings into batches.
+
+    Queries arriving within `window_ms` of the first one in a batch (up to
+    `max_batch_size`) are embedded with a single batch call and the vectors
+    are fanned back out to the waiting callers. Document embedding passes
+    straight through.
+
+    Batches are embedded as queries: through `embed_queries` when the model
+    has it (CachedEmbeddings), else `embed_documents` with
+    `query_batch_kwargs` (e.g. Gemini's RETRIEVAL_QUERY task type), else one
+    `embed_query` call per text.
+
+    `close()` stops the batching thread once the queued queries are answered.
+    """
+
+    def __init__(self, embeddings: Embeddings, window_ms: float = 5.0, max_batch_size: int = 32,
+                 query_batch_kwargs: dict = None):
+        self.embeddings = embeddings
+        self.query_batch_kwargs = query_batch_kwargs
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait = Histogram(QUEUE_WAIT_BUCKETS)
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict, embeddings: Embeddings, query_batch_kwargs: dict = None):
+        """
+        Wrap `embeddings` per `retriever.coalescer` in config.yaml, or return
+        them unchanged when coalescing is disabled.
+        """
+        coalescer_config = config.get("retriever", {}).get("coalescer", {})
+        if not coalescer_config.get("enabled", False):
+            return embeddings
+        return cls(
+            embeddings,
+            window_ms=coalescer_config.get("window_ms", 5.0),
+            max_batch_size=coalescer_config.get("max_batch_size", 32),
+            query_batch_kwargs=query_batch_kwargs,
+        )
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._thread_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="query-coalescer", daemon=True)
+                    self._thread.start()
+
+    def _submit(self, text: str) -> Future:
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        # Never plain embed_documents: some models embed queries and documents differently
+        embed_queries = getattr(self.embeddings, "embed_queries", None)
+        if embed_queries is not None:
+            return embed_queries(texts)
+        if self.query_batch_kwargs:
+            return self.embeddings.embed_documents(texts, **self.query_batch_kwargs)
+        return [self.embeddings.embed_query(text) for text in texts]
+
+    def _collect(self):
+        """
+        Take the next batch off the queue; also returns whether close() was called.
+        """
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = first[2] + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Past the window, still take whatever queued up during the last call
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _dispatch(self, batch):
+        dispatched = time.perf_counter()
+        for _, _, enqueued in batch:
+            self.queue_wait.observe(dispatched - enqueued)
+        self.batch_sizes.observe(len(batch))
+
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+        try:
+            vectors = dict(zip(texts, self._embed_batch(texts)))
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for text, future, _ in batch:
+            future.set_result(vectors[text])
+
+    def _run(self):
+        while True:
+            batch, closed = self._collect()
+            if batch:
+                self._dispatch(batch)
+            if closed:
+                return
+
+    def close(self):
+        """
+        Stop the batching thread. A query submitted afterwards starts a new one.
+        """
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._submit(text).result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self._submit(text))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def stats(self) -> dict:
+        return {"batch_size": self.batch_sizes.snapshot(), "queue_wait_seconds": self.queue_wait.snapshot()}
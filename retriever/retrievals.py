@@ -1,54 +1,58 @@
 import os
-from langchain_astradb import AstraDBVectorStore
 from typing import List
 from langchain_core.documents import Document
-from myutils.config_loader import load_config
+from myutils.settings import get_settings
 from myutils.model_loader import ModelLoader
-from dotenv import load_dotenv
+from myutils.vector_store_loader import load_vector_store, required_env_vars
+from retriever.query_coalescer import QueryEmbeddingCoalescer
+from retriever.hybrid_retriever import HybridRetriever
+from myutils.tracing import TimedEmbeddings
 
 
 class Retriever:
-    def __init__(self):
+    def __init__(self, previous: "Retriever" = None):
+        """
+        Pass the retriever being replaced on a reload to keep its query
+        embeddings, and with them one coalescer thread per process.
+        """
         self.model_loader=ModelLoader()
-        self.config=load_config()
+        self.settings=get_settings()
+        self.config=self.settings.config
         self._load_env_variables()
         self.vstore=None
         self.retriever=None
+        self.coalescer=previous.coalescer if previous is not None else None
+        self.embeddings=previous.embeddings if previous is not None else None
 
     
     def _load_env_variables(self):
-        load_dotenv()
-        required_vars=["GOOGLE_API_KEY","ASTRA_DB_API_ENDPOINT","ASTRA_DB_APPLICATION_TOKEN",
-                       "ASTRA_DB_KEYSPACE"]
-        
-        missing_vars=[var for var in required_vars if os.getenv(var) is None]
-        if missing_vars:
-            raise EnvironmentError(f"Missing environment variables: {missing_vars}")
-        
-        self.google_api_key=os.getenv("GOOGLE_API_KEY")
-        self.db_api_endpoint=os.getenv("ASTRA_DB_API_ENDPOINT")
-        self.db_application_token=os.getenv("ASTRA_DB_APPLICATION_TOKEN")
-        self.db_keyspace=os.getenv("ASTRA_DB_KEYSPACE")
+        self.settings.require(required_env_vars(self.config))
+
+        self.google_api_key=self.settings.env["GOOGLE_API_KEY"]
+        self.db_api_endpoint=self.settings.env["ASTRA_DB_API_ENDPOINT"]
+        self.db_application_token=self.settings.env["ASTRA_DB_APPLICATION_TOKEN"]
+        self.db_keyspace=self.settings.env["ASTRA_DB_KEYSPACE"]
 
     def load_retriever(self):
+        if self.embeddings is None:
+            # Concurrent queries share batched embedding calls when the coalescer is enabled
+            embeddings=self.model_loader.load_embeddings()
+            self.embeddings=QueryEmbeddingCoalescer.from_config(self.config, embeddings,
+                                                                self.model_loader.query_batch_kwargs)
+            if isinstance(self.embeddings, QueryEmbeddingCoalescer):
+                self.coalescer=self.embeddings
+            # Query embedding shows up as the "embed" stage in /metrics and Server-Timing
+            self.embeddings=TimedEmbeddings(self.embeddings, "embed")
         if not self.vstore:
-            collection_name=self.config["astra_db"]["collection_name"]
-            self.vstore=AstraDBVectorStore(
-                embedding=self.model_loader.load_embeddings(),
-                collection_name=collection_name,
-                api_endpoint=self.db_api_endpoint,
-                token=self.db_application_token,
-                namespace=self.db_keyspace
-            )
+            self.vstore=load_vector_store(self.config, self.embeddings)
         if not self.retriever:
-            top_k=self.config["retriever"]["top_k"] if "retriever" in self.config else 3
-            retriever=self.vstore.as_retriever(search_kwargs={"k":top_k})
+            # BM25 + vector fusion with retriever.score_threshold applied to vector hits
+            self.retriever=HybridRetriever.from_config(self.config, self.vstore)
             print("Retriever loaded successfully")
-            return retriever
+        return self.retriever
 
     def call_retriever(self,query:str)-> List[Document]:
         retriever=self.load_retriever()
-        query=retriever.similarity_search(query)
         output=retriever.invoke(query)
         return output     
 
@@ -0,0 +1,34 @@
+import pytest
+
+from benchmarks.suite import deep_merge
+from myutils import settings as settings_module
+from myutils.config_loader import load_config
+from myutils.settings import ENV_VARS, Settings, set_settings
+
+
+@pytest.fixture
+def offline_settings(tmp_path):
+    """
+    Offline settings with the local vector store and every path under `tmp_path`.
+    """
+    overrides = {
+        "embedding_model": {"provider": "fake", "model_name": "fake-embeddings"},
+        "llm": {"default": "fake", "fake": {"provider": "fake", "latency": 0.0}},
+        "vector_store": {"backend": "local", "local": {"path": str(tmp_path / "local_index")}},
+        "retriever": {"hybrid": {"bm25_path": str(tmp_path / "bm25_index")}},
+        "catalog": {"enabled": False},
+        "ingestion": {
+            "manifest_path": str(tmp_path / "ingestion_manifest.json"),
+            "checkpoint_path": str(tmp_path / "ingestion_checkpoint.log"),
+            "chunking": {"enabled": False},
+            "near_duplicates": {"enabled": False},
+        },
+        "embedding_cache": {"enabled": False},
+        "jobs": {"store_path": str(tmp_path / "jobs.sqlite"), "index_lock_path": str(tmp_path / "index.lock")},
+        "serving": {"index_version_path": str(tmp_path / "index_version.json")},
+    }
+    previous = settings_module._settings
+    settings = Settings(deep_merge(load_config(), overrides), dict.fromkeys(ENV_VARS))
+    set_settings(settings)
+    yield settings
+    set_settings(previous)
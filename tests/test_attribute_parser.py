@@ -0,0 +1,41 @@
+import pytest
+
+from myutils.attribute_parser import extract_constraints
+
+
+@pytest.mark.parametrize("query", [
+    "iPhone 15 Pro Max 256 GB",
+    "more than 5000 mAh battery",
+    "above 200 MP camera",
+    "over 120 Hz display",
+    "phones above 6.5 inch",
+    "phones from 2023",
+    "phones under 30000",
+])
+def test_spec_numbers_and_bare_numbers_are_not_prices(query):
+    assert "price" not in extract_constraints(query)
+
+
+def test_storage_query_with_year_has_no_price():
+    assert extract_constraints("128 GB storage from 2023") == {"storage_gb": {"$gte": 128.0}}
+
+
+def test_max_in_model_name_is_not_an_upper_bound():
+    assert extract_constraints("iphone 15 pro max under ₹1.5 lakh") == {"price": {"$lte": 150000.0}}
+
+
+@pytest.mark.parametrize("query, price", [
+    ("phones under ₹30,000", {"$lte": 30000.0}),
+    ("under 30k", {"$lte": 30000.0}),
+    ("above rs 15000", {"$gte": 15000.0}),
+    ("budget of inr 20000", {"$lte": 20000.0}),
+    ("between ₹20,000 and 30,000", {"$gte": 20000.0, "$lte": 30000.0}),
+    ("between 20k and 30k", {"$gte": 20000.0, "$lte": 30000.0}),
+])
+def test_prices_need_a_currency_or_multiplier(query, price):
+    assert extract_constraints(query)["price"] == price
+
+
+def test_price_rating_and_ram_together():
+    assert extract_constraints("phones under ₹30,000 rated above 4.3 with 8 gb ram") == {
+        "price": {"$lte": 30000.0}, "rating": {"$gte": 4.3}, "ram_gb": {"$gte": 8.0}}
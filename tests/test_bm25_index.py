@@ -0,0 +1,27 @@
+import pytest
+from langchain_core.documents import Document
+
+from retriever.bm25_index import BM25Index, model_numbers
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Samsung Galaxy S25 Ultra", ["s25"]),
+    ("redmi a15 5g", ["a15"]),
+    ("8gb ram phones", []),
+    ("5000 mAh battery", []),
+    ("120hz display with 50mp camera", []),
+    ("phones from 2023", []),
+    ("phones under rs15000", []),
+    ("30k phones", []),
+    ("iphone 16", []),
+])
+def test_model_numbers_exclude_specs_prices_and_bare_numbers(query, expected):
+    assert model_numbers(query) == expected
+
+
+def test_model_number_must_be_in_the_vocabulary():
+    index = BM25Index.build([Document(page_content="Great camera",
+                                      metadata={"product_title": "Samsung Galaxy S25 (Black, 256 GB)"})])
+    assert index.has_model_number("galaxy s25 price")
+    assert not index.has_model_number("galaxy s99 price")
+    assert not index.has_model_number("phones with 256gb")
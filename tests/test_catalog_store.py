@@ -0,0 +1,27 @@
+import os
+
+from data_ingestion.catalog_store import CatalogStore, catalog_documents
+
+PHONE = {"product_title": "Redmi A15 (Black, 64 GB)", "product_price": "₹6,999", "product_rating": "4.1",
+         "product_highlights": "4 GB RAM", "product_description": "Budget phone",
+         "product_reviews": "Good value for money", "product_link": "https://www.flipkart.com/p/itm?pid=PIDA15"}
+
+
+def test_an_empty_scrape_leaves_the_category_unchanged(tmp_path):
+    catalog = CatalogStore(str(tmp_path))
+    first = catalog.append("phones", [PHONE], scraped_at="20260101T000000000000Z")
+    assert catalog.append("phones", [], scraped_at="20260102T000000000000Z") is None
+    assert [partition.path for partition in catalog.partitions()] == [first]
+    assert [document.metadata["product_title"] for document in catalog_documents(catalog)] == [PHONE["product_title"]]
+
+
+def test_empty_partitions_from_older_writes_are_not_the_latest(tmp_path):
+    catalog = CatalogStore(str(tmp_path))
+    first = catalog.append("phones", [PHONE], scraped_at="20260101T000000000000Z")
+    # As written before empty scrapes were discarded
+    empty = catalog.writer("phones", scraped_at="20260102T000000000000Z")
+    empty._writer.close()
+    empty._sink.close()
+    os.replace(empty._tmp_path, empty.path)
+    assert len(catalog.partitions()) == 2
+    assert [partition.path for partition in catalog.latest_partitions()] == [first]
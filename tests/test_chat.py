@@ -0,0 +1,50 @@
+import importlib
+import sys
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from myutils.fake_models import FakeEmbeddings
+
+PRODUCTS = [
+    ("Samsung Galaxy S25 (Icy Blue, 256 GB)", "₹80,999", "4.6", "12 GB RAM | 256 GB ROM",
+     "Flagship camera and display.", "Superb camera, bright display and long battery life.", "PIDS25"),
+    ("Redmi A15 (Black, 64 GB)", "₹6,999", "4.1", "4 GB RAM | 64 GB ROM",
+     "Budget phone.", "Good value for money, average camera.", "PIDA15"),
+]
+
+
+def load_app(tmp_path):
+    from data_ingestion.ingestion_pipeline import DataIngestion
+
+    csv_path = tmp_path / "catalog.csv"
+    pd.DataFrame(
+        [dict(zip(["product_title", "product_price", "product_rating", "product_highlights",
+                   "product_description", "product_reviews"], row[:6]),
+              product_link=f"https://www.flipkart.com/p/itm?pid={row[6]}") for row in PRODUCTS]
+    ).to_csv(csv_path, index=False)
+    DataIngestion(str(csv_path)).run_pipeline()
+    # main reads settings at import
+    if "main" in sys.modules:
+        return importlib.reload(sys.modules["main"])
+    return importlib.import_module("main")
+
+
+def test_model_number_query_is_not_embedded_by_the_response_cache(tmp_path, offline_settings, monkeypatch):
+    main = load_app(tmp_path)
+    calls = []
+    embed_query, embed_documents = FakeEmbeddings.embed_query, FakeEmbeddings.embed_documents
+    monkeypatch.setattr(FakeEmbeddings, "embed_query",
+                        lambda self, text: calls.append(text) or embed_query(self, text))
+    monkeypatch.setattr(FakeEmbeddings, "embed_documents",
+                        lambda self, texts, **kwargs: calls.extend(texts) or embed_documents(self, texts, **kwargs))
+
+    with TestClient(main.app) as client:
+        # A cached answer, so a semantic lookup would have a candidate to compare against
+        assert client.post("/chat", json={"query": "phones with a good camera"}).json()["cached"] is False
+        assert calls
+
+        calls.clear()
+        assert client.post("/chat", json={"query": "Galaxy S25"}).json()["cached"] is False
+        assert client.post("/chat", json={"query": "galaxy s25"}).json()["cached"] == "exact"
+        assert calls == []
@@ -0,0 +1,22 @@
+import numpy as np
+
+from myutils.embedding_cache import CachedEmbeddings, EmbeddingStore
+from myutils.fake_models import FakeEmbeddings
+
+
+def test_memory_cache_holds_float32_arrays_and_callers_get_lists(tmp_path):
+    model = FakeEmbeddings(size=8)
+    store = EmbeddingStore(str(tmp_path), memory_entries=2)
+    embeddings = CachedEmbeddings(model, "fake", store)
+
+    first = embeddings.embed_documents(["phone a", "phone b"])
+    assert all(isinstance(vector, list) and isinstance(vector[0], float) for vector in first)
+    assert all(vector.dtype == np.float32 for vector in store._memory.values())
+
+    # A memory hit, then a disk hit once the LRU has moved on
+    assert embeddings.embed_documents(["phone a"]) == [np.asarray(first[0], dtype=np.float32).tolist()]
+    embeddings.embed_documents(["phone c", "phone d"])
+    assert embeddings.embed_documents(["phone a"]) == [np.asarray(first[0], dtype=np.float32).tolist()]
+    assert store.stats["memory_hits"] == 1
+    assert store.stats["disk_hits"] == 1
+    assert len(store._memory) == 2
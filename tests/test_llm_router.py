@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from myutils.fake_models import FakeLatencyChatModel
+from myutils.llm_router import CircuitBreaker, LLMRouter
+
+MESSAGES = [HumanMessage(content="Which phone has the best camera?")]
+
+
+class FailingChatModel(FakeLatencyChatModel):
+    """
+    Stub provider that fails after its latency.
+    """
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        raise RuntimeError(f"{self.response} is down")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        raise RuntimeError(f"{self.response} is down")
+
+
+def router(providers: dict, **kwargs) -> LLMRouter:
+    return LLMRouter(providers=providers, **{"hedge_delay_seconds": 0.05, "min_samples": 2, **kwargs})
+
+
+def ask(llm: LLMRouter) -> str:
+    return asyncio.run(llm.ainvoke(MESSAGES)).content
+
+
+def test_ranks_providers_by_median_latency():
+    llm = router({"slow": FakeLatencyChatModel(response="slow", latency=0.2),
+                  "fast": FakeLatencyChatModel(response="fast", latency=0.01)},
+                 hedge_delay_seconds=1.0)
+    # Untried providers go in config order
+    assert llm._candidates("answer") == ["slow", "fast"]
+    llm._stats["slow"].record_success("answer", 0.2)
+    llm._stats["fast"].record_success("answer", 0.01)
+    assert llm._candidates("answer") == ["fast", "slow"]
+    assert ask(llm) == "fast"
+
+
+def test_hedges_after_the_deadline_and_first_answer_wins():
+    llm = router({"slow": FakeLatencyChatModel(response="slow", latency=0.5),
+                  "fast": FakeLatencyChatModel(response="fast", latency=0.01)})
+    started = time.perf_counter()
+    assert ask(llm) == "fast"
+    # Answered shortly after the 0.05 s hedge deadline, not after the primary's 0.5 s
+    assert time.perf_counter() - started < 0.3
+    # The cancelled primary is recorded as at least as slow as the deadline
+    assert llm._stats["slow"].latency("answer", 50) >= 0.05
+
+
+def test_deadline_follows_the_latency_percentile_once_sampled():
+    llm = router({"a": FakeLatencyChatModel(), "b": FakeLatencyChatModel()}, hedge_percentile=95.0)
+    assert llm._deadline("a", "answer") == 0.05
+    for seconds in [0.1, 0.2, 0.3]:
+        llm._stats["a"].record_success("answer", seconds)
+    assert llm._deadline("a", "answer") == 0.3
+
+
+def test_falls_back_to_the_next_provider_on_error():
+    llm = router({"broken": FailingChatModel(response="broken", latency=0.0),
+                  "ok": FakeLatencyChatModel(response="ok", latency=0.0)}, hedge_delay_seconds=1.0)
+    assert ask(llm) == "ok"
+    assert llm._stats["broken"].error_rate() == 1.0
+    assert llm.invoke(MESSAGES).content == "ok"
+
+
+def test_raises_when_every_provider_fails():
+    llm = router({"broken": FailingChatModel(response="broken", latency=0.0)})
+    with pytest.raises(RuntimeError, match="broken is down"):
+        ask(llm)
+
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=0.05)
+    breaker.failure()
+    assert breaker.state == "closed"
+    breaker.failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    # Only one trial call at a time
+    assert not breaker.available()
+    assert not breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed"
+
+
+def test_open_breaker_skips_the_provider():
+    llm = router({"broken": FailingChatModel(response="broken", latency=0.0),
+                  "ok": FakeLatencyChatModel(response="ok", latency=0.0)},
+                 failure_threshold=1, cooldown_seconds=60)
+    ask(llm)
+    assert llm.stats()["broken"]["state"] == "open"
+    assert llm._candidates("answer") == ["ok"]
+
+
+def test_cancelled_half_open_trial_is_released():
+    llm = router({"flaky": FakeLatencyChatModel(response="flaky", latency=0.5),
+                  "ok": FakeLatencyChatModel(response="ok", latency=0.01)},
+                 failure_threshold=1, cooldown_seconds=0.01)
+    llm._stats["flaky"].record_failure()
+    time.sleep(0.02)
+    assert llm._stats["flaky"].breaker.state == "half_open"
+
+    # The half-open trial on "flaky" loses the hedge to "ok" and is cancelled
+    assert ask(llm) == "ok"
+    assert llm._stats["flaky"].breaker.available()
+    assert "flaky" in llm._candidates("answer")
+
+
+def test_trial_cancelled_by_a_timeout_is_released():
+    llm = router({"flaky": FakeLatencyChatModel(response="flaky", latency=0.5)},
+                 failure_threshold=1, cooldown_seconds=0.01)
+    llm._stats["flaky"].record_failure()
+    time.sleep(0.02)
+
+    async def chat_with_timeout():
+        await asyncio.wait_for(llm.ainvoke(MESSAGES), timeout=0.05)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(chat_with_timeout())
+    assert llm._stats["flaky"].breaker.allow()
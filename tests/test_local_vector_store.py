@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from benchmarks.bench_transform import write_synthetic_catalog
+from myutils.fake_models import FakeEmbeddings
+from retriever.local_vector_store import LocalVectorStore
+
+
+def test_compact_drops_tombstoned_rows(tmp_path):
+    store = LocalVectorStore(FakeEmbeddings(size=16), path=str(tmp_path))
+    ids = [f"doc{i}" for i in range(10)]
+    store.add_texts([f"phone {i}" for i in range(10)], ids=ids)
+    store.add_texts([f"phone {i} updated" for i in range(5)], ids=ids[:5])
+    store.delete(ids=ids[9:])
+    assert store.dead_fraction() == pytest.approx(6 / 15)
+
+    store.compact()
+    assert store.generation.startswith("g")
+    assert store.dead_fraction() == 0.0
+    assert len(store) == 9
+    # Vectors stay paired with their documents after renumbering
+    best = store.similarity_search("phone 3 updated", k=1)[0]
+    assert (best.id, best.page_content) == ("doc3", "phone 3 updated")
+
+
+def test_reingest_compacts_once_enough_rows_are_dead(tmp_path, offline_settings):
+    from data_ingestion.ingestion_pipeline import DataIngestion
+
+    csv_path = str(tmp_path / "catalog.csv")
+    write_synthetic_catalog(csv_path, 50, seed=1)
+    assert DataIngestion(csv_path).run_pipeline()["inserted"] == 50
+    index_path = offline_settings.config["vector_store"]["local"]["path"]
+    assert not os.path.exists(os.path.join(index_path, "CURRENT"))
+
+    # Every product changes, so each one's previous row is tombstoned
+    write_synthetic_catalog(csv_path, 50, seed=2)
+    assert DataIngestion(csv_path).run_pipeline()["updated"] == 50
+
+    store = LocalVectorStore(FakeEmbeddings(size=16), path=index_path)
+    assert store.generation.startswith("g")
+    assert len(store) == 50
+    assert store.dead_fraction() == 0.0
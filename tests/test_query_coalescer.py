@@ -0,0 +1,47 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from myutils.fake_models import FakeEmbeddings
+from retriever.query_coalescer import QueryEmbeddingCoalescer
+
+
+def coalescer_threads() -> int:
+    return sum(1 for thread in threading.enumerate() if thread.name == "query-coalescer")
+
+
+def test_concurrent_queries_share_a_batch():
+    embeddings = FakeEmbeddings(size=8)
+    coalescer = QueryEmbeddingCoalescer(embeddings, window_ms=50)
+    queries = [f"phone {i}" for i in range(8)]
+    with ThreadPoolExecutor(len(queries)) as pool:
+        vectors = list(pool.map(coalescer.embed_query, queries))
+    assert vectors == [embeddings.embed_query(query) for query in queries]
+    assert coalescer.stats()["batch_size"]["count"] < len(queries)
+    coalescer.close()
+
+
+def test_close_stops_the_thread_and_a_later_query_restarts_it():
+    coalescer = QueryEmbeddingCoalescer(FakeEmbeddings(size=8))
+    before = coalescer_threads()
+    coalescer.embed_query("phone")
+    assert coalescer_threads() == before + 1
+    coalescer.close()
+    assert coalescer_threads() == before
+    assert coalescer.embed_query("phone")
+    coalescer.close()
+
+
+def test_reloaded_retriever_keeps_the_coalescer(offline_settings):
+    from retriever.retrievals import Retriever
+
+    first = Retriever()
+    first.load_retriever()
+    first.embeddings.embed_query("phone")
+    before = coalescer_threads()
+    second = Retriever(previous=first)
+    second.load_retriever()
+    second.embeddings.embed_query("phone")
+    assert second.coalescer is first.coalescer
+    assert second.embeddings is first.embeddings
+    assert coalescer_threads() == before
+    first.coalescer.close()
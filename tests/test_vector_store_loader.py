@@ -0,0 +1,22 @@
+import pytest
+
+from myutils.config_loader import load_config
+from myutils.fake_models import FakeEmbeddings
+from myutils.settings import ENV_VARS, Settings
+from myutils.vector_store_loader import load_vector_store
+
+
+def test_astra_credentials_come_from_settings(monkeypatch):
+    # Set in the process environment, but not in the settings the loader is given
+    for name in ENV_VARS:
+        monkeypatch.setenv(name, "from-environment")
+    settings = Settings(load_config(), {**dict.fromkeys(ENV_VARS), "ASTRA_DB_API_ENDPOINT": "https://example"})
+    with pytest.raises(EnvironmentError, match="ASTRA_DB_APPLICATION_TOKEN"):
+        load_vector_store(settings.config, FakeEmbeddings(size=8), settings=settings)
+
+
+def test_local_backend_needs_no_credentials(tmp_path):
+    config = {"vector_store": {"backend": "local", "local": {"path": str(tmp_path)}}}
+    settings = Settings(config, dict.fromkeys(ENV_VARS))
+    store = load_vector_store(settings.config, FakeEmbeddings(size=8), settings=settings)
+    assert len(store) == 0